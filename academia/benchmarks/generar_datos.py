@@ -0,0 +1,338 @@
+import argparse
+import math
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+from pathlib import Path
+
+import psycopg
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from config.conexionDB import DB_URL
+
+# Genera un dataset sintetico (esquema de academiaDB.txt mas migraciones), del tamano que se pida.
+# Reemplaza los datos de la base: carga con COPY en varios procesos, bloque por bloque.
+# Cada bloque usa su propio Random(semilla:tabla:bloque), asi el resultado es el mismo
+# para una semilla sin importar cuantos procesos se usen.
+#
+# Uso: python benchmarks/generar_datos.py --perfil grande --semilla 42 --reemplazar
+
+PERFILES = {
+    "pequeno": {
+        "personas": 5_000, "alumnos": 4_000, "docentes": 300, "administradores": 20,
+        "usuarios": 1_000, "materias": 120, "clases": 400,
+        "inscripciones": 50_000, "notas": 45_000,
+    },
+    "mediano": {
+        "personas": 60_000, "alumnos": 50_000, "docentes": 1_500, "administradores": 50,
+        "usuarios": 10_000, "materias": 300, "clases": 3_000,
+        "inscripciones": 600_000, "notas": 550_000,
+    },
+    "grande": {
+        "personas": 500_000, "alumnos": 400_000, "docentes": 8_000, "administradores": 200,
+        "usuarios": 50_000, "materias": 600, "clases": 20_000,
+        "inscripciones": 5_000_000, "notas": 5_000_000,
+    },
+}
+
+FILAS_POR_BLOQUE = 50_000
+ALUMNOS_POR_BLOQUE = 5_000
+
+NOMBRES = [
+    "Alan", "Jorge", "Diego", "Maria", "Lucia", "Marco", "Luis", "Ana", "Carlos", "Sofia",
+    "Elias", "Pedro", "Laura", "Miguel", "Andrea", "Jose", "Juan", "Carmen", "Rosa", "Daniel",
+    "Gabriela", "Fernando", "Valeria", "Ricardo", "Paola", "Sergio", "Natalia", "Hugo", "Monica", "Raul",
+]
+APELLIDOS = [
+    "Laura", "Mamani", "Quispe", "Quito", "Flores", "Soto", "Perez", "Fernandez", "Rojas", "Torrez",
+    "Apaza", "Gomez", "Lopez", "Diaz", "Martinez", "Vargas", "Luna", "Ramirez", "Gonzalez", "Torres",
+    "Condori", "Choque", "Gutierrez", "Rodriguez", "Mendoza", "Chavez", "Huanca", "Calle", "Vasquez", "Cruz",
+]
+CARRERAS = [
+    "Ing. Sistemas", "Ing. Comercial", "Derecho", "Arquitectura", "Medicina", "Ing. Civil",
+    "Ing. Industrial", "Economia", "Contaduria", "Psicologia", "Odontologia", "Bioquimica",
+    "Ing. Electronica", "Administracion", "Comunicacion",
+]
+ESPECIALIDADES = [
+    "Matematicas", "Electronica", "Leyes", "Arquitectura", "Biologia", "Fisica", "Quimica",
+    "Informatica", "Finanzas", "Psicologia", "Estadistica", "Idiomas",
+]
+TIPOS = ["Alumno", "Docente", "Administrador"]
+AREAS = [
+    "Calculo", "Algebra", "Programacion", "Fisica", "Quimica", "Derecho Civil", "Derecho Penal",
+    "Anatomia", "Contabilidad", "Estadistica", "Redes", "Bases de Datos", "Economia", "Dibujo",
+    "Estructuras", "Microbiologia", "Marketing", "Sistemas Operativos", "Etica", "Ingles",
+]
+NIVELES = ["I", "II", "III", "IV", "V"]
+
+# dos periodos por anio; los recientes tienen mas clases (la matricula crece)
+PERIODOS = [f"{anio}-{semestre}" for anio in range(2017, 2027) for semestre in (1, 2)]
+PESOS_PERIODO = [1.12 ** i for i in range(len(PERIODOS))]
+MATERIAS_POR_PERIODO = 5
+# el periodo en curso todavia no tiene notas
+PERIODO_ACTUAL = PERIODOS[-1]
+
+def azar(semilla, tabla, bloque=0):
+    return random.Random(f"{semilla}:{tabla}:{bloque}")
+
+def inicio_periodo(periodo):
+    anio, semestre = periodo.split("-")
+    return date(int(anio), 2 if semestre == "1" else 8, 1)
+
+def bloques(total, tamano):
+    return [(inicio, min(inicio + tamano, total + 1)) for inicio in range(1, total + 1, tamano)]
+
+def copiar(conn, tabla, columnas, filas):
+    with conn.cursor() as cursor:
+        with cursor.copy(f"COPY {tabla} ({', '.join(columnas)}) FROM STDIN") as copia:
+            for fila in filas:
+                copia.write_row(fila)
+
+def conectar():
+    conn = psycopg.connect(DB_URL)
+    conn.execute("SET synchronous_commit = off")
+    return conn
+
+# --- generadores por bloque (corren en los procesos hijos) ---
+
+def personas(semilla, desde, hasta):
+    rnd = azar(semilla, "persona", desde)
+    for i in range(desde, hasta):
+        nombre = rnd.choice(NOMBRES)
+        paterno = rnd.choice(APELLIDOS)
+        materno = rnd.choice(APELLIDOS) if rnd.random() > 0.05 else None
+        nacimiento = date(1960, 1, 1) + timedelta(days=rnd.randrange(17_000))
+        # ci y correo derivan del id: unicos sin coordinar entre procesos
+        yield (i, nombre, paterno, materno, 1_000_000 + i, f"{nombre}.{paterno}{i}@academia.edu".lower(), nacimiento)
+
+def alumnos(semilla, desde, hasta, carreras):
+    rnd = azar(semilla, "alumno", desde)
+    for i in range(desde, hasta):
+        yield (i, i, rnd.randint(1, carreras))
+
+def cargar_bloque(semilla, tabla, desde, hasta):
+    inicio = time.perf_counter()
+    with conectar() as conn:
+        if tabla == "persona":
+            filas = personas(semilla, desde, hasta)
+            columnas = ("id_persona", "nombre", "apellido_pat", "apellido_mat", "ci", "correo", "fecha_nacimiento")
+        else:
+            filas = alumnos(semilla, desde, hasta, len(CARRERAS))
+            columnas = ("id_alumno", "id_persona", "carrera_alumno")
+        copiar(conn, tabla, columnas, filas)
+    return tabla, hasta - desde, time.perf_counter() - inicio
+
+def inscripciones_por_alumno(semilla, bloque, desde, hasta, promedio):
+    rnd = azar(semilla, "cantidad_inscripciones", bloque)
+    return [max(1, round(rnd.gauss(promedio, promedio / 3))) for _ in range(desde, hasta)]
+
+def cargar_inscripciones(semilla, bloque, desde, hasta, primer_id, promedio, prob_nota, clases):
+    # clases: {periodo: ([(id_clase, id_docente), ...], pesos acumulados de popularidad)}
+    inicio = time.perf_counter()
+    rnd = azar(semilla, "inscripcion", bloque)
+    cantidades = inscripciones_por_alumno(semilla, bloque, desde, hasta, promedio)
+    periodos = [p for p in PERIODOS if clases[p][0]]
+    pesos = [PESOS_PERIODO[PERIODOS.index(p)] for p in periodos]
+    inscritas, notas = [], []
+    id_inscripcion = primer_id
+
+    for id_alumno, cantidad in zip(range(desde, hasta), cantidades):
+        # cohorte: los ingresos recientes son mas, y cursan desde su periodo de ingreso;
+        # el ingreso deja periodos suficientes para todas sus inscripciones
+        necesarios = min(len(periodos), math.ceil(cantidad / MATERIAS_POR_PERIODO))
+        limite = len(periodos) - necesarios + 1
+        indice = rnd.choices(range(limite), weights=pesos[:limite])[0]
+        while cantidad > 0:
+            periodo = periodos[indice]
+            disponibles, acumulado = clases[periodo]
+            tomar = min(cantidad, MATERIAS_POR_PERIODO, len(disponibles))
+            elegidas = set()
+            while len(elegidas) < tomar:
+                elegidas.add(rnd.choices(range(len(disponibles)), cum_weights=acumulado)[0])
+            for posicion in sorted(elegidas):
+                id_clase, id_docente = disponibles[posicion]
+                fecha = inicio_periodo(periodo) + timedelta(days=rnd.randrange(20))
+                inscritas.append((id_inscripcion, id_alumno, id_clase, fecha))
+                if periodo != PERIODO_ACTUAL and rnd.random() < prob_nota:
+                    nota = min(100.0, max(0.0, rnd.gauss(68, 14)))
+                    registro = fecha + timedelta(days=120 + rnd.randrange(30))
+                    notas.append((id_inscripcion, id_inscripcion, f"{nota:.2f}", registro, id_docente))
+                id_inscripcion += 1
+            cantidad -= tomar
+            if indice >= len(periodos) - 1:
+                break
+            indice += 1
+
+    with conectar() as conn:
+        copiar(conn, "inscripcion", ("id_inscripcion", "id_alumno", "id_clase", "fecha_inscripcion"), inscritas)
+        # id_nota = id_inscripcion: no hace falta coordinar ids entre bloques
+        copiar(conn, "notas", ("id_nota", "id_inscripcion", "nota", "fecha_registro", "id_docente"), notas)
+    return "inscripcion", len(inscritas), time.perf_counter() - inicio, len(notas)
+
+# --- proceso principal ---
+
+def catalogos(conn, semilla, tam):
+    rnd = azar(semilla, "catalogos")
+    copiar(conn, "carrera", ("id_carrera", "nombre_carrera"), enumerate(CARRERAS, 1))
+    copiar(conn, "especialidad", ("id_especialidad", "nombre_especialidad"), enumerate(ESPECIALIDADES, 1))
+    copiar(conn, "tipo_usuario", ("id_tipo", "nombre_tipo"), enumerate(TIPOS, 1))
+
+    materias = []
+    for i in range(1, tam["materias"] + 1):
+        area = AREAS[(i - 1) % len(AREAS)]
+        nivel = NIVELES[((i - 1) // len(AREAS)) % len(NIVELES)]
+        grupo = (i - 1) // (len(AREAS) * len(NIVELES))
+        nombre = f"{area} {nivel}" + (f" ({grupo + 1})" if grupo else "")
+        materias.append((i, nombre, f"Curso de {area.lower()}, nivel {nivel}"))
+    copiar(conn, "materia", ("id_materia", "nombre", "descripcion"), materias)
+
+    # personas: primero alumnos, luego docentes, luego administradores
+    primer_docente = tam["alumnos"] + 1
+    primer_admin = primer_docente + tam["docentes"]
+    copiar(conn, "docente", ("id_docente", "id_persona", "id_especialidad"), (
+        (i, primer_docente + i - 1, rnd.randint(1, len(ESPECIALIDADES))) for i in range(1, tam["docentes"] + 1)
+    ))
+    copiar(conn, "administrador", ("id_admin", "id_persona"), (
+        (i, primer_admin + i - 1) for i in range(1, tam["administradores"] + 1)
+    ))
+
+    def tipo(id_persona):
+        if id_persona >= primer_admin:
+            return 3
+        return 2 if id_persona >= primer_docente else 1
+
+    # usuarios repartidos entre todas las personas con rol
+    con_rol = primer_admin + tam["administradores"] - 1
+    paso = max(1, con_rol // max(1, tam["usuarios"]))
+    copiar(conn, "usuario", ("id_usuario", "id_persona", "nombre", "contraseña", "id_tipo"), (
+        (i, p, f"usuario{p}", f"{rnd.randrange(10_000):04d}", tipo(p))
+        for i, p in enumerate(range(1, con_rol + 1, paso)[:tam["usuarios"]], 1)
+    ))
+
+    # clases: los periodos recientes tienen mas; la popularidad sigue una ley de potencia
+    por_periodo = {p: [] for p in PERIODOS}
+    periodos = rnd.choices(PERIODOS, weights=PESOS_PERIODO, k=tam["clases"])
+    filas = []
+    for i, periodo in enumerate(periodos, 1):
+        materia = rnd.randint(1, tam["materias"])
+        docente = rnd.randint(1, tam["docentes"])
+        filas.append((i, materia, docente, periodo, rnd.choice((30, 40, 50, 60))))
+        por_periodo[periodo].append((i, docente, rnd.paretovariate(1.5)))
+    copiar(conn, "clase", ("id_clase", "id_materia", "id_docente", "periodo", "cupo"), filas)
+
+    clases = {}
+    for periodo, lista in por_periodo.items():
+        acumulado, suma = [], 0
+        for _, _, peso in lista:
+            suma += peso
+            acumulado.append(suma)
+        clases[periodo] = ([(id_clase, docente) for id_clase, docente, _ in lista], acumulado)
+    return clases
+
+def ejecutar(tareas, procesos, funcion):
+    resultados = []
+    with ProcessPoolExecutor(max_workers=procesos) as ejecutor:
+        for resultado in ejecutor.map(funcion, *zip(*tareas)):
+            resultados.append(resultado)
+    return resultados
+
+def cargar(conn, args, tam, inicio):
+    print(f"perfil {args.perfil}, semilla {args.semilla}, {args.procesos} procesos")
+    ejecutar([(args.semilla, "persona", d, h) for d, h in bloques(tam["personas"], FILAS_POR_BLOQUE)],
+             args.procesos, cargar_bloque)
+    print(f"  persona        {tam['personas']:>10}  {time.perf_counter() - inicio:6.1f} s")
+
+    clases = catalogos(conn, args.semilla, tam)
+    conn.commit()
+    ejecutar([(args.semilla, "alumno", d, h) for d, h in bloques(tam["alumnos"], FILAS_POR_BLOQUE)],
+             args.procesos, cargar_bloque)
+    print(f"  alumno         {tam['alumnos']:>10}  {time.perf_counter() - inicio:6.1f} s")
+
+    # los ids de inscripcion de cada bloque se conocen de antemano: cada bloque de
+    # alumnos sortea primero cuantas inscripciones tiene cada alumno
+    promedio = tam["inscripciones"] / tam["alumnos"]
+    # el periodo actual no tiene notas: se compensa con la parte de clases que le toca
+    sin_notas = PESOS_PERIODO[-1] / sum(PESOS_PERIODO)
+    prob_nota = min(1.0, tam["notas"] / (tam["inscripciones"] * (1 - sin_notas)))
+    tareas, primer_id = [], 1
+    for numero, (desde, hasta) in enumerate(bloques(tam["alumnos"], ALUMNOS_POR_BLOQUE)):
+        tareas.append((args.semilla, numero, desde, hasta, primer_id, promedio, prob_nota, clases))
+        primer_id += sum(inscripciones_por_alumno(args.semilla, numero, desde, hasta, promedio))
+    resultados = ejecutar(tareas, args.procesos, cargar_inscripciones)
+    inscritas = sum(r[1] for r in resultados)
+    notas = sum(r[3] for r in resultados)
+    print(f"  inscripcion    {inscritas:>10}  {time.perf_counter() - inicio:6.1f} s")
+    print(f"  notas          {notas:>10}")
+
+    for tabla, columna in (
+        ("carrera", "id_carrera"), ("especialidad", "id_especialidad"), ("tipo_usuario", "id_tipo"),
+        ("persona", "id_persona"), ("alumno", "id_alumno"), ("docente", "id_docente"),
+        ("administrador", "id_admin"), ("usuario", "id_usuario"), ("materia", "id_materia"),
+        ("clase", "id_clase"), ("inscripcion", "id_inscripcion"), ("notas", "id_nota"),
+    ):
+        conn.execute(
+            f"SELECT setval(pg_get_serial_sequence('{tabla}', '{columna}'), "
+            f"COALESCE((SELECT max({columna}) FROM {tabla}), 0) + 1, false)"
+        )
+    # cupo: el de la clase o lo que ya tiene inscrito, con algo de holgura
+    conn.execute(
+        "UPDATE clase c SET cupo = GREATEST(c.cupo, i.inscritos + i.inscritos / 10) "
+        "FROM (SELECT id_clase, count(*) AS inscritos FROM inscripcion GROUP BY id_clase) i "
+        "WHERE i.id_clase = c.id_clase"
+    )
+    conn.commit()
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera datos sinteticos para la base academia")
+    parser.add_argument("--perfil", choices=PERFILES, default="pequeno")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--procesos", type=int, default=os.cpu_count())
+    parser.add_argument("--reemplazar", action="store_true", help="vacia las tablas si ya tienen datos")
+    for nombre in PERFILES["grande"]:
+        parser.add_argument(f"--{nombre}", type=int)
+    args = parser.parse_args()
+
+    tam = dict(PERFILES[args.perfil])
+    tam.update({k: v for k, v in vars(args).items() if k in tam and v is not None})
+    if tam["alumnos"] + tam["docentes"] + tam["administradores"] > tam["personas"]:
+        parser.error("alumnos + docentes + administradores no puede superar a personas")
+
+    inicio = time.perf_counter()
+    with conectar() as conn:
+        existentes = conn.execute("SELECT count(*) FROM persona").fetchone()[0]
+        if existentes and not args.reemplazar:
+            parser.error(f"la base ya tiene {existentes} personas; use --reemplazar para vaciarla")
+        conn.execute(
+            "TRUNCATE notas, inscripcion, clase, usuario, administrador, docente, alumno, "
+            "persona, materia, tipo_usuario, especialidad, carrera RESTART IDENTITY"
+        )
+        # los triggers (estadisticas, avisos de cambios) se saltan durante la carga;
+        # las estadisticas se recalculan al final
+        conn.execute("ALTER TABLE notas DISABLE TRIGGER USER")
+        conn.execute("ALTER TABLE inscripcion DISABLE TRIGGER USER")
+        conn.commit()
+        try:
+            cargar(conn, args, tam, inicio)
+        finally:
+            # si cargar fallo, la transaccion quedo abortada y no aceptaria el ENABLE
+            conn.rollback()
+            conn.execute("ALTER TABLE notas ENABLE TRIGGER USER")
+            conn.execute("ALTER TABLE inscripcion ENABLE TRIGGER USER")
+            conn.commit()
+        conn.execute("SELECT estadistica_recalcular()")
+        # notas e inscripcion se cargaron sin triggers: sus ETag anteriores dejan de valer
+        conn.execute(
+            "SELECT pg_notify('version', tabla || ':' || nextval('version_cambio')) "
+            "FROM unnest(ARRAY['notas', 'inscripcion']) AS tabla"
+        )
+        conn.commit()
+        conn.autocommit = True
+        conn.execute("VACUUM ANALYZE")
+    print(f"listo en {time.perf_counter() - inicio:.1f} s")
+
+if __name__ == "__main__":
+    main()
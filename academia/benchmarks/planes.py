@@ -0,0 +1,114 @@
+import argparse
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import psycopg
+from psycopg import sql
+from psycopg.rows import dict_row
+
+from config.conexionDB import DB_URL
+from routes.alumno import CONSULTA_KARDEX
+from routes.nota import exportacion_notas
+
+# Regresion de planes: corre EXPLAIN (ANALYZE, BUFFERS) sobre las consultas que
+# dependen de los indices de migraciones/ y falla (codigo 1) si alguna hace Seq Scan
+# sobre una tabla grande. Pensado para la base de generar_datos.py --perfil grande;
+# con pocos datos el planificador prefiere Seq Scan y el chequeo no dice nada.
+# Uso: python benchmarks/planes.py [--min-filas 10000] [--planes]
+
+MIN_FILAS = 10_000
+
+# ids representativos: los de mas filas, donde un Seq Scan duele mas
+MUESTRA = """
+    WITH c AS (SELECT id_clase FROM inscripcion GROUP BY 1 ORDER BY count(*) DESC LIMIT 1)
+    SELECT
+        (SELECT id_alumno FROM inscripcion GROUP BY 1 ORDER BY count(*) DESC LIMIT 1) AS id_alumno,
+        c.id_clase,
+        (SELECT array_agg(id_inscripcion) FROM inscripcion i WHERE i.id_clase = c.id_clase) AS inscripciones,
+        (SELECT id_docente FROM notas GROUP BY 1 ORDER BY count(*) DESC LIMIT 1) AS id_docente,
+        (SELECT periodo FROM clase GROUP BY 1 ORDER BY count(*) LIMIT 1) AS periodo,
+        (SELECT nombre FROM usuario ORDER BY id_usuario DESC LIMIT 1) AS usuario,
+        (SELECT id_persona FROM alumno ORDER BY id_alumno DESC LIMIT 1) AS id_persona
+    FROM c
+"""
+
+# consulta -> (sql, parametros, tablas donde un Seq Scan es el plan correcto)
+def consultas(m):
+    return {
+        # GET /alumno/{id}/kardex, completo y de un periodo
+        "kardex": (CONSULTA_KARDEX, {"id_alumno": m["id_alumno"], "periodo": None}),
+        "kardex_periodo": (CONSULTA_KARDEX, {"id_alumno": m["id_alumno"], "periodo": m["periodo"]}),
+        # GET /nota/export?periodo=
+        # un periodo trae a buena parte de los alumnos: el hash join sobre alumno y persona es lo barato
+        "exportar_notas_periodo": (exportacion_notas._armar({"periodo": m["periodo"]}), {}, {"alumno", "persona"}),
+        # POST /usuario/login
+        "login": ("SELECT id_usuario, contraseña, id_tipo FROM usuario WHERE nombre = %(usuario)s ORDER BY id_usuario", m),
+        # PUT /clase/{id}/notas
+        "inscripciones_de_clase": (
+            "SELECT id_inscripcion FROM inscripcion WHERE id_clase = %(id_clase)s AND id_inscripcion = ANY(%(inscripciones)s)",
+            m,
+        ),
+        "clases_de_docente": ("SELECT id_clase, periodo FROM clase WHERE id_docente = %(id_docente)s AND periodo = %(periodo)s", m),
+        # lo que recorren los ON DELETE CASCADE al borrar una persona, un alumno o un docente
+        "cascada_persona": ("SELECT id_alumno FROM alumno WHERE id_persona = %(id_persona)s", m),
+        "cascada_alumno": ("SELECT id_inscripcion FROM inscripcion WHERE id_alumno = %(id_alumno)s", m),
+        "cascada_docente": ("SELECT id_nota FROM notas WHERE id_docente = %(id_docente)s", m),
+    }
+
+def nodos(plan):
+    yield plan
+    for hijo in plan.get("Plans", ()):
+        yield from nodos(hijo)
+
+def main():
+    parser = argparse.ArgumentParser(description="Chequeo de planes de las consultas clave")
+    parser.add_argument("--min-filas", type=int, default=MIN_FILAS,
+                        help="un Seq Scan sobre una tabla con menos filas se tolera")
+    parser.add_argument("--planes", action="store_true", help="imprime el plan completo de cada consulta")
+    args = parser.parse_args()
+
+    with psycopg.connect(DB_URL, row_factory=dict_row) as conn:
+        filas = {
+            f["relname"]: int(f["reltuples"])
+            for f in conn.execute("SELECT relname, reltuples FROM pg_class WHERE relkind = 'r' AND relnamespace = 'public'::regnamespace")
+        }
+        if max(filas.get("inscripcion", 0), 0) < args.min_filas:
+            print(f"  aviso: inscripcion tiene menos de {args.min_filas} filas (o falta ANALYZE); el chequeo no es representativo")
+        muestra = conn.execute(MUESTRA).fetchone()
+
+        fallas = []
+        print(f"{'consulta':26} {'ms':>9} {'hit':>9} {'read':>9}  seq scans")
+        for nombre, (consulta, parametros, *permitidas) in consultas(muestra).items():
+            if isinstance(consulta, str):
+                consulta = sql.SQL(consulta)
+            explain = sql.SQL("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {}").format(consulta)
+            resultado = conn.execute(explain, parametros).fetchone()["QUERY PLAN"][0]
+            conn.rollback()
+            plan = resultado["Plan"]
+            secuenciales = sorted({n["Relation Name"] for n in nodos(plan) if n["Node Type"] == "Seq Scan"})
+            permitidas = permitidas[0] if permitidas else set()
+            grandes = [t for t in secuenciales if filas.get(t, 0) >= args.min_filas and t not in permitidas]
+            if grandes:
+                fallas.append((nombre, grandes))
+            marcas = ", ".join(
+                t + ("" if t in grandes else " (permitida)" if t in permitidas else " (chica)") for t in secuenciales
+            ) or "-"
+            print(
+                f"{nombre:26} {resultado['Execution Time']:9.2f} "
+                f"{plan.get('Shared Hit Blocks', 0):9} {plan.get('Shared Read Blocks', 0):9}  {marcas}"
+            )
+            if args.planes:
+                print(json.dumps(plan, indent=2))
+
+    if fallas:
+        print()
+        for nombre, tablas in fallas:
+            print(f"  FALLA {nombre}: Seq Scan sobre {', '.join(tablas)}")
+        sys.exit(1)
+    print("\nsin Seq Scan sobre tablas grandes")
+
+if __name__ == "__main__":
+    main()
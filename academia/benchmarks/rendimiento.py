@@ -0,0 +1,294 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import secrets
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import psycopg
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+from config.conexionDB import DB_URL
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+# Prueba de carga: levanta main:app con uvicorn contra la base local (generada con
+# generar_datos.py), reproduce una mezcla ponderada de operaciones con N clientes
+# concurrentes y reporta latencias, throughput y espera del pool por operacion.
+# Con --base compara contra un resultado guardado y termina con error si hay regresiones.
+#
+# Uso:
+#   python benchmarks/rendimiento.py --escenario lecturas --guardar benchmarks/base.json
+#   python benchmarks/rendimiento.py --escenario lecturas --base benchmarks/base.json
+
+PUERTO = 8765
+TOLERANCIA = 0.15
+
+# --- datos de la base para armar las peticiones ---
+
+def leer_datos(clases_cierre=200):
+    with psycopg.connect(DB_URL) as conn:
+        def maximo(tabla, columna):
+            return conn.execute(f"SELECT COALESCE(max({columna}), 0) FROM {tabla}").fetchone()[0]
+
+        datos = {
+            "persona": maximo("persona", "id_persona"),
+            "materia": maximo("materia", "id_materia"),
+            "nota": maximo("notas", "id_nota"),
+            "alumno": maximo("alumno", "id_alumno"),
+            "clase": maximo("clase", "id_clase"),
+            "periodos": [f[0] for f in conn.execute("SELECT DISTINCT periodo FROM clase ORDER BY 1")],
+        }
+        periodo_actual = datos["periodos"][-1] if datos["periodos"] else None
+        datos["clases_actuales"] = [
+            f[0] for f in conn.execute("SELECT id_clase FROM clase WHERE periodo = %s", (periodo_actual,))
+        ]
+        # clases con inscritos, para cerrar notas por clase completa
+        datos["cierres"] = conn.execute(
+            "SELECT id_clase, array_agg(id_inscripcion ORDER BY id_inscripcion) FROM inscripcion "
+            "WHERE id_clase IN (SELECT id_clase FROM clase ORDER BY random() LIMIT %s) GROUP BY id_clase",
+            (clases_cierre,),
+        ).fetchall()
+    return datos
+
+# --- operaciones: (nombre, ruta plantilla en /metrics, funcion) ---
+
+def op(nombre, ruta):
+    def registrar(funcion):
+        funcion.nombre = nombre
+        funcion.ruta = ruta
+        return funcion
+    return registrar
+
+@op("listar_notas", "/nota/")
+def listar_notas(cliente, datos, rnd):
+    return cliente.get("/nota/", params={"after_id": rnd.randrange(max(1, datos["nota"])), "limit": 100})
+
+@op("listar_personas", "/persona/")
+def listar_personas(cliente, datos, rnd):
+    return cliente.get("/persona/", params={"after_id": rnd.randrange(max(1, datos["persona"])), "limit": 100})
+
+@op("clases_periodo", "/clase/")
+def clases_periodo(cliente, datos, rnd):
+    return cliente.get("/clase/", params={"periodo": rnd.choice(datos["periodos"]), "limit": 100})
+
+@op("inscritos_clase", "/inscripcion/")
+def inscritos_clase(cliente, datos, rnd):
+    return cliente.get("/inscripcion/", params={"id_clase": rnd.randint(1, datos["clase"])})
+
+@op("obtener_persona", "/persona/{id_persona}")
+def obtener_persona(cliente, datos, rnd):
+    return cliente.get(f"/persona/{rnd.randint(1, datos['persona'])}")
+
+@op("obtener_materia", "/materia/{id_materia}")
+def obtener_materia(cliente, datos, rnd):
+    return cliente.get(f"/materia/{rnd.randint(1, datos['materia'])}")
+
+@op("obtener_nota", "/nota/{id_nota}")
+def obtener_nota(cliente, datos, rnd):
+    return cliente.get(f"/nota/{rnd.randint(1, datos['nota'])}")
+
+@op("kardex", "/alumno/{id_alumno}/kardex")
+def kardex(cliente, datos, rnd):
+    return cliente.get(f"/alumno/{rnd.randint(1, datos['alumno'])}/kardex")
+
+@op("inscribir", "/inscripcion/")
+def inscribir(cliente, datos, rnd):
+    # rafaga de inscripciones: pocas clases del periodo actual concentran la demanda
+    clases = datos["clases_actuales"][:20] or [1]
+    return cliente.post("/inscripcion/", json={
+        "id_alumno": rnd.randint(1, datos["alumno"]), "id_clase": rnd.choice(clases),
+    })
+
+@op("cerrar_notas", "/clase/{id_clase}/notas")
+def cerrar_notas(cliente, datos, rnd):
+    id_clase, inscripciones = rnd.choice(datos["cierres"])
+    notas = [{"id_inscripcion": i, "nota": round(min(100, max(0, rnd.gauss(68, 14))), 2)} for i in inscripciones]
+    return cliente.put(f"/clase/{id_clase}/notas", json={"notas": notas})
+
+ESCENARIOS = {
+    "lecturas": [
+        (30, listar_notas), (10, listar_personas), (10, clases_periodo), (10, inscritos_clase),
+        (15, obtener_persona), (10, obtener_materia), (10, obtener_nota), (5, kardex),
+    ],
+    "mixto": [
+        (20, listar_notas), (10, clases_periodo), (10, inscritos_clase), (20, obtener_persona),
+        (10, obtener_nota), (10, kardex), (15, inscribir), (5, cerrar_notas),
+    ],
+    "inscripciones": [(90, inscribir), (10, inscritos_clase)],
+    "cierre_notas": [(80, cerrar_notas), (20, kardex)],
+}
+
+# --- ejecucion ---
+
+def leer_espera_pool(texto):
+    espera = {}
+    for linea in texto.splitlines():
+        m = re.match(r'academia_pool_espera_segundos_(sum|count)\{ruta="([^"]*)"\} (\S+)', linea)
+        if m:
+            espera.setdefault(m.group(2), {})[m.group(1)] = float(m.group(3))
+    return espera
+
+async def cliente_virtual(cliente, datos, mezcla, semilla, fin, medir_desde, muestras):
+    rnd = random.Random(semilla)
+    pesos = [p for p, _ in mezcla]
+    operaciones = [o for _, o in mezcla]
+    while time.perf_counter() < fin:
+        operacion = rnd.choices(operaciones, weights=pesos)[0]
+        inicio = time.perf_counter()
+        try:
+            respuesta = await operacion(cliente, datos, rnd)
+            codigo = respuesta.status_code
+        except httpx.HTTPError:
+            codigo = 0
+        if inicio >= medir_desde:
+            muestras.setdefault(operacion.nombre, []).append((time.perf_counter() - inicio, codigo))
+
+def percentil(ordenadas, p):
+    return ordenadas[min(len(ordenadas) - 1, int(len(ordenadas) * p))]
+
+async def correr(args, datos):
+    mezcla = ESCENARIOS[args.escenario]
+    muestras = {}
+    limites = httpx.Limits(max_connections=args.clientes)
+    async with httpx.AsyncClient(base_url=args.url, limits=limites, timeout=30) as cliente:
+        antes = leer_espera_pool((await cliente.get("/metrics")).text)
+        inicio = time.perf_counter()
+        medir_desde = inicio + args.calentamiento
+        fin = medir_desde + args.duracion
+        await asyncio.gather(*(
+            cliente_virtual(cliente, datos, mezcla, args.semilla * 1000 + i, fin, medir_desde, muestras)
+            for i in range(args.clientes)
+        ))
+        despues = leer_espera_pool((await cliente.get("/metrics")).text)
+
+    rutas = {o.nombre: o.ruta for _, o in mezcla}
+    resultado = {}
+    for nombre, datos_op in sorted(muestras.items()):
+        tiempos = sorted(t for t, _ in datos_op)
+        a, d = antes.get(rutas[nombre], {}), despues.get(rutas[nombre], {})
+        cantidad = d.get("count", 0) - a.get("count", 0)
+        resultado[nombre] = {
+            "peticiones": len(datos_op),
+            "errores": sum(1 for _, c in datos_op if c == 0 or c >= 500),
+            "rechazos": sum(1 for _, c in datos_op if 400 <= c < 500),
+            "rps": round(len(datos_op) / args.duracion, 1),
+            "p50_ms": round(percentil(tiempos, 0.50) * 1000, 2),
+            "p95_ms": round(percentil(tiempos, 0.95) * 1000, 2),
+            "p99_ms": round(percentil(tiempos, 0.99) * 1000, 2),
+            # la ruta puede ser compartida por varias operaciones (GET y POST /inscripcion/)
+            "espera_pool_ms": round((d.get("sum", 0) - a.get("sum", 0)) / cantidad * 1000, 3) if cantidad else None,
+        }
+    todas = sorted(t for lista in muestras.values() for t, _ in lista)
+    total = {
+        "peticiones": len(todas),
+        "rps": round(len(todas) / args.duracion, 1),
+        "p50_ms": round(percentil(todas, 0.50) * 1000, 2) if todas else None,
+        "p95_ms": round(percentil(todas, 0.95) * 1000, 2) if todas else None,
+        "p99_ms": round(percentil(todas, 0.99) * 1000, 2) if todas else None,
+    }
+    return {
+        "escenario": args.escenario,
+        "clientes": args.clientes,
+        "duracion_s": args.duracion,
+        "workers": args.workers,
+        "operaciones": resultado,
+        "total": total,
+    }
+
+def imprimir(resultado):
+    print(f"escenario {resultado['escenario']}: {resultado['clientes']} clientes, {resultado['duracion_s']} s")
+    print(f"{'operacion':<18}{'pet':>8}{'err':>6}{'4xx':>6}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'pool':>9}")
+    filas = list(resultado["operaciones"].items()) + [("TOTAL", resultado["total"])]
+    for nombre, r in filas:
+        espera = r.get("espera_pool_ms")
+        print(
+            f"{nombre:<18}{r['peticiones']:>8}{r.get('errores', ''):>6}{r.get('rechazos', ''):>6}{r['rps']:>9}"
+            f"{r['p50_ms']:>9}{r['p95_ms']:>9}{r['p99_ms']:>9}{'' if espera is None else espera:>9}"
+        )
+
+def comparar(resultado, base, tolerancia):
+    # regresion: p95 sube o el throughput baja mas que la tolerancia
+    if base["escenario"] != resultado["escenario"]:
+        raise SystemExit(f"La base es del escenario {base['escenario']}, no de {resultado['escenario']}")
+    regresiones = []
+    for nombre, anterior in base["operaciones"].items():
+        actual = resultado["operaciones"].get(nombre)
+        if actual is None:
+            continue
+        if actual["p95_ms"] > anterior["p95_ms"] * (1 + tolerancia):
+            regresiones.append(f"{nombre}: p95 {anterior['p95_ms']} -> {actual['p95_ms']} ms")
+        if actual["rps"] < anterior["rps"] * (1 - tolerancia):
+            regresiones.append(f"{nombre}: rps {anterior['rps']} -> {actual['rps']}")
+        if actual["errores"] > anterior["errores"]:
+            regresiones.append(f"{nombre}: errores {anterior['errores']} -> {actual['errores']}")
+    return regresiones
+
+def levantar(args):
+    proceso = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(PUERTO),
+         "--workers", str(args.workers), "--log-level", "warning", "--no-access-log"],
+        cwd=RAIZ, env={"ACADEMIA_SECRETO": secrets.token_hex(32), **os.environ, "DB_URL": DB_URL}, stdout=subprocess.DEVNULL,
+    )
+    limite = time.monotonic() + 30
+    while time.monotonic() < limite:
+        try:
+            if httpx.get(f"{args.url}/metrics", timeout=1).status_code == 200:
+                return proceso
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    proceso.terminate()
+    raise SystemExit("uvicorn no respondio en 30 s")
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga de la API academia")
+    parser.add_argument("--escenario", choices=ESCENARIOS, default="lecturas")
+    parser.add_argument("--clientes", type=int, default=50)
+    parser.add_argument("--duracion", type=float, default=30)
+    parser.add_argument("--calentamiento", type=float, default=5)
+    parser.add_argument("--workers", type=int, default=1, help="la espera del pool solo es exacta con 1")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--url", help="usar una API ya levantada en vez de iniciar uvicorn")
+    parser.add_argument("--guardar", help="escribe el resultado en este JSON")
+    parser.add_argument("--base", help="JSON de referencia para detectar regresiones")
+    parser.add_argument("--tolerancia", type=float, default=TOLERANCIA)
+    args = parser.parse_args()
+    if httpx is None:
+        raise SystemExit("La prueba de carga necesita httpx: pip install httpx")
+
+    datos = leer_datos()
+    proceso = None
+    if args.url is None:
+        args.url = f"http://127.0.0.1:{PUERTO}"
+        proceso = levantar(args)
+    try:
+        resultado = asyncio.run(correr(args, datos))
+    finally:
+        if proceso is not None:
+            proceso.terminate()
+            proceso.wait()
+
+    imprimir(resultado)
+    if args.guardar:
+        Path(args.guardar).write_text(json.dumps(resultado, indent=2) + "\n")
+    if args.base:
+        regresiones = comparar(resultado, json.loads(Path(args.base).read_text()), args.tolerancia)
+        if regresiones:
+            print("\nREGRESIONES:")
+            for r in regresiones:
+                print(f"  {r}")
+            sys.exit(1)
+        print("\nsin regresiones contra la base")
+
+if __name__ == "__main__":
+    main()
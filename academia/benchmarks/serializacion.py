@@ -0,0 +1,65 @@
+import json
+import sys
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi.encoders import jsonable_encoder
+from config.respuestas import BACKENDS, RespuestaJSON
+
+# Compara el camino de FastAPI por defecto (jsonable_encoder + json) con RespuestaJSON
+# sobre filas como las de GET /nota/ (dict_row con DECIMAL(5,2) y DATE).
+# Uso: python benchmarks/serializacion.py [filas] [repeticiones]
+
+def filas_notas(cantidad):
+    inicio = date(2024, 1, 1)
+    return [
+        {
+            "id_nota": i,
+            "id_inscripcion": i,
+            "id_docente": i % 200 + 1,
+            "nota": Decimal(f"{i % 100}.{i % 100:02d}"),
+            "fecha_registro": inicio + timedelta(days=i % 365),
+        }
+        for i in range(1, cantidad + 1)
+    ]
+
+def medir(funcion, filas, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        cuerpo = funcion(filas)
+        tiempos.append(time.perf_counter() - inicio)
+    return min(tiempos), len(cuerpo)
+
+def por_defecto(filas):
+    return json.dumps(
+        jsonable_encoder(filas), ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+
+def main():
+    cantidad = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    repeticiones = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    filas = filas_notas(cantidad)
+
+    base, tamano = medir(por_defecto, filas, repeticiones)
+    print(f"{cantidad} filas, mejor de {repeticiones}")
+    print(f"{'jsonable_encoder+json':<24}{base * 1000:>10.1f} ms{tamano:>12} bytes")
+
+    for nombre, crear in BACKENDS.items():
+        try:
+            serializar = crear()
+        except ImportError:
+            print(f"{nombre:<24}{'no instalado':>13}")
+            continue
+        tiempo, tamano = medir(serializar, filas, repeticiones)
+        print(f"{nombre:<24}{tiempo * 1000:>10.1f} ms{tamano:>12} bytes  x{base / tiempo:.1f}")
+
+    tiempo, _ = medir(lambda f: RespuestaJSON(f).body, filas, repeticiones)
+    print(f"{'RespuestaJSON':<24}{tiempo * 1000:>10.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+import asyncio
+import os
+from config.conexionDB import conexion
+
+# Admision de inscripciones: una cola por clase en cada worker. Las solicitudes que
+# llegan mientras se procesa un lote esperan y entran juntas en el siguiente: un solo
+# SELECT ... FOR UPDATE sobre la clase (que tambien serializa a los demas workers) y
+# un solo INSERT por lote, en orden de llegada, hasta llenar el cupo.
+MAX_LOTE = int(os.getenv("ADMISION_MAX_LOTE", "200"))
+MAX_COLA = int(os.getenv("ADMISION_MAX_COLA", "5000"))
+
+INSCRITO = "inscrito"
+SIN_CUPO = "sin_cupo"
+DUPLICADA = "duplicada"
+CLASE_INEXISTENTE = "clase_inexistente"
+ALUMNO_INEXISTENTE = "alumno_inexistente"
+
+class ColaLlena(Exception):
+    pass
+
+class Admision:
+    def __init__(self, max_lote=MAX_LOTE, max_cola=MAX_COLA):
+        self.max_lote = max_lote
+        self.max_cola = max_cola
+        self._colas = {}
+        self._tareas = {}
+
+    async def inscribir(self, id_clase, id_alumno, fecha=None):
+        cola = self._colas.setdefault(id_clase, [])
+        if len(cola) >= self.max_cola:
+            raise ColaLlena(id_clase)
+        futuro = asyncio.get_running_loop().create_future()
+        cola.append((id_alumno, fecha, futuro))
+        if id_clase not in self._tareas:
+            self._tareas[id_clase] = asyncio.create_task(self._atender(id_clase))
+        return await asyncio.shield(futuro)
+
+    async def _atender(self, id_clase):
+        try:
+            while self._colas.get(id_clase):
+                cola = self._colas[id_clase]
+                lote, self._colas[id_clase] = cola[:self.max_lote], cola[self.max_lote:]
+                try:
+                    resultados = await self._procesar(id_clase, lote)
+                except Exception as e:
+                    for _, _, futuro in lote:
+                        if not futuro.done():
+                            futuro.set_exception(e)
+                            futuro.add_done_callback(lambda f: f.exception())
+                    continue
+                for (_, _, futuro), resultado in zip(lote, resultados):
+                    if not futuro.done():
+                        futuro.set_result(resultado)
+        finally:
+            self._colas.pop(id_clase, None)
+            self._tareas.pop(id_clase, None)
+
+    async def _procesar(self, id_clase, lote):
+        alumnos = [id_alumno for id_alumno, _, _ in lote]
+        async with conexion(cancelable=False) as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute("SELECT cupo FROM clase WHERE id_clase = %s FOR UPDATE", (id_clase,))
+                clase = await cursor.fetchone()
+                if clase is None:
+                    await conn.rollback()
+                    return [{"estado": CLASE_INEXISTENTE}] * len(lote)
+
+                await cursor.execute("SELECT count(*) AS inscritos FROM inscripcion WHERE id_clase = %s", (id_clase,))
+                libres = clase["cupo"] - (await cursor.fetchone())["inscritos"]
+                await cursor.execute(
+                    "SELECT id_alumno FROM inscripcion WHERE id_clase = %s AND id_alumno = ANY(%s)",
+                    (id_clase, alumnos),
+                )
+                inscritos = {f["id_alumno"] for f in await cursor.fetchall()}
+                await cursor.execute("SELECT id_alumno FROM alumno WHERE id_alumno = ANY(%s)", (alumnos,))
+                existentes = {f["id_alumno"] for f in await cursor.fetchall()}
+
+                resultados, aceptados = [], []
+                for id_alumno, fecha, _ in lote:
+                    if id_alumno not in existentes:
+                        resultados.append({"estado": ALUMNO_INEXISTENTE})
+                    elif id_alumno in inscritos:
+                        resultados.append({"estado": DUPLICADA})
+                    elif libres <= 0:
+                        resultados.append({"estado": SIN_CUPO})
+                    else:
+                        inscritos.add(id_alumno)
+                        libres -= 1
+                        aceptados.append((id_alumno, fecha))
+                        resultados.append(None)
+
+                ids = {}
+                if aceptados:
+                    await cursor.execute(
+                        """
+                        INSERT INTO inscripcion(id_alumno, id_clase, fecha_inscripcion)
+                        SELECT a, %s, COALESCE(f, CURRENT_DATE)
+                        FROM unnest(%s::int[], %s::date[]) AS t(a, f)
+                        RETURNING id_inscripcion, id_alumno
+                        """,
+                        (id_clase, [a for a, _ in aceptados], [f for _, f in aceptados]),
+                    )
+                    ids = {f["id_alumno"]: f["id_inscripcion"] for f in await cursor.fetchall()}
+                await conn.commit()
+
+        for i, (id_alumno, _, _) in enumerate(lote):
+            if resultados[i] is None:
+                resultados[i] = {"estado": INSCRITO, "id_inscripcion": ids[id_alumno]}
+        return resultados
+
+    def estadisticas(self):
+        return {
+            "clases_activas": len(self._tareas),
+            "en_cola": sum(len(c) for c in self._colas.values()),
+        }
+
+admision = Admision()
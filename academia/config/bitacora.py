@@ -0,0 +1,159 @@
+import copy
+import json
+import logging
+import os
+import queue
+import random
+import re
+import sys
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from starlette.datastructures import MutableHeaders
+from config import metricas
+
+# Logs en JSON, una linea por evento. El loop solo arma el registro y lo deja en una cola
+# acotada; un hilo aparte lo formatea y lo escribe. Si la cola se llena (rafaga de errores
+# con stdout lento) se descarta y se cuenta, nunca se bloquea el loop.
+# Cada linea lleva el id de la peticion (X-Request-ID, recibido o generado) y los ms desde
+# que empezo, asi los logs de una peticion se leen como una traza.
+#   LOG_NIVEL:    DEBUG, INFO, WARNING, ERROR
+#   LOG_MUESTREO: fraccion de peticiones cuyos logs por debajo de WARNING se escriben; se
+#                 decide por peticion para no cortar trazas a la mitad
+NIVEL = os.getenv("LOG_NIVEL", "INFO").upper()
+MUESTREO = float(os.getenv("LOG_MUESTREO", "1"))
+MAX_COLA = int(os.getenv("LOG_MAX_COLA", "10000"))
+CABECERA_ID = "x-request-id"
+
+id_peticion = ContextVar("id_peticion", default=None)
+inicio_peticion = ContextVar("inicio_peticion", default=None)
+muestreada = ContextVar("muestreada", default=True)
+
+log = logging.getLogger("academia.peticion")
+
+# atributos propios de LogRecord; lo demas vino en extra= y va al JSON
+_ESTANDAR = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+class FormatoJSON(logging.Formatter):
+    def format(self, registro):
+        datos = {
+            "fecha": datetime.fromtimestamp(registro.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "nivel": registro.levelname,
+            "logger": registro.name,
+            "mensaje": registro.getMessage(),
+        }
+        for clave, valor in vars(registro).items():
+            if clave not in _ESTANDAR and valor is not None:
+                datos[clave] = valor
+        if registro.exc_info and not registro.exc_text:
+            registro.exc_text = self.formatException(registro.exc_info)
+        if registro.exc_text:
+            datos["error"] = registro.exc_text
+        return json.dumps(datos, ensure_ascii=False, default=str)
+
+class ContextoPeticion(logging.Filter):
+    # corre en el hilo que loguea (el del loop), donde estan las ContextVar de la peticion
+    def filter(self, registro):
+        if registro.levelno < logging.WARNING and not muestreada.get():
+            return False
+        registro.id_peticion = id_peticion.get()
+        inicio = inicio_peticion.get()
+        if inicio is not None:
+            registro.transcurrido_ms = round((time.perf_counter() - inicio) * 1000, 2)
+        return True
+
+class ColaSinBloqueo(QueueHandler):
+    def prepare(self, registro):
+        # el QueueHandler original pega la traza al mensaje; aqui queda aparte para el JSON
+        registro = copy.copy(registro)
+        registro.message = registro.getMessage()
+        registro.msg, registro.args = registro.message, None
+        return registro
+
+    def enqueue(self, registro):
+        try:
+            self.queue.put_nowait(registro)
+        except queue.Full:
+            metricas.logs_descartados.sumar()
+
+_escucha = None
+
+def configurar_bitacora():
+    global _escucha
+    if _escucha is not None:
+        return
+    salida = logging.StreamHandler(sys.stdout)
+    salida.setFormatter(FormatoJSON())
+    cola = queue.Queue(MAX_COLA)
+    manejador = ColaSinBloqueo(cola)
+    manejador.addFilter(ContextoPeticion())
+    # en la raiz: tambien llegan los de las librerias (psycopg.pool); uvicorn tiene los suyos
+    raiz = logging.getLogger()
+    raiz.setLevel(NIVEL)
+    raiz.addHandler(manejador)
+    _escucha = QueueListener(cola, salida, respect_handler_level=True)
+    _escucha.start()
+
+def detener_bitacora():
+    global _escucha
+    if _escucha is not None:
+        # escribe lo que quedo en la cola
+        _escucha.stop()
+        _escucha = None
+
+def _id_recibido(scope):
+    for nombre, valor in scope["headers"]:
+        if nombre == CABECERA_ID.encode():
+            valor = valor.decode("latin-1")
+            if re.fullmatch(r"[\w.-]{1,64}", valor):
+                return valor
+    return None
+
+class MiddlewareBitacora:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        identificador = _id_recibido(scope) or uuid.uuid4().hex
+        inicio = time.perf_counter()
+        tokens = [
+            id_peticion.set(identificador),
+            inicio_peticion.set(inicio),
+            muestreada.set(MUESTREO >= 1 or random.random() < MUESTREO),
+        ]
+        codigo = 500
+
+        async def enviar(mensaje):
+            nonlocal codigo
+            if mensaje["type"] == "http.response.start":
+                codigo = mensaje["status"]
+                MutableHeaders(scope=mensaje)[CABECERA_ID] = identificador
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            # 499, 503 y 504 son cortes esperables (desconexion, saturacion, tiempo limite)
+            if codigo in (499, 503, 504):
+                nivel = logging.WARNING
+            else:
+                nivel = logging.ERROR if codigo >= 500 else logging.INFO
+            log.log(
+                nivel,
+                "peticion",
+                extra={
+                    "metodo": scope["method"],
+                    "ruta": metricas.ruta_plantilla(scope),
+                    "ruta_real": scope["path"],
+                    "codigo": codigo,
+                    "duracion_ms": round((time.perf_counter() - inicio) * 1000, 2),
+                },
+            )
+            for variable, token in zip((id_peticion, inicio_peticion, muestreada), tokens):
+                variable.reset(token)
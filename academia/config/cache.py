@@ -0,0 +1,57 @@
+import time
+
+# Canal que usan los triggers notificar_catalogo() de migraciones/0003
+CANAL = "catalogo"
+# respaldo por si se pierde un NOTIFY (reconexion del listener)
+TTL_SEGUNDOS = 300
+# tope de claves por tabla (combinaciones de after_id/limit en los listados)
+MAX_ENTRADAS = 1024
+
+class CacheCatalogo:
+    def __init__(self, ttl=TTL_SEGUNDOS):
+        self.ttl = ttl
+        self._entradas = {}
+        self._generaciones = {}
+        self._contadores = {}
+
+    def _contador(self, tabla):
+        return self._contadores.setdefault(tabla, {"aciertos": 0, "fallos": 0, "invalidaciones": 0})
+
+    async def obtener(self, tabla, clave, cargar):
+        entradas = self._entradas.setdefault(tabla, {})
+        entrada = entradas.get(clave)
+        if entrada is not None and entrada[0] > time.monotonic():
+            self._contador(tabla)["aciertos"] += 1
+            return entrada[1]
+
+        self._contador(tabla)["fallos"] += 1
+        generacion = self._generaciones.get(tabla, 0)
+        valor = await cargar()
+        # si hubo una invalidacion mientras se consultaba, el valor ya puede estar viejo
+        if self._generaciones.get(tabla, 0) == generacion:
+            if len(entradas) >= MAX_ENTRADAS:
+                entradas.clear()
+            entradas[clave] = (time.monotonic() + self.ttl, valor)
+        return valor
+
+    def invalidar(self, tabla):
+        self._entradas.pop(tabla, None)
+        self._generaciones[tabla] = self._generaciones.get(tabla, 0) + 1
+        self._contador(tabla)["invalidaciones"] += 1
+
+    def invalidar_todo(self):
+        for tabla in list(self._entradas):
+            self.invalidar(tabla)
+
+    def estadisticas(self):
+        tablas = {}
+        for tabla, contador in self._contadores.items():
+            consultas = contador["aciertos"] + contador["fallos"]
+            tablas[tabla] = {
+                **contador,
+                "entradas": len(self._entradas.get(tabla, {})),
+                "tasa_aciertos": round(contador["aciertos"] / consultas, 4) if consultas else None,
+            }
+        return {"ttl_segundos": self.ttl, "tablas": tablas}
+
+cache_catalogo = CacheCatalogo()
@@ -0,0 +1,191 @@
+import codecs
+import csv
+import json
+from collections import deque
+from itertools import zip_longest
+from fastapi import HTTPException, Request
+from pydantic import ValidationError
+
+# Carga masiva: las filas validas se copian con COPY FROM STDIN a una tabla
+# temporal, se validan en bloque con SQL y se insertan con un solo INSERT ... SELECT.
+# El cuerpo no se junta en memoria: se lee por trozos de request.stream() y cada fila
+# pasa al COPY apenas esta completa.
+
+_json = json.JSONDecoder()
+
+def _vacio(valor):
+    return valor if valor != "" else None
+
+async def _filas_csv(request):
+    # un registro termina en un salto de linea con las comillas cerradas (un campo entre
+    # comillas puede tener saltos); el lector solo recibe registros completos
+    decodificador = codecs.getincrementaldecoder("utf-8-sig")()
+    completos = deque()
+    lector = csv.reader(iter(completos.popleft, None))
+    encabezado = None
+    registro, comillas, resto = [], 0, ""
+    async for trozo in request.stream():
+        try:
+            partes = (resto + decodificador.decode(trozo, final=not trozo)).split("\n")
+        except UnicodeDecodeError:
+            raise HTTPException(status_code=400, detail="El CSV debe estar en UTF-8")
+        resto = partes.pop()
+        for parte in partes:
+            registro.append(parte)
+            comillas += parte.count('"')
+            if comillas % 2 == 0:
+                completos.append("\n".join(registro) + "\n")
+                registro, comillas = [], 0
+        while completos:
+            fila = next(lector)
+            if encabezado is None:
+                encabezado = fila
+            elif fila:
+                yield {k: _vacio(v) for k, v in zip_longest(encabezado, fila)}
+    if resto:
+        registro.append(resto)
+        comillas += resto.count('"')
+    if comillas % 2:
+        raise HTTPException(status_code=400, detail="CSV invalido: comillas sin cerrar")
+    if registro:
+        fila = next(csv.reader(["\n".join(registro)]), [])
+        if encabezado is not None and fila:
+            yield {k: _vacio(v) for k, v in zip_longest(encabezado, fila)}
+
+async def _filas_json(request):
+    # arreglo JSON leido elemento por elemento: se decodifica cada uno en cuanto llega
+    # completo y se descarta del buffer
+    decodificador = codecs.getincrementaldecoder("utf-8-sig")()
+    texto, inicio, final = "", False, False
+    flujo = request.stream()
+    while not final:
+        trozo = await anext(flujo, b"")
+        final = not trozo
+        try:
+            texto += decodificador.decode(trozo, final=final)
+        except UnicodeDecodeError:
+            raise HTTPException(status_code=400, detail="El cuerpo debe estar en UTF-8")
+        posicion = 0
+        while True:
+            while posicion < len(texto) and texto[posicion] in " \t\r\n,":
+                posicion += 1
+            if posicion == len(texto):
+                break
+            if not inicio:
+                if texto[posicion] != "[":
+                    raise HTTPException(status_code=400, detail="El cuerpo debe ser un arreglo JSON")
+                inicio = True
+                posicion += 1
+                continue
+            if texto[posicion] == "]":
+                return
+            try:
+                registro, fin = _json.raw_decode(texto, posicion)
+            except ValueError:
+                if final:
+                    raise HTTPException(status_code=400, detail="El cuerpo debe ser un arreglo JSON o un CSV (text/csv)")
+                break
+            if fin == len(texto) and not final:
+                # un numero al final del trozo puede seguir en el proximo
+                break
+            yield registro
+            posicion = fin
+        texto = texto[posicion:]
+    raise HTTPException(status_code=400, detail="El cuerpo debe ser un arreglo JSON o un CSV (text/csv)")
+
+def existe(columna, tabla, columna_ref=None):
+    columna_ref = columna_ref or columna
+    return (
+        f"{columna} no existe en {tabla}",
+        f"SELECT fila FROM {{carga}} c WHERE NOT EXISTS "
+        f"(SELECT 1 FROM {tabla} t WHERE t.{columna_ref} = c.{columna})",
+    )
+
+def unico(columnas, tabla):
+    # repetido en la tabla destino o dentro del mismo lote (se conserva la primera fila);
+    # columnas puede ser una columna o una tupla para claves compuestas
+    if isinstance(columnas, str):
+        columnas = (columnas,)
+    iguales = " AND ".join(f"t.{c} = c.{c}" for c in columnas)
+    lista = ", ".join(columnas)
+    return (
+        f"{lista} ya registrado",
+        f"SELECT fila FROM {{carga}} c WHERE EXISTS (SELECT 1 FROM {tabla} t WHERE {iguales}) "
+        f"UNION SELECT fila FROM (SELECT fila, row_number() OVER (PARTITION BY {lista} ORDER BY fila) AS n "
+        f"FROM {{carga}}) d WHERE d.n > 1",
+    )
+
+class CargaMasiva:
+    def __init__(self, tabla, columna_id, modelo, validaciones=(), por_defecto=None):
+        self.tabla = tabla
+        self.columna_id = columna_id
+        self.modelo = modelo
+        self.columnas = list(modelo.model_fields)
+        self.validaciones = validaciones
+        self.por_defecto = por_defecto or {}
+        self.temporal = f"carga_{tabla}"
+
+    def _leer(self, request: Request):
+        if request.headers.get("content-type", "").startswith("text/csv"):
+            return _filas_csv(request)
+        return _filas_json(request)
+
+    async def ejecutar(self, conn, request: Request, atomico=False):
+        errores = []
+        columnas = ", ".join(self.columnas)
+
+        async with conn.cursor() as cursor:
+            await cursor.execute(
+                f"CREATE TEMP TABLE {self.temporal} (fila INT, LIKE {self.tabla} INCLUDING DEFAULTS) ON COMMIT DROP"
+            )
+            await cursor.execute(f"ALTER TABLE {self.temporal} ALTER COLUMN {self.columna_id} DROP NOT NULL")
+
+            total = 0
+            async with cursor.copy(f"COPY {self.temporal} (fila, {columnas}) FROM STDIN") as copia:
+                async for registro in self._leer(request):
+                    total += 1
+                    try:
+                        valido = self.modelo.model_validate(registro)
+                    except ValidationError as e:
+                        detalle = "; ".join(
+                            f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors()
+                        )
+                        errores.append({"fila": total, "error": detalle})
+                        continue
+                    await copia.write_row((total, *(getattr(valido, c) for c in self.columnas)))
+
+            await cursor.execute(f"ANALYZE {self.temporal}")
+
+            for mensaje, consulta in self.validaciones:
+                await cursor.execute(consulta.format(carga=self.temporal))
+                invalidas = [f["fila"] for f in await cursor.fetchall()]
+                if invalidas:
+                    errores.extend({"fila": f, "error": mensaje} for f in invalidas)
+                    await cursor.execute(f"DELETE FROM {self.temporal} WHERE fila = ANY(%s)", (invalidas,))
+
+            if atomico and errores:
+                await conn.rollback()
+                return {"insertados": 0, "ids": [], "errores": sorted(errores, key=lambda e: e["fila"])}
+
+            # los ids se reservan antes del INSERT para poder devolverlos por fila
+            await cursor.execute(
+                f"UPDATE {self.temporal} SET {self.columna_id} = "
+                f"nextval(pg_get_serial_sequence('{self.tabla}', '{self.columna_id}')) "
+                f"RETURNING fila, {self.columna_id}"
+            )
+            ids = sorted(await cursor.fetchall(), key=lambda f: f["fila"])
+
+            seleccion = ", ".join(
+                f"COALESCE({c}, {self.por_defecto[c]})" if c in self.por_defecto else c for c in self.columnas
+            )
+            await cursor.execute(
+                f"INSERT INTO {self.tabla} ({self.columna_id}, {columnas}) OVERRIDING SYSTEM VALUE "
+                f"SELECT {self.columna_id}, {seleccion} FROM {self.temporal} ORDER BY fila"
+            )
+            await conn.commit()
+
+        return {
+            "insertados": len(ids),
+            "ids": ids,
+            "errores": sorted(errores, key=lambda e: e["fila"]),
+        }
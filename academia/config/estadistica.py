@@ -0,0 +1,111 @@
+from typing import Literal
+from psycopg import IsolationLevel
+
+# Estadisticas de notas mantenidas por los triggers de migraciones/0007 (estadistica_nota y
+# estadistica_valor). Aqui solo se leen: cada consulta toca las filas de un grupo, no notas.
+Ambito = Literal["clase", "docente", "carrera"]
+MAX_DIFERENCIAS = 100
+
+CONSULTA_RESUMEN = """
+    WITH v AS (
+        SELECT nota, cantidad,
+               sum(cantidad) OVER (ORDER BY nota) - cantidad AS antes,
+               sum(cantidad) OVER (ORDER BY nota) AS hasta
+        FROM estadistica_valor
+        WHERE ambito = %(ambito)s AND id_ambito = %(id)s
+    ), h AS (
+        SELECT LEAST(floor(nota / 10), 9)::INT AS tramo, sum(cantidad)::INT AS cantidad
+        FROM v GROUP BY 1
+    )
+    SELECT e.cantidad,
+           round(e.suma / e.cantidad, 2) AS promedio,
+           round(e.aprobados::DECIMAL / e.cantidad, 4) AS tasa_aprobacion,
+           e.aprobados,
+           nota_aprobacion() AS nota_aprobacion,
+           (SELECT min(nota) FROM v) AS minimo,
+           (SELECT max(nota) FROM v) AS maximo,
+           (SELECT (min(nota) FILTER (WHERE (e.cantidad + 1) / 2 > antes AND (e.cantidad + 1) / 2 <= hasta)
+                  + min(nota) FILTER (WHERE e.cantidad / 2 + 1 > antes AND e.cantidad / 2 + 1 <= hasta)) / 2
+            FROM v) AS mediana,
+           (SELECT json_agg(json_build_object('desde', t * 10, 'hasta', t * 10 + 10, 'cantidad', COALESCE(h.cantidad, 0))
+                            ORDER BY t)
+            FROM generate_series(0, 9) AS t LEFT JOIN h ON h.tramo = t) AS histograma
+    FROM estadistica_nota e
+    WHERE e.ambito = %(ambito)s AND e.id_ambito = %(id)s
+"""
+
+CONSULTA_LISTADO = """
+    SELECT id_ambito, cantidad,
+           round(suma / cantidad, 2) AS promedio,
+           round(aprobados::DECIMAL / cantidad, 4) AS tasa_aprobacion
+    FROM estadistica_nota
+    WHERE ambito = %s AND id_ambito > %s
+    ORDER BY id_ambito
+    LIMIT %s
+"""
+
+# Diferencias entre lo acumulado y un recalculo completo desde notas (estadistica_base)
+CONSULTA_VERIFICAR_RESUMEN = """
+    WITH esperado AS (
+        SELECT ambito, id_ambito, count(*)::INT AS cantidad, sum(nota) AS suma,
+               (count(*) FILTER (WHERE nota >= nota_aprobacion()))::INT AS aprobados
+        FROM estadistica_base GROUP BY 1, 2
+    )
+    SELECT ambito, id_ambito,
+           e.cantidad AS cantidad_esperada, r.cantidad,
+           e.suma AS suma_esperada, r.suma,
+           e.aprobados AS aprobados_esperados, r.aprobados
+    FROM esperado e FULL JOIN estadistica_nota r USING (ambito, id_ambito)
+    WHERE (e.cantidad, e.suma, e.aprobados) IS DISTINCT FROM (r.cantidad, r.suma, r.aprobados)
+    ORDER BY ambito, id_ambito
+    LIMIT %s
+"""
+
+CONSULTA_VERIFICAR_VALORES = """
+    WITH esperado AS (
+        SELECT ambito, id_ambito, nota, count(*)::INT AS cantidad
+        FROM estadistica_base GROUP BY 1, 2, 3
+    )
+    SELECT ambito, id_ambito, nota, e.cantidad AS cantidad_esperada, r.cantidad
+    FROM esperado e FULL JOIN estadistica_valor r USING (ambito, id_ambito, nota)
+    WHERE e.cantidad IS DISTINCT FROM r.cantidad
+    ORDER BY ambito, id_ambito, nota
+    LIMIT %s
+"""
+
+async def resumen(conn, ambito, id_ambito):
+    async with conn.cursor() as cursor:
+        await cursor.execute(CONSULTA_RESUMEN, {"ambito": ambito, "id": id_ambito})
+        return await cursor.fetchone()
+
+async def listar(conn, ambito, after_id, limit):
+    async with conn.cursor() as cursor:
+        await cursor.execute(CONSULTA_LISTADO, (ambito, after_id, limit))
+        return await cursor.fetchall()
+
+async def verificar(conn, reparar=False):
+    # lee con una sola foto de la base: las notas que cambian durante la verificacion
+    # no aparecen como diferencias
+    await conn.set_isolation_level(IsolationLevel.REPEATABLE_READ)
+    try:
+        async with conn.cursor() as cursor:
+            await cursor.execute(CONSULTA_VERIFICAR_RESUMEN, (MAX_DIFERENCIAS,))
+            resumenes = await cursor.fetchall()
+            await cursor.execute(CONSULTA_VERIFICAR_VALORES, (MAX_DIFERENCIAS,))
+            valores = await cursor.fetchall()
+    finally:
+        await conn.rollback()
+        await conn.set_isolation_level(None)
+
+    reparado = False
+    if reparar and (resumenes or valores):
+        async with conn.cursor() as cursor:
+            await cursor.execute("SELECT estadistica_recalcular()")
+        await conn.commit()
+        reparado = True
+    return {
+        "consistente": not resumenes and not valores,
+        "diferencias_resumen": resumenes,
+        "diferencias_valores": valores,
+        "reparado": reparado,
+    }
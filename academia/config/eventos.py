@@ -0,0 +1,123 @@
+import asyncio
+import json
+import logging
+import psycopg
+from config import metricas
+from config.cache import cache_catalogo, CANAL
+from config.conexionDB import DB_URL
+from config.versiones import CANAL_VERSION, versiones_tablas
+
+# Canal de los triggers notificar_notas() y notificar_inscripcion() de migraciones/0008
+CANAL_CAMBIOS = "cambios"
+# eventos pendientes por suscriptor; si un cliente lento lo llena se le pide reiniciar
+MAX_PENDIENTES = 256
+ESPERA_RECONEXION = 5
+
+REINICIAR = None
+
+log = logging.getLogger(__name__)
+
+class Suscripcion:
+    def __init__(self, claves):
+        self.claves = claves
+        self.cola = asyncio.Queue(MAX_PENDIENTES)
+
+    def entregar(self, evento):
+        try:
+            self.cola.put_nowait(evento)
+            return True
+        except asyncio.QueueFull:
+            self.reiniciar()
+            return False
+
+    def reiniciar(self):
+        # descarta lo pendiente: el cliente debe volver a consultar y suscribirse
+        while not self.cola.empty():
+            self.cola.get_nowait()
+        self.cola.put_nowait(REINICIAR)
+
+class Difusor:
+    # reparte cada aviso de la base a los suscriptores de su alumno o su clase
+    def __init__(self):
+        self._suscritos = {}
+        self.publicados = 0
+        self.descartados = 0
+
+    def suscribir(self, claves):
+        suscripcion = Suscripcion(claves)
+        for clave in claves:
+            self._suscritos.setdefault(clave, set()).add(suscripcion)
+        metricas.suscriptores_eventos.fijar(self.total())
+        return suscripcion
+
+    def cancelar(self, suscripcion):
+        for clave in suscripcion.claves:
+            suscritos = self._suscritos.get(clave)
+            if suscritos is not None:
+                suscritos.discard(suscripcion)
+                if not suscritos:
+                    del self._suscritos[clave]
+        metricas.suscriptores_eventos.fijar(self.total())
+
+    def publicar(self, texto):
+        evento = json.loads(texto)
+        claves = [("alumno", evento.get("id_alumno")), ("clase", evento.get("id_clase"))]
+        if evento.get("anterior"):
+            claves += [("alumno", evento["anterior"]["id_alumno"]), ("clase", evento["anterior"]["id_clase"])]
+        destinos = set()
+        for clave in claves:
+            destinos.update(self._suscritos.get(clave, ()))
+        for suscripcion in destinos:
+            if not suscripcion.entregar((evento["tabla"], texto)):
+                self.descartados += 1
+        self.publicados += 1
+        metricas.eventos_publicados.sumar(evento["tabla"])
+
+    def reiniciar_todos(self):
+        # se perdio la escucha: los avisos de ese intervalo no llegaron a nadie
+        for suscripcion in {s for suscritos in self._suscritos.values() for s in suscritos}:
+            suscripcion.reiniciar()
+
+    def total(self):
+        return len({s for suscritos in self._suscritos.values() for s in suscritos})
+
+    def estadisticas(self):
+        return {
+            "suscriptores": self.total(),
+            "claves": len(self._suscritos),
+            "publicados": self.publicados,
+            "descartados": self.descartados,
+        }
+
+difusor = Difusor()
+
+async def escuchar_cambios():
+    # una sola conexion dedicada (fuera del pool) por worker para todos los NOTIFY:
+    # invalidaciones del cache de catalogos, versiones de las tablas y el feed de notas
+    # e inscripciones
+    while True:
+        try:
+            async with await psycopg.AsyncConnection.connect(DB_URL, autocommit=True) as conn:
+                await conn.execute(f"LISTEN {CANAL}")
+                await conn.execute(f"LISTEN {CANAL_CAMBIOS}")
+                await conn.execute(f"LISTEN {CANAL_VERSION}")
+                # mientras no habia escucha se pudieron perder avisos
+                cache_catalogo.invalidar_todo()
+                difusor.reiniciar_todos()
+                ultimo = await (await conn.execute("SELECT last_value FROM version_cambio")).fetchone()
+                versiones_tablas.reiniciar(ultimo[0])
+                async for aviso in conn.notifies():
+                    if aviso.channel == CANAL_VERSION:
+                        versiones_tablas.aplicar(aviso.payload)
+                    elif aviso.channel == CANAL_CAMBIOS:
+                        difusor.publicar(aviso.payload)
+                    else:
+                        cache_catalogo.invalidar(aviso.payload)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            log.warning("Se perdio la escucha de cambios: %s", e)
+            cache_catalogo.invalidar_todo()
+            difusor.reiniciar_todos()
+            versiones_tablas.desconectar()
+            await asyncio.sleep(ESPERA_RECONEXION)
@@ -0,0 +1,138 @@
+import asyncio
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from psycopg import sql
+from config.conexionDB import conexion
+from config.respuestas import iniciar_flujo
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+# Exportaciones completas con COPY ... TO STDOUT: Postgres envia los datos en trozos que
+# se pasan directo a la respuesta, sin armar la lista en memoria ni pasar por JSON.
+#   csv:     los bytes de COPY tal cual, agrupados en trozos de TAMANO_TROZO
+#   parquet: COPY binario, un row group cada FILAS_POR_GRUPO filas (requiere pyarrow)
+TAMANO_TROZO = 256 * 1024
+FILAS_POR_GRUPO = 65_536
+
+FORMATOS = {
+    "csv": "text/csv; charset=utf-8",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+def _tipo_arrow(tipo):
+    return {
+        "int4": pa.int32(),
+        "int8": pa.int64(),
+        "text": pa.string(),
+        "date": pa.date32(),
+        "numeric": pa.decimal128(5, 2),
+    }[tipo]
+
+class _Salida:
+    # destino de ParquetWriter: acumula lo escrito hasta que el generador lo envia
+    def __init__(self):
+        self.partes = []
+        self.posicion = 0
+        self.closed = False
+
+    def write(self, datos):
+        self.partes.append(bytes(datos))
+        self.posicion += len(datos)
+        return len(datos)
+
+    def tell(self):
+        return self.posicion
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def vaciar(self):
+        datos, self.partes = b"".join(self.partes), []
+        return datos
+
+class Exportacion:
+    # columnas: [(nombre, tipo postgres)] en el orden del SELECT
+    # filtros: nombre del parametro -> columna de la consulta (p. ej. "c.periodo")
+    def __init__(self, nombre, consulta, columnas, filtros):
+        self.nombre = nombre
+        self.consulta = consulta
+        self.columnas = columnas
+        self.filtros = filtros
+
+    def _armar(self, valores):
+        condiciones = [
+            sql.SQL("{} = {}").format(sql.SQL(self.filtros[nombre]), sql.Literal(valor))
+            for nombre, valor in valores.items()
+            if valor is not None
+        ]
+        consulta = sql.SQL(self.consulta)
+        if condiciones:
+            consulta = sql.SQL("{} WHERE {}").format(consulta, sql.SQL(" AND ").join(condiciones))
+        return consulta
+
+    def _archivo(self, formato, valores):
+        sufijo = "_".join(str(v) for v in valores.values() if v is not None)
+        return f"{self.nombre}_{sufijo}.{formato}" if sufijo else f"{self.nombre}.{formato}"
+
+    async def responder(self, formato, **valores):
+        if formato == "parquet" and pa is None:
+            raise HTTPException(status_code=501, detail="Exportacion parquet no disponible: falta pyarrow")
+        consulta = self._armar(valores)
+        generar = self._csv if formato == "csv" else self._parquet
+        # la conexion se toma y el COPY arranca antes de responder 200
+        flujo = await iniciar_flujo(generar(consulta), f"No se pudo exportar {self.nombre}")
+        return StreamingResponse(
+            flujo,
+            media_type=FORMATOS[formato],
+            headers={"Content-Disposition": f'attachment; filename="{self._archivo(formato, valores)}"'},
+        )
+
+    async def _csv(self, consulta):
+        copia = sql.SQL("COPY ({}) TO STDOUT WITH (FORMAT csv, HEADER)").format(consulta)
+        async with conexion() as conn:
+            async with conn.cursor() as cursor:
+                async with cursor.copy(copia) as copy:
+                    # COPY entrega una fila por mensaje: se juntan para no enviar millones de trozos
+                    trozo = bytearray()
+                    async for datos in copy:
+                        trozo += datos
+                        if len(trozo) >= TAMANO_TROZO:
+                            yield bytes(trozo)
+                            trozo.clear()
+                    if trozo:
+                        yield bytes(trozo)
+            await conn.rollback()
+
+    async def _parquet(self, consulta):
+        esquema = pa.schema([(nombre, _tipo_arrow(tipo)) for nombre, tipo in self.columnas])
+        salida = _Salida()
+        escritor = pq.ParquetWriter(salida, esquema)
+        copia = sql.SQL("COPY ({}) TO STDOUT WITH (FORMAT binary)").format(consulta)
+        async with conexion() as conn:
+            async with conn.cursor() as cursor:
+                async with cursor.copy(copia) as copy:
+                    copy.set_types([tipo for _, tipo in self.columnas])
+                    grupo = []
+                    async for fila in copy.rows():
+                        grupo.append(fila)
+                        if len(grupo) >= FILAS_POR_GRUPO:
+                            await asyncio.to_thread(self._escribir, escritor, esquema, grupo)
+                            grupo = []
+                            yield salida.vaciar()
+                    if grupo:
+                        await asyncio.to_thread(self._escribir, escritor, esquema, grupo)
+            await conn.rollback()
+        escritor.close()
+        yield salida.vaciar()
+
+    @staticmethod
+    def _escribir(escritor, esquema, filas):
+        columnas = [list(c) for c in zip(*filas)]
+        escritor.write_batch(pa.record_batch(columnas, schema=esquema))
@@ -0,0 +1,313 @@
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from collections import OrderedDict
+from fastapi import HTTPException
+from starlette.responses import JSONResponse
+from config import metricas
+from config.conexionDB import conexion
+
+# POST con cabecera Idempotency-Key en las rutas marcadas con @idempotente (debajo del
+# @router, como @tiempo_limite). La primera peticion con una clave se ejecuta y, si
+# responde 2xx, su respuesta queda en la tabla idempotencia (migraciones/0002) por
+# IDEMPOTENCIA_TTL; los reintentos reciben esa misma respuesta sin volver a insertar.
+# Las demas respuestas no se guardan: el cliente puede reintentar con la misma clave.
+#   - Duplicados en el mismo worker esperan a la original (un future por clave); en otros
+#     workers consultan la fila cada SONDEO hasta que termine.
+#   - Un cache en memoria por worker evita ir a la base para los reintentos ya resueltos.
+#   - La misma clave con otro cuerpo o en otra ruta es un error del cliente (422).
+TTL = float(os.getenv("IDEMPOTENCIA_TTL", str(24 * 3600)))
+# lo maximo que una peticion retiene su clave y que un duplicado la espera
+ESPERA = float(os.getenv("IDEMPOTENCIA_ESPERA", "30"))
+MAX_CACHE = int(os.getenv("IDEMPOTENCIA_MAX_CACHE", "10000"))
+SONDEO = 0.05
+LARGO_CLAVE = 255
+INTERVALO_PURGA = 600
+CABECERA = b"idempotency-key"
+
+log = logging.getLogger(__name__)
+
+RECLAMAR = """
+    INSERT INTO idempotencia (clave, huella, en_curso_hasta, expira)
+    VALUES (%(clave)s, %(huella)s, now() + make_interval(secs => %(espera)s), now() + make_interval(secs => %(ttl)s))
+    ON CONFLICT (clave) DO UPDATE
+    SET huella = EXCLUDED.huella, estado = NULL, tipo = NULL, cuerpo = NULL,
+        en_curso_hasta = EXCLUDED.en_curso_hasta, expira = EXCLUDED.expira
+    WHERE idempotencia.expira < now()
+       OR (idempotencia.estado IS NULL AND idempotencia.en_curso_hasta < now())
+    RETURNING clave
+"""
+
+BUSCAR = """
+    SELECT huella, estado, tipo, cuerpo, extract(epoch FROM expira) AS expira
+    FROM idempotencia
+    WHERE clave = %s
+"""
+
+COMPLETAR = """
+    UPDATE idempotencia SET estado = %(estado)s, tipo = %(tipo)s, cuerpo = %(cuerpo)s
+    WHERE clave = %(clave)s AND huella = %(huella)s AND estado IS NULL
+    RETURNING extract(epoch FROM expira) AS expira
+"""
+
+LIBERAR = "DELETE FROM idempotencia WHERE clave = %s AND huella = %s AND estado IS NULL"
+
+def idempotente(funcion):
+    funcion.idempotente = True
+    return funcion
+
+class ClaveReutilizada(HTTPException):
+    def __init__(self):
+        super().__init__(status_code=422, detail="La Idempotency-Key ya se uso con otra peticion")
+
+class EnCurso(HTTPException):
+    def __init__(self):
+        super().__init__(
+            status_code=409, detail="La peticion original con esta Idempotency-Key sigue en curso",
+            headers={"Retry-After": "1"},
+        )
+
+class Guardada:
+    def __init__(self, huella, estado, tipo, cuerpo, expira):
+        self.huella = huella
+        self.estado = estado
+        self.tipo = tipo
+        self.cuerpo = bytes(cuerpo)
+        self.expira = float(expira)
+
+class Idempotencia:
+    def __init__(self, max_cache=MAX_CACHE):
+        self.max_cache = max_cache
+        self._cache = OrderedDict()
+        # clave -> future de la peticion de este worker que la tiene tomada
+        self._en_curso = {}
+        self._ultima_purga = 0.0
+        self._purga = None
+
+    def _del_cache(self, clave):
+        guardada = self._cache.get(clave)
+        if guardada is None:
+            return None
+        if guardada.expira <= time.time():
+            del self._cache[clave]
+            return None
+        self._cache.move_to_end(clave)
+        return guardada
+
+    def _al_cache(self, clave, guardada):
+        self._cache[clave] = guardada
+        self._cache.move_to_end(clave)
+        if len(self._cache) > self.max_cache:
+            self._cache.popitem(last=False)
+
+    async def reclamar(self, clave, huella):
+        # None: la clave queda tomada por esta peticion, que debe completar() o liberar()
+        limite = time.monotonic() + ESPERA
+        while True:
+            guardada = self._del_cache(clave)
+            if guardada is not None:
+                return self._comprobar(guardada, huella, "cache")
+
+            futuro = self._en_curso.get(clave)
+            if futuro is not None:
+                metricas.idempotencia.sumar("espera")
+                try:
+                    await asyncio.wait_for(asyncio.shield(futuro), limite - time.monotonic())
+                except asyncio.TimeoutError:
+                    raise EnCurso()
+                continue
+
+            propio = asyncio.get_running_loop().create_future()
+            self._en_curso[clave] = propio
+            try:
+                async with conexion(cancelable=False) as conn:
+                    async with conn.cursor() as cursor:
+                        await cursor.execute(RECLAMAR, {"clave": clave, "huella": huella, "espera": ESPERA, "ttl": TTL})
+                        tomada = await cursor.fetchone() is not None
+                        fila = None
+                        if not tomada:
+                            await cursor.execute(BUSCAR, (clave,))
+                            fila = await cursor.fetchone()
+                    await conn.commit()
+            except BaseException:
+                self._soltar(clave, propio)
+                raise
+            if tomada:
+                metricas.idempotencia.sumar("nueva")
+                return None
+
+            # la tiene otra peticion (de otro worker) o ya termino
+            self._soltar(clave, propio)
+            if fila is not None and fila["estado"] is not None:
+                guardada = Guardada(**fila)
+                self._al_cache(clave, guardada)
+                return self._comprobar(guardada, huella, "base")
+            if fila is not None and fila["huella"] != huella:
+                raise ClaveReutilizada()
+            if time.monotonic() >= limite:
+                raise EnCurso()
+            metricas.idempotencia.sumar("espera")
+            await asyncio.sleep(SONDEO)
+
+    def _comprobar(self, guardada, huella, origen):
+        if guardada.huella != huella:
+            metricas.idempotencia.sumar("reutilizada")
+            raise ClaveReutilizada()
+        metricas.idempotencia.sumar(f"repetida_{origen}")
+        return guardada
+
+    def _soltar(self, clave, futuro):
+        if self._en_curso.get(clave) is futuro:
+            del self._en_curso[clave]
+        if not futuro.done():
+            futuro.set_result(None)
+
+    async def completar(self, clave, huella, estado, tipo, cuerpo):
+        futuro = self._en_curso.get(clave)
+        try:
+            async with conexion(cancelable=False) as conn:
+                async with conn.cursor() as cursor:
+                    await cursor.execute(
+                        COMPLETAR, {"clave": clave, "huella": huella, "estado": estado, "tipo": tipo, "cuerpo": cuerpo}
+                    )
+                    fila = await cursor.fetchone()
+                await conn.commit()
+            if fila is not None:
+                self._al_cache(clave, Guardada(huella, estado, tipo, cuerpo, fila["expira"]))
+        finally:
+            if futuro is not None:
+                self._soltar(clave, futuro)
+        self._programar_purga()
+
+    async def liberar(self, clave, huella):
+        futuro = self._en_curso.get(clave)
+        try:
+            async with conexion(cancelable=False) as conn:
+                async with conn.cursor() as cursor:
+                    await cursor.execute(LIBERAR, (clave, huella))
+                await conn.commit()
+        finally:
+            if futuro is not None:
+                self._soltar(clave, futuro)
+
+    def _programar_purga(self):
+        ahora = time.monotonic()
+        if ahora - self._ultima_purga < INTERVALO_PURGA or (self._purga is not None and not self._purga.done()):
+            return
+        self._ultima_purga = ahora
+        self._purga = asyncio.create_task(self._purgar())
+
+    async def _purgar(self):
+        try:
+            async with conexion(cancelable=False) as conn:
+                async with conn.cursor() as cursor:
+                    await cursor.execute("DELETE FROM idempotencia WHERE expira < now()")
+                await conn.commit()
+        except Exception:
+            log.exception("No se pudieron purgar las claves de idempotencia vencidas")
+
+    def estadisticas(self):
+        return {"en_cache": len(self._cache), "en_curso": len(self._en_curso), "ttl": TTL}
+
+idempotencia = Idempotencia()
+
+def _rutas(rutas):
+    # segun la version de FastAPI, los routers incluidos aparecen como un grupo con sus
+    # rutas adentro (ya con el prefijo) en vez de copiarse a app.router.routes
+    for ruta in rutas:
+        candidatas = getattr(ruta, "effective_candidates", None)
+        if candidatas is not None:
+            yield from _rutas(candidatas())
+        else:
+            yield ruta
+
+def _marcada(scope):
+    # el middleware corre antes del ruteo: se busca la ruta igual que lo hara el router
+    for ruta in _rutas(scope["app"].router.routes):
+        patron = getattr(ruta, "path_regex", None)
+        if patron is not None and patron.match(scope["path"]) and scope["method"] in (getattr(ruta, "methods", None) or ()):
+            return getattr(getattr(ruta, "endpoint", None), "idempotente", False)
+    return False
+
+def _clave(scope):
+    for nombre, valor in scope["headers"]:
+        if nombre == CABECERA:
+            return valor.decode("latin-1").strip()
+    return None
+
+class MiddlewareIdempotencia:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        clave = _clave(scope) if scope["type"] == "http" and scope["method"] == "POST" else None
+        if not clave or not _marcada(scope):
+            await self.app(scope, receive, send)
+            return
+        if len(clave) > LARGO_CLAVE:
+            await JSONResponse({"detail": "Idempotency-Key demasiado larga"}, status_code=400)(scope, receive, send)
+            return
+
+        partes = []
+        while True:
+            mensaje = await receive()
+            if mensaje["type"] == "http.disconnect":
+                return
+            partes.append(mensaje.get("body", b""))
+            if not mensaje.get("more_body", False):
+                break
+        cuerpo = b"".join(partes)
+        huella = hashlib.sha256(
+            b"\0".join((scope["method"].encode(), scope["path"].encode(), scope["query_string"], cuerpo))
+        ).hexdigest()
+
+        try:
+            guardada = await idempotencia.reclamar(clave, huella)
+        except HTTPException as e:
+            await JSONResponse({"detail": e.detail}, status_code=e.status_code, headers=e.headers)(scope, receive, send)
+            return
+        if guardada is not None:
+            await send({
+                "type": "http.response.start",
+                "status": guardada.estado,
+                "headers": [
+                    (b"content-type", guardada.tipo.encode()),
+                    (b"content-length", str(len(guardada.cuerpo)).encode()),
+                    (b"idempotent-replayed", b"true"),
+                ],
+            })
+            await send({"type": "http.response.body", "body": guardada.cuerpo})
+            return
+
+        entregado = False
+
+        async def recibir():
+            nonlocal entregado
+            if not entregado:
+                entregado = True
+                return {"type": "http.request", "body": cuerpo, "more_body": False}
+            return await receive()
+
+        estado, tipo, respuesta = 500, "", []
+
+        async def enviar(mensaje):
+            nonlocal estado, tipo
+            if mensaje["type"] == "http.response.start":
+                estado = mensaje["status"]
+                tipo = dict(mensaje.get("headers", [])).get(b"content-type", b"").decode("latin-1")
+            elif mensaje["type"] == "http.response.body":
+                respuesta.append(mensaje.get("body", b""))
+            await send(mensaje)
+
+        completada = False
+        try:
+            await self.app(scope, recibir, enviar)
+            completada = 200 <= estado < 300
+        finally:
+            # el registro no puede quedar tomado: si falla, los reintentos esperarian ESPERA
+            if completada:
+                await idempotencia.completar(clave, huella, estado, tipo, b"".join(respuesta))
+            else:
+                await asyncio.shield(idempotencia.liberar(clave, huella))
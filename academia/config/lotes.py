@@ -0,0 +1,92 @@
+import asyncio
+from typing import Optional
+from fastapi import HTTPException, Query
+from config.conexionDB import conexion
+from config.metricas import tamano_lote
+from config.paginacion import LIMITE_MAXIMO
+
+# Busquedas por id agrupadas: las peticiones que llegan dentro de la misma ventana
+# se resuelven con un solo WHERE id = ANY(%s) en una sola conexion del pool, y las
+# que piden un id que ya esta en camino esperan el mismo resultado.
+VENTANA_SEGUNDOS = 0.002
+MAX_LOTE = 500
+
+class CargadorLotes:
+    def __init__(self, nombre, consulta, columna_id, ventana=VENTANA_SEGUNDOS, max_lote=MAX_LOTE):
+        self.nombre = nombre
+        self.consulta = consulta
+        self.columna_id = columna_id
+        self.ventana = ventana
+        self.max_lote = max_lote
+        # ids aun no enviados y todos los que esperan respuesta (id -> future)
+        self._pendientes = {}
+        self._en_camino = {}
+        self._temporizador = None
+        self._tareas = set()
+
+    async def buscar(self, conn, ids):
+        async with conn.cursor() as cursor:
+            await cursor.execute(f"{self.consulta} WHERE {self.columna_id} = ANY(%s)", (list(ids),))
+            return {fila[self.columna_id]: fila for fila in await cursor.fetchall()}
+
+    async def listar(self, conn, ids):
+        filas = await self.buscar(conn, ids)
+        return [filas[i] for i in ids if i in filas]
+
+    async def cargar(self, id_):
+        futuro = self._en_camino.get(id_)
+        if futuro is None:
+            bucle = asyncio.get_running_loop()
+            futuro = self._en_camino[id_] = self._pendientes[id_] = bucle.create_future()
+            if len(self._pendientes) >= self.max_lote:
+                self._despachar()
+            elif self._temporizador is None:
+                self._temporizador = bucle.call_later(self.ventana, self._despachar)
+        # shield: si un cliente se desconecta no se cancela el resultado de los demas
+        return await asyncio.shield(futuro)
+
+    async def cargar_muchos(self, ids):
+        filas = await asyncio.gather(*(self.cargar(i) for i in ids))
+        return [fila for fila in filas if fila is not None]
+
+    def _despachar(self):
+        if self._temporizador is not None:
+            self._temporizador.cancel()
+            self._temporizador = None
+        lote, self._pendientes = self._pendientes, {}
+        if lote:
+            tarea = asyncio.create_task(self._ejecutar(lote))
+            self._tareas.add(tarea)
+            tarea.add_done_callback(self._tareas.discard)
+
+    async def _ejecutar(self, lote):
+        tamano_lote.observar(len(lote), self.nombre)
+        try:
+            async with conexion(cancelable=False) as conn:
+                filas = await self.buscar(conn, lote)
+        except Exception as e:
+            for id_, futuro in lote.items():
+                self._en_camino.pop(id_, None)
+                if not futuro.done():
+                    futuro.set_exception(e)
+                    # evita el aviso de excepcion sin leer si todos los clientes se fueron
+                    futuro.add_done_callback(lambda f: f.exception())
+            return
+        for id_, futuro in lote.items():
+            self._en_camino.pop(id_, None)
+            if not futuro.done():
+                futuro.set_result(filas.get(id_))
+
+def ids_lote(ids: Optional[str] = Query(None, description="Lista de ids separados por coma")):
+    # ?ids=1,2,3 en los listados: devuelve solo esos registros, en ese orden
+    if ids is None:
+        return None
+    try:
+        valores = list(dict.fromkeys(int(v) for v in ids.split(",") if v.strip()))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids debe ser una lista de enteros separados por coma")
+    if not valores:
+        raise HTTPException(status_code=400, detail="ids no puede estar vacio")
+    if len(valores) > LIMITE_MAXIMO:
+        raise HTTPException(status_code=400, detail=f"Se permiten hasta {LIMITE_MAXIMO} ids")
+    return valores
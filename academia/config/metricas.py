@@ -0,0 +1,199 @@
+import re
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+# Metricas en formato de texto de Prometheus. Cada worker de uvicorn tiene las suyas.
+
+SEGUNDOS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+FILAS = (0, 1, 10, 100, 1000, 10000, 100000, 1000000)
+LOTES = (1, 2, 5, 10, 25, 50, 100, 250, 500)
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _etiquetas(nombres, valores, extra=()):
+    pares = list(zip(nombres, valores)) + list(extra)
+    if not pares:
+        return ""
+    return "{" + ",".join(f'{n}="{_escapar(v)}"' for n, v in pares) + "}"
+
+def _numero(valor):
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+class Histograma:
+    def __init__(self, nombre, ayuda, etiquetas=(), limites=SEGUNDOS):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = etiquetas
+        self.limites = limites
+        self._series = {}
+
+    def observar(self, valor, *etiquetas):
+        serie = self._series.get(etiquetas)
+        if serie is None:
+            serie = self._series[etiquetas] = [[0] * (len(self.limites) + 1), 0.0, 0]
+        serie[0][bisect_left(self.limites, valor)] += 1
+        serie[1] += valor
+        serie[2] += 1
+
+    def exponer(self):
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} histogram"]
+        for etiquetas, (cubetas, suma, cantidad) in sorted(self._series.items()):
+            acumulado = 0
+            for limite, n in zip((*self.limites, "+Inf"), cubetas):
+                acumulado += n
+                le = limite if limite == "+Inf" else _numero(limite)
+                lineas.append(
+                    f"{self.nombre}_bucket{_etiquetas(self.etiquetas, etiquetas, [('le', le)])} {acumulado}"
+                )
+            lineas.append(f"{self.nombre}_sum{_etiquetas(self.etiquetas, etiquetas)} {_numero(suma)}")
+            lineas.append(f"{self.nombre}_count{_etiquetas(self.etiquetas, etiquetas)} {cantidad}")
+        return lineas
+
+class Medidor:
+    def __init__(self, nombre, ayuda, etiquetas=()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = etiquetas
+        self._valores = {}
+
+    def fijar(self, valor, *etiquetas):
+        self._valores[etiquetas] = valor
+
+    def exponer(self):
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} gauge"]
+        for etiquetas, valor in sorted(self._valores.items()):
+            lineas.append(f"{self.nombre}{_etiquetas(self.etiquetas, etiquetas)} {_numero(valor)}")
+        return lineas
+
+class Contador:
+    def __init__(self, nombre, ayuda, etiquetas=()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = etiquetas
+        self._valores = {}
+
+    def sumar(self, *etiquetas, valor=1):
+        self._valores[etiquetas] = self._valores.get(etiquetas, 0) + valor
+
+    def exponer(self):
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} counter"]
+        for etiquetas, valor in sorted(self._valores.items()):
+            lineas.append(f"{self.nombre}{_etiquetas(self.etiquetas, etiquetas)} {_numero(valor)}")
+        return lineas
+
+duracion_peticion = Histograma(
+    "academia_http_duracion_segundos", "Latencia de las peticiones HTTP", ("ruta", "metodo", "codigo")
+)
+espera_pool = Histograma(
+    "academia_pool_espera_segundos", "Tiempo esperando una conexion del pool", ("ruta",)
+)
+duracion_consulta = Histograma(
+    "academia_consulta_duracion_segundos", "Tiempo dentro de cursor.execute", ("ruta",)
+)
+filas_consulta = Histograma(
+    "academia_consulta_filas", "Filas devueltas o afectadas por consulta", ("ruta",), FILAS
+)
+conexiones_pool = Medidor(
+    "academia_pool_conexiones", "Conexiones del pool por estado", ("estado",)
+)
+peticiones_pool = Medidor(
+    "academia_pool_peticiones_en_espera", "Peticiones esperando una conexion del pool"
+)
+tamano_pool = Medidor(
+    "academia_pool_tamano", "Limites configurados del pool", ("limite",)
+)
+cola_admision = Medidor(
+    "academia_admision_en_cola", "Inscripciones esperando en las colas de admision"
+)
+control_en_uso = Medidor(
+    "academia_control_en_uso", "Peticiones usando la base por clase de admision", ("clase",)
+)
+control_en_espera = Medidor(
+    "academia_control_en_espera", "Peticiones en cola de admision por clase", ("clase",)
+)
+control_rechazos = Contador(
+    "academia_control_rechazos_total", "Peticiones rechazadas con 503", ("clase", "motivo")
+)
+suscriptores_eventos = Medidor(
+    "academia_eventos_suscriptores", "Clientes conectados al feed de cambios"
+)
+eventos_publicados = Contador(
+    "academia_eventos_publicados_total", "Avisos de cambios recibidos de la base", ("tabla",)
+)
+consultas_canceladas = Contador(
+    "academia_consultas_canceladas_total", "Consultas cortadas por tiempo limite o desconexion", ("ruta", "motivo")
+)
+logs_descartados = Contador(
+    "academia_logs_descartados_total", "Lineas de log descartadas con la cola llena"
+)
+idempotencia = Contador(
+    "academia_idempotencia_total", "POST con Idempotency-Key por resultado", ("resultado",)
+)
+tamano_lote = Histograma(
+    "academia_lote_ids", "Ids resueltos por cada consulta agrupada", ("cargador",), LOTES
+)
+
+REGISTRO = [
+    duracion_peticion, espera_pool, duracion_consulta, filas_consulta,
+    conexiones_pool, peticiones_pool, tamano_pool, tamano_lote, cola_admision,
+    control_en_uso, control_en_espera, control_rechazos, suscriptores_eventos, eventos_publicados,
+    consultas_canceladas, logs_descartados, idempotencia,
+]
+
+# scope ASGI de la peticion en curso, para etiquetar las consultas con su ruta
+peticion_actual = ContextVar("peticion_actual", default=None)
+
+def ruta_plantilla(scope):
+    # plantilla completa de la ruta ("/nota/{id_nota}"), no la URL concreta: mantiene
+    # acotadas las series. Segun la version de FastAPI, route.path puede no traer el prefijo
+    # del router incluido; se recupera comparando con la URL real.
+    plantilla = getattr(scope.get("route"), "path", None)
+    if plantilla is None:
+        return "sin_ruta"
+    parametros = scope.get("path_params", {})
+    concreta = re.sub(r"{(\w+)(:\w+)?}", lambda m: str(parametros.get(m.group(1), "")), plantilla)
+    ruta = scope["path"]
+    if ruta != concreta and ruta.endswith(concreta):
+        return ruta[: len(ruta) - len(concreta)] + plantilla
+    return plantilla
+
+def ruta_actual():
+    scope = peticion_actual.get()
+    if scope is None:
+        return "sin_peticion"
+    return ruta_plantilla(scope)
+
+def exponer():
+    lineas = []
+    for metrica in REGISTRO:
+        lineas.extend(metrica.exponer())
+    return "\n".join(lineas) + "\n"
+
+class MiddlewareMetricas:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        codigo = 500
+        inicio = time.perf_counter()
+        token = peticion_actual.set(scope)
+
+        async def enviar(mensaje):
+            nonlocal codigo
+            if mensaje["type"] == "http.response.start":
+                codigo = mensaje["status"]
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            duracion_peticion.observar(
+                time.perf_counter() - inicio, ruta_actual(), scope["method"], str(codigo)
+            )
+            peticion_actual.reset(token)
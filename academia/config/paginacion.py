@@ -0,0 +1,228 @@
+import base64
+import json
+from typing import Optional
+from fastapi import HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from psycopg import sql
+from pydantic import TypeAdapter, ValidationError
+from config.conexionDB import conexion
+from config.respuestas import RespuestaJSON, iniciar_flujo, serializar
+
+LIMITE_POR_DEFECTO = 100
+LIMITE_MAXIMO = 1000
+# filas que trae cada FETCH del cursor de servidor en modo stream
+FILAS_POR_LOTE = 1000
+
+# ?columna_op=valor; sin sufijo es igualdad
+OPERADORES = {
+    "ne": "<>",
+    "gt": ">",
+    "gte": ">=",
+    "lt": "<",
+    "lte": "<=",
+    "in": "= ANY",
+}
+# parametros que no son filtros
+RESERVADOS = {"after_id", "limit", "stream", "sort", "fields", "cursor", "ids", "perfil"}
+
+class Listado:
+    # Columnas que un listar_* expone para filtrar, ordenar y proyectar (?fields=).
+    # Se usa como dependencia: Depends(listado_notas) entrega la Paginacion ya validada.
+    # origen: SELECT con joins que reemplaza a la tabla cuando las columnas no son todas
+    # suyas; Postgres lo aplana y los filtros y el orden siguen usando los indices.
+    def __init__(self, tabla, columna_id, columnas, origen=None):
+        self.tabla = tabla
+        self.origen = origen
+        self.columna_id = columna_id
+        self.columnas = {nombre: TypeAdapter(tipo) for nombre, tipo in columnas.items()}
+
+    def convertir(self, columna, valor):
+        try:
+            return self.columnas[columna].validate_strings(valor)
+        except ValidationError:
+            raise HTTPException(status_code=400, detail=f"Valor invalido para {columna}: {valor}")
+
+    def __call__(
+        self,
+        request: Request,
+        after_id: Optional[int] = Query(None, ge=0),
+        limit: int = Query(LIMITE_POR_DEFECTO, ge=1, le=LIMITE_MAXIMO),
+        stream: bool = False,
+        sort: Optional[str] = Query(None, description="Columna de orden, con - para descendente"),
+        fields: Optional[str] = Query(None, description="Columnas a devolver, separadas por coma"),
+        cursor: Optional[str] = Query(None, description="Cursor del Link rel=next cuando hay sort"),
+    ):
+        return Paginacion(self, request, after_id, limit, stream, sort, fields, cursor)
+
+class Paginacion:
+    # Paginacion por llave (keyset): ?after_id=&limit=, o ?cursor= si se ordena con ?sort=,
+    # o ?stream=true para NDJSON. Filtros, orden y columnas se compilan a SQL parametrizado.
+    def __init__(self, listado, request, after_id, limit, stream, sort, fields, cursor):
+        self.listado = listado
+        self.request = request
+        self.after_id = after_id
+        self.limit = limit
+        self.stream = stream
+        self.filtros = self._filtros(request.query_params.multi_items())
+        self.orden, self.descendente = self._orden(sort)
+        self.campos = self._campos(fields)
+        self.cursor = self._cursor(cursor)
+        if after_id is not None and (self.orden != listado.columna_id or self.descendente):
+            raise HTTPException(status_code=400, detail="after_id solo aplica sin sort; use cursor")
+
+    def _filtros(self, parametros):
+        filtros = []
+        for nombre, valor in parametros:
+            if nombre in RESERVADOS:
+                continue
+            columna, operador = nombre, None
+            if columna not in self.listado.columnas and "_" in nombre:
+                columna, operador = nombre.rsplit("_", 1)
+            if columna not in self.listado.columnas or (operador is not None and operador not in OPERADORES):
+                raise HTTPException(status_code=400, detail=f"Parametro no permitido: {nombre}")
+            if operador == "in":
+                valor = [self.listado.convertir(columna, v) for v in valor.split(",")]
+            else:
+                valor = self.listado.convertir(columna, valor)
+            filtros.append((columna, operador, valor))
+        return filtros
+
+    def _orden(self, sort):
+        if sort is None:
+            return self.listado.columna_id, False
+        columna = sort.removeprefix("-")
+        if columna not in self.listado.columnas:
+            raise HTTPException(status_code=400, detail=f"No se puede ordenar por {columna}")
+        return columna, sort.startswith("-")
+
+    def _campos(self, fields):
+        if fields is None:
+            return list(self.listado.columnas)
+        pedidos = [c.strip() for c in fields.split(",") if c.strip()]
+        for columna in pedidos:
+            if columna not in self.listado.columnas:
+                raise HTTPException(status_code=400, detail=f"Columna no permitida: {columna}")
+        # el id y la columna de orden siempre van: con ellos se arma la pagina siguiente
+        obligatorias = [self.listado.columna_id, self.orden]
+        return list(dict.fromkeys(obligatorias + pedidos))
+
+    def _cursor(self, cursor):
+        if cursor is None:
+            return None
+        try:
+            valor, id_ = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            id_ = int(id_)
+        except (ValueError, TypeError):
+            raise HTTPException(status_code=400, detail="Cursor invalido")
+        if valor is not None:
+            valor = self.listado.convertir(self.orden, str(valor))
+        return valor, id_
+
+    @property
+    def clave(self):
+        # identifica la consulta para la cache de catalogos
+        filtros = tuple((c, o, tuple(v) if isinstance(v, list) else v) for c, o, v in self.filtros)
+        return (filtros, self.orden, self.descendente, tuple(self.campos), self.after_id, self.cursor, self.limit)
+
+    def _condicion_cursor(self):
+        valor, id_ = self.cursor
+        columna, columna_id = sql.Identifier(self.orden), sql.Identifier(self.listado.columna_id)
+        signo = sql.SQL("<" if self.descendente else ">")
+        if self.orden == self.listado.columna_id:
+            return sql.SQL("{} {} %s").format(columna_id, signo), [id_]
+        # NULL va al final en ASC y al principio en DESC
+        if valor is None and not self.descendente:
+            return sql.SQL("{} IS NULL AND {} > %s").format(columna, columna_id), [id_]
+        if valor is None:
+            return sql.SQL("({} IS NULL AND {} < %s OR {} IS NOT NULL)").format(columna, columna_id, columna), [id_]
+        condicion = sql.SQL("({}, {}) {} (%s, %s)").format(columna, columna_id, signo)
+        if not self.descendente:
+            condicion = sql.SQL("({} OR {} IS NULL)").format(condicion, columna)
+        return condicion, [valor, id_]
+
+    def _armar(self):
+        condiciones, parametros = [], []
+        for columna, operador, valor in self.filtros:
+            if operador == "in":
+                condiciones.append(sql.SQL("{} = ANY(%s)").format(sql.Identifier(columna)))
+            else:
+                condiciones.append(
+                    sql.SQL("{} {} %s").format(sql.Identifier(columna), sql.SQL(OPERADORES.get(operador, "=")))
+                )
+            parametros.append(valor)
+        if self.after_id is not None:
+            condiciones.append(sql.SQL("{} > %s").format(sql.Identifier(self.listado.columna_id)))
+            parametros.append(self.after_id)
+        if self.cursor is not None:
+            condicion, valores = self._condicion_cursor()
+            condiciones.append(condicion)
+            parametros.extend(valores)
+
+        direccion = sql.SQL("DESC" if self.descendente else "ASC")
+        orden = [sql.SQL("{} {}").format(sql.Identifier(self.orden), direccion)]
+        if self.orden != self.listado.columna_id:
+            orden.append(sql.SQL("{} {}").format(sql.Identifier(self.listado.columna_id), direccion))
+
+        fuente = sql.Identifier(self.listado.tabla)
+        if self.listado.origen is not None:
+            fuente = sql.SQL("({}) AS {}").format(sql.SQL(self.listado.origen), fuente)
+        consulta = sql.SQL("SELECT {} FROM {}").format(
+            sql.SQL(", ").join(map(sql.Identifier, self.campos)), fuente
+        )
+        if condiciones:
+            consulta += sql.SQL(" WHERE ") + sql.SQL(" AND ").join(condiciones)
+        consulta += sql.SQL(" ORDER BY ") + sql.SQL(", ").join(orden)
+        return consulta, parametros
+
+    async def buscar(self, conn):
+        consulta, parametros = self._armar()
+        async with conn.cursor() as cursor:
+            # se pide una fila de mas para saber si existe una pagina siguiente
+            await cursor.execute(consulta + sql.SQL(" LIMIT %s"), (*parametros, self.limit + 1))
+            return await cursor.fetchall()
+
+    def responder(self, filas):
+        # la pagina se devuelve ya serializada y con el enlace a la siguiente en Link
+        encabezados = {}
+        if len(filas) > self.limit:
+            filas = filas[:self.limit]
+            ultima = filas[-1]
+            if self.orden == self.listado.columna_id and not self.descendente:
+                siguiente = self.request.url.include_query_params(
+                    after_id=ultima[self.listado.columna_id], limit=self.limit
+                )
+            else:
+                cursor = base64.urlsafe_b64encode(
+                    serializar([ultima[self.orden], ultima[self.listado.columna_id]])
+                ).decode()
+                siguiente = self.request.url.remove_query_params("after_id").include_query_params(
+                    cursor=cursor, limit=self.limit
+                )
+            encabezados["Link"] = f'<{siguiente}>; rel="next"'
+        return RespuestaJSON(filas, headers=encabezados)
+
+    async def transmitir(self, conn):
+        consulta, parametros = self._armar()
+
+        async def enviar(conn):
+            # cursor con nombre: Postgres entrega las filas por lotes y la memoria no crece
+            async with conn.cursor(name=f"stream_{self.listado.columna_id}") as cursor:
+                cursor.itersize = FILAS_POR_LOTE
+                await cursor.execute(consulta, parametros)
+                async for fila in cursor:
+                    yield serializar(fila) + b"\n"
+            await conn.rollback()
+
+        async def generar():
+            # sin conexion del handler (rutas con cache) se toma una propia del pool
+            if conn is not None:
+                async for linea in enviar(conn):
+                    yield linea
+                return
+            async with conexion() as propia:
+                async for linea in enviar(propia):
+                    yield linea
+
+        # la conexion propia y el primer lote se piden antes de responder 200
+        flujo = await iniciar_flujo(generar(), f"Error al consultar {self.listado.tabla}")
+        return StreamingResponse(flujo, media_type="application/x-ndjson")
@@ -0,0 +1,42 @@
+from fastapi import HTTPException
+from psycopg import sql
+
+# PATCH: el UPDATE se arma solo con las columnas que vinieron en el cuerpo (los modelos
+# tienen todo opcional; un null explicito si se escribe). Si los valores ya son los de la
+# fila no se escribe nada: sin version nueva de la fila, sin WAL ni entradas de indice.
+# El cliente cambia un campo en un viaje, sin leer la fila antes para reenviarla en el PUT.
+
+class Parcial:
+    def __init__(self, tabla, columna_id):
+        self.tabla = sql.Identifier(tabla)
+        self.columna_id = sql.Identifier(columna_id)
+        self._existe = sql.SQL("SELECT 1 FROM {tabla} WHERE {id} = %(id)s").format(
+            tabla=self.tabla, id=self.columna_id
+        )
+
+    def consulta(self, columnas):
+        nombres = [sql.Identifier(c) for c in columnas]
+        valores = [sql.Placeholder(c) for c in columnas]
+        return sql.SQL(
+            "UPDATE {tabla} SET {asignaciones} "
+            "WHERE {id} = %(id)s AND ROW({actuales}) IS DISTINCT FROM ROW({nuevos}) "
+            "RETURNING {id}"
+        ).format(
+            tabla=self.tabla,
+            asignaciones=sql.SQL(", ").join(sql.SQL("{} = {}").format(n, v) for n, v in zip(nombres, valores)),
+            id=self.columna_id,
+            actuales=sql.SQL(", ").join(nombres),
+            nuevos=sql.SQL(", ").join(valores),
+        )
+
+    async def actualizar(self, conn, id_fila, modelo):
+        # True: se actualizo; False: ya tenia esos valores; None: la fila no existe
+        cambios = modelo.model_dump(exclude_unset=True)
+        if not cambios:
+            raise HTTPException(status_code=400, detail="No se enviaron campos para actualizar")
+        async with conn.cursor() as cursor:
+            await cursor.execute(self.consulta(cambios), {**cambios, "id": id_fila})
+            if cursor.rowcount > 0:
+                return True
+            await cursor.execute(self._existe, {"id": id_fila})
+            return False if await cursor.fetchone() else None
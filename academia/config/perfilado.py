@@ -0,0 +1,214 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from psycopg import AsyncCursor, Rollback, sql
+from starlette.datastructures import MutableHeaders
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from config import metricas
+from config.seguridad import TIPO_ADMINISTRADOR, sesiones
+
+# Diagnostico de endpoints lentos, dos herramientas:
+#   Perfil por peticion: con la cabecera X-Perfil: 1 (o ?perfil=1) y un token de
+#     administrador, se muestrea la pila del event loop mientras dura la peticion y se
+#     guarda en PERFILES_DIR en formato "folded" (flamegraph.pl, speedscope). El tiempo
+#     esperando a Postgres aparece como select() del loop; Server-Timing trae el total de SQL.
+#     El muestreo ve todo el loop: con trafico concurrente salen tambien las otras peticiones.
+#   Consultas lentas: cada execute que pasa de CONSULTA_LENTA_MS queda con su SQL,
+#     parametros y duracion en CONSULTAS_LENTAS_ARCHIVO (JSON por linea) y agrupado por
+#     texto en /sistema/consultas-lentas; a una fraccion se le agrega el plan.
+DIRECTORIO = Path(tempfile.gettempdir()) / "academia"
+PERFILES_DIR = Path(os.getenv("PERFILES_DIR", str(DIRECTORIO / "perfiles")))
+INTERVALO_MUESTREO = float(os.getenv("PERFIL_INTERVALO_MS", "1")) / 1000
+
+CONSULTA_LENTA = float(os.getenv("CONSULTA_LENTA_MS", "200")) / 1000
+FRACCION_EXPLAIN = float(os.getenv("CONSULTA_LENTA_EXPLAIN", "0.1"))
+CONSULTAS_LENTAS_ARCHIVO = Path(os.getenv("CONSULTAS_LENTAS_ARCHIVO", str(DIRECTORIO / "consultas_lentas.jsonl")))
+MAX_RECIENTES = 100
+MAX_AGRUPADAS = 500
+LARGO_PARAMETROS = 500
+
+log = logging.getLogger(__name__)
+
+class Muestreo:
+    # hilo que cada INTERVALO_MUESTREO lee la pila del hilo del event loop y cuenta
+    # cuantas veces aparece cada una
+    def __init__(self, hilo, intervalo=INTERVALO_MUESTREO):
+        self.hilo = hilo
+        self.intervalo = intervalo
+        self.pilas = {}
+        self.muestras = 0
+        self._fin = threading.Event()
+        self._hilo = threading.Thread(target=self._correr, name="perfil", daemon=True)
+
+    def iniciar(self):
+        self._hilo.start()
+
+    def detener(self):
+        self._fin.set()
+        self._hilo.join()
+
+    def _correr(self):
+        while not self._fin.wait(self.intervalo):
+            marco = sys._current_frames().get(self.hilo)
+            pila = []
+            while marco is not None:
+                codigo = marco.f_code
+                pila.append(f"{codigo.co_name} ({Path(codigo.co_filename).name}:{codigo.co_firstlineno})")
+                marco = marco.f_back
+            clave = ";".join(reversed(pila))
+            self.pilas[clave] = self.pilas.get(clave, 0) + 1
+            self.muestras += 1
+
+    def guardar(self, ruta):
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        with open(ruta, "w", encoding="utf-8") as archivo:
+            for pila, cantidad in sorted(self.pilas.items()):
+                archivo.write(f"{pila} {cantidad}\n")
+
+def _pedido(scope):
+    if "perfil=1" in scope.get("query_string", b"").decode("latin-1").split("&"):
+        return True
+    return (b"x-perfil", b"1") in scope["headers"]
+
+def _es_administrador(scope):
+    autorizacion = Request(scope).headers.get("authorization", "")
+    if not autorizacion.startswith("Bearer "):
+        return False
+    sesion = sesiones.resolver(autorizacion.removeprefix("Bearer ").strip())
+    return sesion is not None and sesion["id_tipo"] == TIPO_ADMINISTRADOR
+
+class MiddlewarePerfil:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _pedido(scope):
+            await self.app(scope, receive, send)
+            return
+        if not _es_administrador(scope):
+            await JSONResponse({"detail": "El perfil requiere un token de administrador"}, status_code=403)(scope, receive, send)
+            return
+
+        nombre = re.sub(r"[^\w]+", "_", f"{scope['method']}_{scope['path']}").strip("_")
+        ruta = PERFILES_DIR / f"{datetime.now():%Y%m%d_%H%M%S_%f}_{nombre}.folded"
+        sql_total = scope.setdefault("state", {})["perfil_sql"] = [0.0, 0]
+        muestreo = Muestreo(threading.get_ident())
+        inicio = time.perf_counter()
+
+        async def enviar(mensaje):
+            if mensaje["type"] == "http.response.start":
+                cabeceras = MutableHeaders(scope=mensaje)
+                cabeceras["X-Perfil"] = str(ruta)
+                # lo que va antes de empezar la respuesta; el resto del cuerpo queda en el perfil
+                cabeceras["Server-Timing"] = (
+                    f'app;dur={(time.perf_counter() - inicio) * 1000:.1f}, '
+                    f'sql;dur={sql_total[0] * 1000:.1f};desc="{sql_total[1]} consultas"'
+                )
+            await send(mensaje)
+
+        muestreo.iniciar()
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            muestreo.detener()
+            await asyncio.to_thread(muestreo.guardar, ruta)
+
+def _texto(consulta, conn):
+    if isinstance(consulta, sql.Composable):
+        return consulta.as_string(conn)
+    if isinstance(consulta, bytes):
+        return consulta.decode()
+    return consulta
+
+def _explicable(texto):
+    return re.match(r"\s*(SELECT|WITH|TABLE|VALUES|INSERT|UPDATE|DELETE|MERGE)\b", texto, re.IGNORECASE) is not None
+
+def _lectura(texto):
+    # EXPLAIN ANALYZE ejecuta la consulta: solo se repiten las de peticiones GET/HEAD que
+    # no escriben. Un SELECT puede llamar funciones con efectos (estadistica_recalcular());
+    # fuera de una lectura, o sin peticion (listener, tareas), va EXPLAIN sin ejecutar
+    scope = metricas.peticion_actual.get()
+    if scope is None or scope["method"] not in ("GET", "HEAD"):
+        return False
+    return re.match(r"\s*(SELECT|WITH|TABLE|VALUES)\b", texto, re.IGNORECASE) is not None and not re.search(
+        r"\b(INSERT|UPDATE|DELETE|MERGE)\b", texto, re.IGNORECASE
+    )
+
+class RegistroLentas:
+    def __init__(self):
+        self.recientes = deque(maxlen=MAX_RECIENTES)
+        self.agrupadas = {}
+
+    async def observar(self, conn, consulta, parametros, duracion, error=None):
+        texto = _texto(consulta, conn)
+        entrada = {
+            "fecha": datetime.now().isoformat(timespec="milliseconds"),
+            "ruta": metricas.ruta_actual(),
+            "duracion_ms": round(duracion * 1000, 1),
+            "sql": " ".join(texto.split()),
+            "parametros": repr(parametros)[:LARGO_PARAMETROS] if parametros is not None else None,
+        }
+        if error is not None:
+            entrada["error"] = str(error)
+        elif _explicable(texto) and random.random() < FRACCION_EXPLAIN and conn.pgconn.pipeline_status == 0:
+            entrada["plan"] = await self._explicar(conn, texto, parametros)
+
+        grupo = self.agrupadas.get(entrada["sql"])
+        if grupo is None and len(self.agrupadas) < MAX_AGRUPADAS:
+            grupo = self.agrupadas[entrada["sql"]] = {"sql": entrada["sql"], "cantidad": 0, "total_ms": 0.0, "maximo_ms": 0.0}
+        if grupo is not None:
+            grupo["cantidad"] += 1
+            grupo["total_ms"] += entrada["duracion_ms"]
+            grupo["maximo_ms"] = max(grupo["maximo_ms"], entrada["duracion_ms"])
+        self.recientes.append(entrada)
+        log.warning("Consulta lenta", extra={"duracion_ms": entrada["duracion_ms"], "sql": entrada["sql"][:200]})
+        await asyncio.to_thread(self._escribir, entrada)
+
+    async def _explicar(self, conn, texto, parametros):
+        # cursor comun (no CursorMedido) dentro de un savepoint que siempre se deshace: ni
+        # un error ni lo que haga la consulta al repetirse llegan a la transaccion del handler
+        opciones = "ANALYZE, BUFFERS, FORMAT JSON" if _lectura(texto) else "FORMAT JSON"
+        try:
+            async with conn.transaction():
+                cursor = AsyncCursor(conn)
+                await cursor.execute(f"EXPLAIN ({opciones}) {texto}", parametros)
+                plan = (await cursor.fetchone())["QUERY PLAN"][0]
+                raise Rollback()
+            return plan
+        except Exception as e:
+            return {"error": str(e)}
+
+    @staticmethod
+    def _escribir(entrada):
+        CONSULTAS_LENTAS_ARCHIVO.parent.mkdir(parents=True, exist_ok=True)
+        with open(CONSULTAS_LENTAS_ARCHIVO, "a", encoding="utf-8") as archivo:
+            archivo.write(json.dumps(entrada, ensure_ascii=False, default=str) + "\n")
+
+    def estadisticas(self):
+        return {
+            "umbral_ms": CONSULTA_LENTA * 1000,
+            "fraccion_explain": FRACCION_EXPLAIN,
+            "por_consulta": sorted(self.agrupadas.values(), key=lambda g: g["total_ms"], reverse=True),
+            "recientes": list(reversed(self.recientes)),
+        }
+
+registro_lentas = RegistroLentas()
+
+async def observar_consulta(conn, consulta, parametros, duracion, error=None):
+    scope = metricas.peticion_actual.get()
+    if scope is not None and "perfil_sql" in scope.get("state", {}):
+        scope["state"]["perfil_sql"][0] += duracion
+        scope["state"]["perfil_sql"][1] += 1
+    if duracion >= CONSULTA_LENTA:
+        await registro_lentas.observar(conn, consulta, parametros, duracion, error)
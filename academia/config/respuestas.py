@@ -0,0 +1,89 @@
+import json
+import logging
+import os
+from datetime import date, datetime, time
+from decimal import Decimal
+from uuid import UUID
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from psycopg.errors import QueryCanceled
+
+# Serializador JSON de las respuestas. Se elige con ACADEMIA_JSON=orjson|msgspec|json;
+# si la libreria pedida no esta instalada se usa la siguiente disponible.
+# Decimal (columnas DECIMAL como notas.nota) sale como numero, igual que con jsonable_encoder.
+
+log = logging.getLogger(__name__)
+
+def _convertir(valor):
+    if isinstance(valor, Decimal):
+        return float(valor)
+    if isinstance(valor, (datetime, date, time)):
+        return valor.isoformat()
+    if isinstance(valor, UUID):
+        return str(valor)
+    if isinstance(valor, bytes):
+        return valor.decode()
+    raise TypeError(f"Tipo no serializable: {type(valor).__name__}")
+
+def _con_orjson():
+    import orjson
+    opciones = orjson.OPT_NON_STR_KEYS
+
+    def serializar(contenido):
+        return orjson.dumps(contenido, default=_convertir, option=opciones)
+    return serializar
+
+def _con_msgspec():
+    import msgspec
+    codificador = msgspec.json.Encoder(enc_hook=_convertir, decimal_format="number")
+    return codificador.encode
+
+def _con_json():
+    def serializar(contenido):
+        return json.dumps(
+            contenido, default=_convertir, ensure_ascii=False, separators=(",", ":")
+        ).encode("utf-8")
+    return serializar
+
+BACKENDS = {"orjson": _con_orjson, "msgspec": _con_msgspec, "json": _con_json}
+
+def _elegir(preferido):
+    orden = [preferido] + [nombre for nombre in BACKENDS if nombre != preferido]
+    for nombre in orden:
+        try:
+            return nombre, BACKENDS[nombre]()
+        except ImportError:
+            continue
+    raise RuntimeError("No hay serializador JSON disponible")
+
+BACKEND, serializar = _elegir(os.getenv("ACADEMIA_JSON", "orjson"))
+
+class RespuestaJSON(JSONResponse):
+    # Si el handler devuelve esta respuesta directamente, FastAPI no pasa el
+    # contenido por jsonable_encoder: las filas de psycopg se serializan tal cual.
+    def render(self, content):
+        return serializar(content)
+
+async def iniciar_flujo(generador, detalle):
+    # Corre el generador hasta su primer trozo antes de armar la StreamingResponse: la
+    # admision, la conexion y la primera lectura fallan con su codigo (503, 504, 400) y
+    # no como un 200 cortado. El generador sigue con la conexion que ya tomo.
+    try:
+        primero = await anext(generador, None)
+    except (HTTPException, QueryCanceled):
+        raise
+    except Exception:
+        log.exception(detalle)
+        raise HTTPException(status_code=400, detail=detalle)
+
+    async def continuar():
+        try:
+            if primero is None:
+                return
+            yield primero
+            async for trozo in generador:
+                yield trozo
+        finally:
+            await generador.aclose()
+
+    return continuar()
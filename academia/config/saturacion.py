@@ -0,0 +1,140 @@
+import asyncio
+import heapq
+import itertools
+import os
+from fastapi import HTTPException
+from config import metricas
+
+# Control de admision antes del pool: limita cuantas peticiones usan la base a la vez,
+# por tipo de peticion, y rechaza con 503 en cuanto la espera no tiene sentido en vez
+# de dejar que todas esperen el timeout del pool.
+#   escritura: POST/PUT/PATCH/DELETE, con prioridad al liberarse una conexion
+#   lectura:   GET de un recurso (rutas con parametros, /alumno/{id}/kardex)
+#   reporte:   GET de listados completos; acotados para que no acaparen el pool
+CLASES = ("escritura", "lectura", "reporte")
+PRIORIDAD = {"escritura": 0, "lectura": 1, "reporte": 2}
+
+def _config(nombre, clase, por_defecto, tipo=int):
+    return tipo(os.getenv(f"ADMISION_{nombre}_{clase.upper()}", str(por_defecto)))
+
+RETRY_AFTER = "1"
+
+class Saturado(HTTPException):
+    def __init__(self, detalle="Servidor saturado, intente de nuevo"):
+        super().__init__(status_code=503, detail=detalle, headers={"Retry-After": RETRY_AFTER})
+
+def clase_peticion():
+    scope = metricas.peticion_actual.get()
+    if scope is None:
+        return "lectura"
+    if scope["method"] not in ("GET", "HEAD"):
+        return "escritura"
+    plantilla = getattr(scope.get("route"), "path", "")
+    return "lectura" if "{" in plantilla else "reporte"
+
+class ControlAdmision:
+    def __init__(self, capacidad, limites, colas, esperas):
+        self.capacidad = capacidad
+        self.limites = limites
+        self.colas = colas
+        self.esperas = esperas
+        self.en_uso = {clase: 0 for clase in CLASES}
+        self.esperando = {clase: 0 for clase in CLASES}
+        self._cola = []
+        self._orden = itertools.count()
+
+    def _total(self):
+        return sum(self.en_uso.values())
+
+    def _libre(self, clase):
+        return self._total() < self.capacidad and self.en_uso[clase] < self.limites[clase]
+
+    def _ocupar(self, clase):
+        self.en_uso[clase] += 1
+        metricas.control_en_uso.fijar(self.en_uso[clase], clase)
+
+    def _rechazar(self, clase, motivo):
+        metricas.control_rechazos.sumar(clase, motivo)
+        raise Saturado()
+
+    async def entrar(self, clase):
+        # sin cola delante de mayor o igual prioridad, entra directo
+        if self._libre(clase) and not any(p <= PRIORIDAD[clase] for p, *_ in self._cola):
+            self._ocupar(clase)
+            return
+        if self.esperando[clase] >= self.colas[clase]:
+            self._rechazar(clase, "cola_llena")
+
+        futuro = asyncio.get_running_loop().create_future()
+        entrada = [PRIORIDAD[clase], next(self._orden), clase, futuro]
+        heapq.heappush(self._cola, entrada)
+        self.esperando[clase] += 1
+        metricas.control_en_espera.fijar(self.esperando[clase], clase)
+        try:
+            await asyncio.wait_for(asyncio.shield(futuro), self.esperas[clase])
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if futuro.done() and not futuro.cancelled():
+                # el turno llego justo al vencer: se devuelve
+                self.salir(clase)
+            else:
+                futuro.cancel()
+                self._cola.remove(entrada)
+                heapq.heapify(self._cola)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self._rechazar(clase, "espera")
+        finally:
+            self.esperando[clase] -= 1
+            metricas.control_en_espera.fijar(self.esperando[clase], clase)
+
+    def salir(self, clase):
+        self.en_uso[clase] -= 1
+        metricas.control_en_uso.fijar(self.en_uso[clase], clase)
+        self._despertar()
+
+    def _despertar(self):
+        # recorre la cola en orden de prioridad; una clase en su limite no bloquea a las demas
+        saltadas = []
+        while self._cola and self._total() < self.capacidad:
+            entrada = heapq.heappop(self._cola)
+            _, _, clase, futuro = entrada
+            if futuro.done():
+                continue
+            if self.en_uso[clase] >= self.limites[clase]:
+                saltadas.append(entrada)
+                continue
+            self._ocupar(clase)
+            futuro.set_result(None)
+        for entrada in saltadas:
+            heapq.heappush(self._cola, entrada)
+
+    def estado(self):
+        return {
+            clase: {
+                "en_uso": self.en_uso[clase],
+                "esperando": self.esperando[clase],
+                "limite": self.limites[clase],
+                "cola_maxima": self.colas[clase],
+            }
+            for clase in CLASES
+        }
+
+def crear_control(capacidad):
+    return ControlAdmision(
+        capacidad,
+        limites={
+            "escritura": _config("LIMITE", "escritura", capacidad),
+            "lectura": _config("LIMITE", "lectura", capacidad),
+            "reporte": _config("LIMITE", "reporte", max(1, capacidad // 4)),
+        },
+        colas={
+            "escritura": _config("COLA", "escritura", 200),
+            "lectura": _config("COLA", "lectura", 100),
+            "reporte": _config("COLA", "reporte", 20),
+        },
+        esperas={
+            "escritura": _config("ESPERA", "escritura", 5.0, float),
+            "lectura": _config("ESPERA", "lectura", 2.0, float),
+            "reporte": _config("ESPERA", "reporte", 1.0, float),
+        },
+    )
@@ -0,0 +1,152 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from fastapi import Depends, Header, HTTPException
+
+# Contrasenas con scrypt (hashlib, sin dependencias): lento y con memoria a proposito,
+# por eso corre en un pool de hilos propio y nunca en el event loop.
+SCRYPT_N = int(os.getenv("SCRYPT_N", str(2 ** 14)))
+SCRYPT_R = 8
+SCRYPT_P = 1
+HILOS_HASH = int(os.getenv("HILOS_HASH", "4"))
+
+# Tokens firmados con HMAC: se validan sin ir a la base. ACADEMIA_SECRETO es obligatorio
+# (main.py no arranca sin el): con uno aleatorio por proceso cada worker rechazaria los
+# tokens de los otros y todos se invalidarian en cada reinicio.
+SECRETO = os.getenv("ACADEMIA_SECRETO", "").encode()
+TOKEN_TTL = int(os.getenv("TOKEN_TTL", "3600"))
+MAX_SESIONES = 10_000
+# id de "Administrador" en tipo_usuario (datos iniciales de academiaDB.txt)
+TIPO_ADMINISTRADOR = 3
+
+_hilos = ThreadPoolExecutor(max_workers=HILOS_HASH, thread_name_prefix="hash")
+
+def _b64(datos):
+    return base64.urlsafe_b64encode(datos).rstrip(b"=").decode()
+
+def _de_b64(texto):
+    return base64.urlsafe_b64decode(texto + "=" * (-len(texto) % 4))
+
+def _scrypt(contrasena, sal, n, r, p):
+    return hashlib.scrypt(contrasena.encode(), salt=sal, n=n, r=r, p=p, maxmem=256 * n * r, dklen=32)
+
+def _hashear(contrasena):
+    sal = secrets.token_bytes(16)
+    clave = _scrypt(contrasena, sal, SCRYPT_N, SCRYPT_R, SCRYPT_P)
+    return f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${_b64(sal)}${_b64(clave)}"
+
+def _verificar(contrasena, guardada):
+    if not guardada.startswith("scrypt$"):
+        # contrasenas anteriores, en texto plano: se re-hashean en el primer login
+        return hmac.compare_digest(contrasena.encode(), guardada.encode())
+    _, n, r, p, sal, clave = guardada.split("$")
+    calculada = _scrypt(contrasena, _de_b64(sal), int(n), int(r), int(p))
+    return hmac.compare_digest(calculada, _de_b64(clave))
+
+# hash de referencia para que un usuario inexistente tarde lo mismo que uno real
+_HASH_FALSO = _hashear(secrets.token_hex(8))
+
+async def hashear(contrasena):
+    return await asyncio.get_running_loop().run_in_executor(_hilos, _hashear, contrasena)
+
+async def verificar(contrasena, guardada):
+    return await asyncio.get_running_loop().run_in_executor(
+        _hilos, _verificar, contrasena, guardada or _HASH_FALSO
+    )
+
+def comprobar_secreto():
+    if not SECRETO:
+        raise RuntimeError("Falta ACADEMIA_SECRETO (por ejemplo: python -c \"import secrets; print(secrets.token_hex(32))\")")
+    # con TOKEN_TTL <= 0 todo token nace vencido y Sesiones.revocar no podria podar
+    if TOKEN_TTL <= 0:
+        raise RuntimeError(f"TOKEN_TTL debe ser mayor que 0 (es {TOKEN_TTL})")
+
+def es_hash(guardada):
+    return guardada.startswith("scrypt$")
+
+def emitir_token(id_usuario, id_tipo):
+    emitido = time.time()
+    expira = int(emitido) + TOKEN_TTL
+    cuerpo = _b64(json.dumps(
+        {"u": id_usuario, "t": id_tipo, "i": emitido, "e": expira}, separators=(",", ":")
+    ).encode())
+    firma = _b64(hmac.new(SECRETO, cuerpo.encode(), hashlib.sha256).digest())
+    return f"{cuerpo}.{firma}", expira
+
+class Sesiones:
+    # LRU acotado de tokens ya validados -> sesion; evita decodificar en cada peticion.
+    # La revocacion vive en la memoria de cada proceso: con varios workers (o tras un
+    # reinicio) un token revocado sigue valiendo en los demas hasta que vence, como
+    # mucho TOKEN_TTL segundos. Para cortarlo en todos, bajar TOKEN_TTL.
+    def __init__(self, maximo=MAX_SESIONES):
+        self.maximo = maximo
+        self._sesiones = OrderedDict()
+        # id_usuario -> instante desde el que sus tokens anteriores no valen, en orden
+        # de revocacion; pasado TOKEN_TTL esos tokens ya vencieron y la entrada se borra
+        self._revocados = OrderedDict()
+
+    def resolver(self, token):
+        sesion = self._sesiones.get(token)
+        if sesion is not None:
+            if sesion["expira"] > time.time():
+                self._sesiones.move_to_end(token)
+                return sesion
+            del self._sesiones[token]
+            return None
+        sesion = self._validar(token)
+        if sesion is not None:
+            self._sesiones[token] = sesion
+            if len(self._sesiones) > self.maximo:
+                self._sesiones.popitem(last=False)
+        return sesion
+
+    def _validar(self, token):
+        try:
+            cuerpo, firma = token.split(".")
+            esperada = hmac.new(SECRETO, cuerpo.encode(), hashlib.sha256).digest()
+            if not hmac.compare_digest(esperada, _de_b64(firma)):
+                return None
+            datos = json.loads(_de_b64(cuerpo))
+            sesion = {"id_usuario": datos["u"], "id_tipo": datos["t"], "expira": datos["e"]}
+            emitido = datos["i"]
+        except (ValueError, KeyError, TypeError):
+            return None
+        if sesion["expira"] <= time.time() or emitido < self._revocados.get(sesion["id_usuario"], 0):
+            return None
+        return sesion
+
+    def revocar(self, id_usuario):
+        # tras cambiar contrasena o rol, o borrar el usuario. Solo en este worker:
+        # en los demas el token sigue valido hasta que vence (TOKEN_TTL).
+        ahora = time.time()
+        self._revocados.pop(id_usuario, None)
+        self._revocados[id_usuario] = ahora
+        while next(iter(self._revocados.values())) + TOKEN_TTL <= ahora:
+            self._revocados.popitem(last=False)
+        for token in [t for t, s in self._sesiones.items() if s["id_usuario"] == id_usuario]:
+            del self._sesiones[token]
+
+sesiones = Sesiones()
+
+def sesion_actual(authorization: Optional[str] = Header(None)):
+    if not authorization or not authorization.startswith("Bearer "):
+        raise HTTPException(status_code=401, detail="Falta el token", headers={"WWW-Authenticate": "Bearer"})
+    sesion = sesiones.resolver(authorization.removeprefix("Bearer ").strip())
+    if sesion is None:
+        raise HTTPException(status_code=401, detail="Token invalido o vencido", headers={"WWW-Authenticate": "Bearer"})
+    return sesion
+
+def requiere_tipo(*tipos):
+    def verificar_tipo(sesion=Depends(sesion_actual)):
+        if sesion["id_tipo"] not in tipos:
+            raise HTTPException(status_code=403, detail="No autorizado")
+        return sesion
+    return verificar_tipo
@@ -0,0 +1,131 @@
+import asyncio
+import logging
+import os
+from fastapi import HTTPException
+from fastapi.exception_handlers import http_exception_handler
+from psycopg import AsyncCursor, errors, sql
+from config import metricas
+
+# Tiempo maximo de cada consulta (statement_timeout), segun la clase de la peticion de
+# config/saturacion.py. Una ruta fija el suyo con @tiempo_limite(segundos) debajo del
+# @router; 0 es sin limite (exportaciones, cargas: el corte lo da la desconexion).
+# Si el cliente se desconecta, la consulta en curso se cancela en Postgres.
+TIEMPOS = {
+    "escritura": float(os.getenv("CONSULTA_TIEMPO_ESCRITURA", "10")),
+    "lectura": float(os.getenv("CONSULTA_TIEMPO_LECTURA", "5")),
+    "reporte": float(os.getenv("CONSULTA_TIEMPO_REPORTE", "30")),
+}
+
+DESCONEXION = {"type": "http.disconnect"}
+
+log = logging.getLogger(__name__)
+
+class TiempoAgotado(HTTPException):
+    def __init__(self):
+        super().__init__(status_code=504, detail="La consulta excedio el tiempo limite")
+
+class ClienteDesconectado(HTTPException):
+    # 499 como en nginx: nadie lee la respuesta, pero queda en las metricas
+    def __init__(self):
+        super().__init__(status_code=499, detail="El cliente cerro la conexion")
+
+def tiempo_limite(segundos):
+    def marcar(funcion):
+        funcion.tiempo_limite = segundos
+        return funcion
+    return marcar
+
+def limite_peticion(clase):
+    scope = metricas.peticion_actual.get()
+    endpoint = getattr(scope.get("route"), "endpoint", None) if scope else None
+    return getattr(endpoint, "tiempo_limite", TIEMPOS[clase])
+
+def desconexion_peticion():
+    scope = metricas.peticion_actual.get()
+    if scope is None:
+        return None
+    return scope.get("state", {}).get("desconexion")
+
+async def aplicar_limite(conn, segundos):
+    # el valor queda en la sesion: solo se envia SET si cambia respecto del uso anterior.
+    # Con autocommit el SET no abre una transaccion que un rollback del handler desharia;
+    # va por un cursor comun para no contarlo entre las consultas de la ruta.
+    milisegundos = int(segundos * 1000)
+    if getattr(conn, "limite_consulta", None) == milisegundos:
+        return
+    await conn.set_autocommit(True)
+    try:
+        await AsyncCursor(conn).execute(sql.SQL("SET statement_timeout = {}").format(milisegundos))
+    finally:
+        await conn.set_autocommit(False)
+    conn.limite_consulta = milisegundos
+
+def _cancelada(exc):
+    while exc is not None:
+        if isinstance(exc, errors.QueryCanceled):
+            return True
+        exc = exc.__context__
+    return False
+
+async def responder_cancelacion(request, exc):
+    # los handlers envuelven cualquier error en un 400: se busca la cancelacion en la cadena
+    if not _cancelada(exc):
+        return await http_exception_handler(request, exc)
+    desconexion = request.scope.get("state", {}).get("desconexion")
+    motivo = "desconexion" if desconexion is not None and desconexion.done() else "tiempo"
+    ruta = metricas.ruta_plantilla(request.scope)
+    metricas.consultas_canceladas.sumar(ruta, motivo)
+    log.warning("Consulta cancelada", extra={"motivo": motivo, "ruta": ruta})
+    return await http_exception_handler(request, ClienteDesconectado() if motivo == "desconexion" else TiempoAgotado())
+
+class MiddlewareDesconexion:
+    # Lee los mensajes del cliente por adelantado (de a uno, sin perder la contrapresion
+    # del cuerpo) para enterarse del http.disconnect aunque el handler este esperando a
+    # Postgres; conexion() cancela la consulta cuando se resuelve scope["state"]["desconexion"].
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        desconexion = asyncio.get_running_loop().create_future()
+        scope.setdefault("state", {})["desconexion"] = desconexion
+        mensajes = asyncio.Queue(1)
+        completa = False
+
+        async def enviar(mensaje):
+            nonlocal completa
+            # se marca antes de enviar: el servidor responde http.disconnect a cualquier
+            # receive() apenas termina la respuesta, y eso no es un cliente que se fue
+            if mensaje["type"] == "http.response.body" and not mensaje.get("more_body", False):
+                completa = True
+            await send(mensaje)
+
+        async def leer():
+            while True:
+                mensaje = await receive()
+                if mensaje["type"] == "http.disconnect":
+                    if completa:
+                        await mensajes.put(mensaje)
+                    else:
+                        desconexion.set_result(None)
+                    return
+                await mensajes.put(mensaje)
+
+        async def recibir():
+            if mensajes.empty() and desconexion.done():
+                return DESCONEXION
+            siguiente = asyncio.ensure_future(mensajes.get())
+            await asyncio.wait((siguiente, desconexion), return_when=asyncio.FIRST_COMPLETED)
+            if siguiente.done():
+                return siguiente.result()
+            siguiente.cancel()
+            return DESCONEXION
+
+        lector = asyncio.create_task(leer())
+        try:
+            await self.app(scope, recibir, enviar)
+        finally:
+            lector.cancel()
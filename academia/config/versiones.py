@@ -0,0 +1,198 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from fastapi import Depends, HTTPException, Request
+from psycopg import sql
+from starlette.datastructures import MutableHeaders
+from config.conexionDB import get_conexion
+
+# GET condicionales. Dos formas de calcular el ETag:
+#   Versionado: con la version de cada tabla que guarda VersionesTablas y, para un
+#     recurso, el xmin de su fila. Un 304 de un listado no consulta la base; el de un
+#     recurso cuesta leer el xmin por su clave.
+#   etag_contenido: hash del cuerpo ya armado, para las rutas servidas desde el cache de
+#     catalogos, que no van a la base.
+# La version se lee antes que los datos: si algo cambia entre medio, el ETag queda viejo
+# y el cliente solo vuelve a pedir de mas. Las versiones llegan a cada worker por
+# LISTEN/NOTIFY: hasta que el aviso llega, otro worker puede seguir contestando 304 a un
+# ETag que ya no vale. Esa ventana dura lo que tarda el aviso; si se pierde la escucha,
+# no se emiten ETag hasta reconectar.
+CACHE_CONTROL = "no-cache"
+# canal de versionar_tabla() (migraciones/0010): "tabla:numero" por sentencia que escribe
+CANAL_VERSION = "version"
+
+class VersionesTablas:
+    # Ultimo aviso de cada tabla en este worker. Los avisos llegan despues del commit y
+    # su numero no se repite: el ultimo siempre cambia la version, aunque los commits no
+    # sigan el orden de la secuencia, y los workers que vieron el mismo ultimo aviso dan
+    # el mismo ETag. Last-Modified es cuando el worker recibio el aviso.
+    # Al (re)conectar la escucha las tablas sin aviso toman una version base nueva: la del
+    # ultimo numero de la secuencia (igual en los workers que arrancan juntos) y la
+    # cantidad de conexiones (cambia si se corto la escucha y pudo perderse un aviso).
+    def __init__(self):
+        self._base = None
+        self._tablas = {}
+        self._conexiones = 0
+
+    def reiniciar(self, ultimo):
+        self._conexiones += 1
+        self._base = (f"b{ultimo}.{self._conexiones}", datetime.now(timezone.utc))
+        self._tablas.clear()
+
+    def desconectar(self):
+        # sin escucha no se sabe que cambio: no hay ETag hasta reconectar
+        self._base = None
+        self._tablas.clear()
+
+    def aplicar(self, aviso):
+        tabla, _, numero = aviso.partition(":")
+        self._tablas[tabla] = (numero, datetime.now(timezone.utc))
+
+    def leer(self, tablas):
+        # tabla -> (version, modificado); None sin escucha
+        if self._base is None:
+            return None
+        return {tabla: self._tablas.get(tabla, self._base) for tabla in tablas}
+
+    def estadisticas(self):
+        return {
+            "escuchando": self._base is not None,
+            "tablas": {tabla: version for tabla, (version, _) in sorted(self._tablas.items())},
+        }
+
+versiones_tablas = VersionesTablas()
+
+def _etiqueta(*partes):
+    return '"' + hashlib.blake2b("|".join(map(str, partes)).encode(), digest_size=12).hexdigest() + '"'
+
+def _coincide(request, etag):
+    cabecera = request.headers.get("if-none-match")
+    if cabecera is None:
+        return None
+    etiquetas = [e.strip().removeprefix("W/") for e in cabecera.split(",")]
+    return "*" in etiquetas or etag in etiquetas
+
+def _no_modificado(request, etag, modificado=None):
+    # If-None-Match manda; If-Modified-Since solo se mira si no vino
+    coincide = _coincide(request, etag)
+    if coincide is not None:
+        return coincide
+    desde = request.headers.get("if-modified-since")
+    if not desde or modificado is None:
+        return False
+    try:
+        return modificado.replace(microsecond=0) <= parsedate_to_datetime(desde)
+    except (TypeError, ValueError):
+        return False
+
+class NoModificado(HTTPException):
+    def __init__(self, cabeceras):
+        super().__init__(status_code=304, headers=cabeceras)
+
+class Versionado:
+    # tabla: la del recurso; columna_id: su clave, igual al parametro de la ruta;
+    # otras: tablas que tambien aparecen en la respuesta (joins)
+    def __init__(self, tabla, columna_id=None, otras=()):
+        self.tablas = [tabla, *otras]
+        self._consulta_fila = None
+        if columna_id is not None:
+            self.columna_id = columna_id
+            self._consulta_fila = sql.SQL("SELECT xmin::TEXT AS fila FROM {tabla} WHERE {columna} = %s").format(
+                tabla=sql.Identifier(tabla), columna=sql.Identifier(columna_id)
+            )
+
+    def _comprobar(self, request, versiones, fila=None):
+        # con fila, la tabla propia cuenta por el xmin, no por su version: escribir otras
+        # filas no cambia el ETag. Last-Modified si la incluye (queda mas nuevo)
+        partes = ",".join(
+            f"{tabla}:{version}" for tabla, (version, _) in sorted(versiones.items())
+            if fila is None or tabla != self.tablas[0]
+        )
+        etag = _etiqueta(request.url.path, request.url.query, partes, fila)
+        modificado = max(m for _, m in versiones.values())
+        cabeceras = {
+            "ETag": etag,
+            "Cache-Control": CACHE_CONTROL,
+            "Last-Modified": format_datetime(modificado, usegmt=True),
+        }
+        if _no_modificado(request, etag, modificado):
+            raise NoModificado(cabeceras)
+        # MiddlewareVersiones las agrega a la respuesta 200
+        request.state.cabeceras_version = cabeceras
+
+    async def listado(self, request: Request):
+        versiones = versiones_tablas.leer(self.tablas)
+        if versiones is not None:
+            self._comprobar(request, versiones)
+
+    async def fila(self, request: Request, conn=Depends(get_conexion)):
+        versiones = versiones_tablas.leer(self.tablas)
+        if versiones is None:
+            return
+        try:
+            id_fila = int(request.path_params[self.columna_id])
+        except ValueError:
+            # el handler responde 422
+            return
+        async with conn.cursor() as cursor:
+            await cursor.execute(self._consulta_fila, (id_fila,))
+            version = await cursor.fetchone()
+        if version is None:
+            # la fila no existe: el handler responde 404, sin ETag
+            return
+        self._comprobar(request, versiones, version["fila"])
+
+async def etag_contenido(request: Request):
+    if "stream" not in request.query_params:
+        request.state.etag_contenido = True
+
+class MiddlewareVersiones:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            await self.app(scope, receive, send)
+            return
+
+        inicio = None
+        cuerpo = []
+
+        async def enviar(mensaje):
+            nonlocal inicio
+            estado = scope.get("state", {})
+            if mensaje["type"] == "http.response.start":
+                if mensaje["status"] != 200:
+                    estado = {}
+                if "cabeceras_version" in estado:
+                    cabeceras = MutableHeaders(scope=mensaje)
+                    for nombre, valor in estado["cabeceras_version"].items():
+                        cabeceras[nombre] = valor
+                elif estado.get("etag_contenido"):
+                    # se retiene la respuesta hasta tener el cuerpo completo
+                    inicio = mensaje
+                    return
+                await send(mensaje)
+                return
+
+            if inicio is None:
+                await send(mensaje)
+                return
+            cuerpo.append(mensaje.get("body", b""))
+            if mensaje.get("more_body", False):
+                return
+            contenido = b"".join(cuerpo)
+            etag = _etiqueta(hashlib.blake2b(contenido, digest_size=16).hexdigest())
+            cabeceras = MutableHeaders(scope=inicio)
+            cabeceras["ETag"] = etag
+            cabeceras["Cache-Control"] = CACHE_CONTROL
+            if _coincide(Request(scope), etag):
+                del cabeceras["Content-Length"]
+                del cabeceras["Content-Type"]
+                await send({**inicio, "status": 304})
+                await send({"type": "http.response.body", "body": b""})
+                return
+            await send(inicio)
+            await send({"type": "http.response.body", "body": contenido})
+
+        await self.app(scope, receive, enviar)
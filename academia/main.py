@@ -1,4 +1,8 @@
-from fastapi import FastAPI
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException
+from psycopg.errors import QueryCanceled
 from routes import alumno
 from routes import docente
 from routes import clase
@@ -10,17 +14,56 @@ from routes import materia
 from routes import carrera
 from routes import especialidad
 from routes import usuario
+from routes import persona
+from routes import sistema
+from routes import estadistica
+from routes import eventos
+from config.eventos import escuchar_cambios
+from config.bitacora import MiddlewareBitacora, configurar_bitacora, detener_bitacora
+from config.conexionDB import POOL_MAX, POOL_MIN, abrir_pool, cerrar_pool
+from config.idempotencia import MiddlewareIdempotencia
+from config.metricas import MiddlewareMetricas
+from config.perfilado import MiddlewarePerfil
+from config.respuestas import RespuestaJSON
+from config.seguridad import comprobar_secreto
+from config.tiempos import MiddlewareDesconexion, responder_cancelacion
+from config.versiones import MiddlewareVersiones
 from fastapi.middleware.cors import CORSMiddleware
 
-app = FastAPI()
+configurar_bitacora()
+log = logging.getLogger("academia")
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    comprobar_secreto()
+    await abrir_pool()
+    escucha = asyncio.create_task(escuchar_cambios())
+    log.info("Aplicacion iniciada", extra={"pool_min": POOL_MIN, "pool_max": POOL_MAX})
+    yield
+    escucha.cancel()
+    await cerrar_pool()
+    log.info("Aplicacion detenida")
+    detener_bitacora()
+
+app = FastAPI(lifespan=lifespan, default_response_class=RespuestaJSON)
+
+app.add_exception_handler(HTTPException, responder_cancelacion)
+app.add_exception_handler(QueryCanceled, responder_cancelacion)
+
+app.add_middleware(MiddlewareIdempotencia)
+app.add_middleware(MiddlewareDesconexion)
+app.add_middleware(MiddlewareVersiones)
+app.add_middleware(MiddlewareMetricas)
+app.add_middleware(MiddlewarePerfil)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID", "Idempotent-Replayed"],
 )
+app.add_middleware(MiddlewareBitacora)
 app.include_router(alumno.router, prefix="/alumno", tags=["Alumno"])
 app.include_router(docente.router, prefix="/docente", tags=["Docente"])
 app.include_router(materia.router, prefix="/materia", tags=["Materia"])
@@ -32,4 +75,7 @@ app.include_router(administrador.router, prefix="/administrador", tags=["Adminis
 app.include_router(carrera.router, prefix="/carrera", tags=["Carrera"])
 app.include_router(especialidad.router, prefix="/especialidad", tags=["Especialidad"])
 app.include_router(usuario.router, prefix="/usuario", tags=["Usuario"])
-print("hola mundo")
+app.include_router(persona.router, prefix="/persona", tags=["Persona"])
+app.include_router(estadistica.router, prefix="/estadistica", tags=["Estadistica"])
+app.include_router(eventos.router, prefix="/eventos", tags=["Eventos"])
+app.include_router(sistema.router, tags=["Sistema"])
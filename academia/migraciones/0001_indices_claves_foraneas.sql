@@ -0,0 +1,30 @@
+-- migracion: sin transaccion
+-- Indices para las claves foraneas y los filtros que usan los joins de la API.
+-- CONCURRENTLY no bloquea escrituras mientras se crea, pero no puede ir en una
+-- transaccion: cada sentencia se ejecuta sola y todas toleran volver a correr.
+
+-- borrados en cascada de persona y catalogos, y joins persona -> alumno/docente
+CREATE INDEX CONCURRENTLY IF NOT EXISTS alumno_id_persona_idx ON alumno (id_persona);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS alumno_carrera_alumno_idx ON alumno (carrera_alumno);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS docente_id_persona_idx ON docente (id_persona);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS docente_id_especialidad_idx ON docente (id_especialidad);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS administrador_id_persona_idx ON administrador (id_persona);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS usuario_id_persona_idx ON usuario (id_persona);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS usuario_id_tipo_idx ON usuario (id_tipo);
+
+-- login por nombre de usuario
+CREATE INDEX CONCURRENTLY IF NOT EXISTS usuario_nombre_idx ON usuario (nombre);
+
+-- clases de un docente (y por periodo), de una materia, y exportaciones por periodo
+CREATE INDEX CONCURRENTLY IF NOT EXISTS clase_id_docente_periodo_idx ON clase (id_docente, periodo);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS clase_id_materia_idx ON clase (id_materia);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS clase_periodo_idx ON clase (periodo);
+
+-- inscripcion se recorre desde el alumno (kardex, cascada) y desde la clase (exportacion por
+-- periodo, notas de una clase); con INCLUDE ambas son index-only y no visitan la tabla. El
+-- UNIQUE (id_clase, id_alumno) sirve para buscar, pero obliga a leer cada fila del heap.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS inscripcion_id_alumno_idx ON inscripcion (id_alumno) INCLUDE (id_clase, id_inscripcion);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS inscripcion_id_clase_idx ON inscripcion (id_clase) INCLUDE (id_alumno, id_inscripcion);
+
+-- notas registradas por un docente y borrado en cascada de docentes
+CREATE INDEX CONCURRENTLY IF NOT EXISTS notas_id_docente_idx ON notas (id_docente);
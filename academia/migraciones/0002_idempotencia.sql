@@ -0,0 +1,14 @@
+-- Respuestas guardadas de los POST con Idempotency-Key (config/idempotencia.py).
+-- estado NULL: la peticion original sigue en curso; si no termina antes de en_curso_hasta
+-- (el worker se cayo), otra peticion con la misma clave puede tomarla.
+CREATE TABLE IF NOT EXISTS idempotencia (
+    clave VARCHAR(255) PRIMARY KEY,
+    huella CHAR(64) NOT NULL,
+    estado INT,
+    tipo VARCHAR(100),
+    cuerpo BYTEA,
+    en_curso_hasta TIMESTAMPTZ NOT NULL,
+    expira TIMESTAMPTZ NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idempotencia_expira_idx ON idempotencia (expira);
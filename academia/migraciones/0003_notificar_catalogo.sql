@@ -0,0 +1,21 @@
+-- NOTIFY 'catalogo' al escribir en las tablas cacheadas por config/cache.py.
+
+-- Avisa a los workers de la API que un catalogo cambio (invalida su cache)
+CREATE OR REPLACE FUNCTION notificar_catalogo() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('catalogo', TG_TABLE_NAME);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER carrera_notificar AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON carrera
+    FOR EACH STATEMENT EXECUTE FUNCTION notificar_catalogo();
+
+CREATE OR REPLACE TRIGGER especialidad_notificar AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON especialidad
+    FOR EACH STATEMENT EXECUTE FUNCTION notificar_catalogo();
+
+CREATE OR REPLACE TRIGGER tipo_usuario_notificar AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON tipo_usuario
+    FOR EACH STATEMENT EXECUTE FUNCTION notificar_catalogo();
+
+CREATE OR REPLACE TRIGGER materia_notificar AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON materia
+    FOR EACH STATEMENT EXECUTE FUNCTION notificar_catalogo();
@@ -0,0 +1,12 @@
+-- Una nota por inscripcion: las cargas por clase (PUT /clase/{id}/notas) y
+-- POST /nota/sincronizar hacen upsert con ON CONFLICT (id_inscripcion).
+-- Falla si ya hay inscripciones con mas de una nota: hay que depurarlas antes.
+-- El indice del UNIQUE sirve tambien a los joins inscripcion -> notas (0001 no crea otro).
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'notas_id_inscripcion_key') THEN
+        ALTER TABLE notas ADD CONSTRAINT notas_id_inscripcion_key UNIQUE (id_inscripcion);
+    END IF;
+END
+$$;
@@ -0,0 +1,4 @@
+-- Las contrasenas se guardan hasheadas (config/seguridad.py): el hash no entra en 50.
+-- Agrandar un VARCHAR no reescribe la tabla.
+
+ALTER TABLE usuario ALTER COLUMN contraseña TYPE VARCHAR(255);
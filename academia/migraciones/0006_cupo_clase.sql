@@ -0,0 +1,13 @@
+-- Cupo por clase para la cola de admision de inscripciones (config/admision.py) y un
+-- alumno inscrito una sola vez por clase.
+-- Falla si ya hay inscripciones repetidas: hay que depurarlas antes.
+
+ALTER TABLE clase ADD COLUMN IF NOT EXISTS cupo INT NOT NULL DEFAULT 40 CHECK (cupo >= 0);
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'inscripcion_id_clase_id_alumno_key') THEN
+        ALTER TABLE inscripcion ADD CONSTRAINT inscripcion_id_clase_id_alumno_key UNIQUE (id_clase, id_alumno);
+    END IF;
+END
+$$;
@@ -0,0 +1,234 @@
+-- Estadisticas de notas por clase, docente y carrera, mantenidas por triggers
+-- (config/estadistica.py); al final se calculan desde las notas que ya existen.
+-- estadistica_nota guarda los acumulados (promedio y tasa de aprobacion salen directo);
+-- estadistica_valor cuenta cuantas veces aparece cada nota (mediana, minimo, maximo e
+-- histograma se leen de ahi, como mucho 10001 filas por grupo sin importar cuantas notas haya).
+CREATE TABLE IF NOT EXISTS estadistica_nota (
+    ambito VARCHAR(10) NOT NULL,
+    id_ambito INT NOT NULL,
+    cantidad INT NOT NULL,
+    suma DECIMAL NOT NULL,
+    aprobados INT NOT NULL,
+    PRIMARY KEY (ambito, id_ambito)
+);
+
+CREATE TABLE IF NOT EXISTS estadistica_valor (
+    ambito VARCHAR(10) NOT NULL,
+    id_ambito INT NOT NULL,
+    nota DECIMAL(5,2) NOT NULL,
+    cantidad INT NOT NULL,
+    PRIMARY KEY (ambito, id_ambito, nota)
+);
+
+CREATE OR REPLACE FUNCTION nota_aprobacion() RETURNS DECIMAL AS $$
+    SELECT 51::DECIMAL
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Lo que las tablas de estadistica deberian contener: usado para recalcular y verificar
+CREATE OR REPLACE VIEW estadistica_base AS
+    SELECT 'clase'::VARCHAR(10) AS ambito, i.id_clase AS id_ambito, n.nota
+    FROM notas n JOIN inscripcion i ON i.id_inscripcion = n.id_inscripcion
+    WHERE n.nota IS NOT NULL
+    UNION ALL
+    SELECT 'docente', n.id_docente, n.nota
+    FROM notas n
+    WHERE n.nota IS NOT NULL
+    UNION ALL
+    SELECT 'carrera', a.carrera_alumno, n.nota
+    FROM notas n
+    JOIN inscripcion i ON i.id_inscripcion = n.id_inscripcion
+    JOIN alumno a ON a.id_alumno = i.id_alumno
+    WHERE n.nota IS NOT NULL;
+
+-- Suma (signo 1) o resta (signo -1) notas a los acumulados. Las filas se actualizan
+-- siempre en el mismo orden para que dos transacciones no se bloqueen entre si.
+CREATE OR REPLACE FUNCTION estadistica_aplicar(ambitos TEXT[], ids INT[], valores DECIMAL[], signos INT[])
+RETURNS void AS $$
+BEGIN
+    INSERT INTO estadistica_valor AS e (ambito, id_ambito, nota, cantidad)
+    SELECT a, i, v, sum(s)
+    FROM unnest(ambitos, ids, valores, signos) AS d(a, i, v, s)
+    WHERE i IS NOT NULL AND v IS NOT NULL
+    GROUP BY a, i, v
+    HAVING sum(s) <> 0
+    ORDER BY a, i, v
+    ON CONFLICT (ambito, id_ambito, nota) DO UPDATE SET cantidad = e.cantidad + EXCLUDED.cantidad;
+
+    INSERT INTO estadistica_nota AS e (ambito, id_ambito, cantidad, suma, aprobados)
+    SELECT a, i, sum(s), sum(s * v), COALESCE(sum(s) FILTER (WHERE v >= nota_aprobacion()), 0)
+    FROM unnest(ambitos, ids, valores, signos) AS d(a, i, v, s)
+    WHERE i IS NOT NULL AND v IS NOT NULL
+    GROUP BY a, i
+    ORDER BY a, i
+    ON CONFLICT (ambito, id_ambito) DO UPDATE SET
+        cantidad = e.cantidad + EXCLUDED.cantidad,
+        suma = e.suma + EXCLUDED.suma,
+        aprobados = e.aprobados + EXCLUDED.aprobados;
+
+    DELETE FROM estadistica_valor
+    WHERE cantidad = 0 AND (ambito, id_ambito, nota) IN (SELECT * FROM unnest(ambitos, ids, valores));
+    DELETE FROM estadistica_nota
+    WHERE cantidad = 0 AND (ambito, id_ambito) IN (SELECT * FROM unnest(ambitos, ids));
+END;
+$$ LANGUAGE plpgsql;
+
+-- Aplica un conjunto de notas (inscripcion, docente, nota, signo) a sus tres ambitos.
+-- Clase y carrera se buscan por la inscripcion: si ya se borro (borrado en cascada) su
+-- parte ya la resto el trigger de inscripcion o de alumno.
+CREATE OR REPLACE FUNCTION estadistica_aplicar_notas(inscripciones INT[], docentes INT[], valores DECIMAL[], signos INT[])
+RETURNS void AS $$
+    WITH d AS (
+        SELECT * FROM unnest(inscripciones, docentes, valores, signos) AS d(id_inscripcion, id_docente, nota, signo)
+    ), x AS (
+        SELECT 'docente' AS ambito, d.id_docente AS id_ambito, d.nota, d.signo FROM d
+        UNION ALL
+        SELECT 'clase', i.id_clase, d.nota, d.signo
+        FROM d JOIN inscripcion i ON i.id_inscripcion = d.id_inscripcion
+        UNION ALL
+        SELECT 'carrera', a.carrera_alumno, d.nota, d.signo
+        FROM d JOIN inscripcion i ON i.id_inscripcion = d.id_inscripcion
+        JOIN alumno a ON a.id_alumno = i.id_alumno
+    )
+    SELECT estadistica_aplicar(array_agg(ambito), array_agg(id_ambito), array_agg(nota), array_agg(signo))
+    FROM x
+    HAVING count(*) > 0;
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE FUNCTION estadistica_notas() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM estadistica_aplicar_notas(array_agg(id_inscripcion), array_agg(id_docente), array_agg(nota), array_agg(1))
+        FROM nuevas;
+    ELSE
+        PERFORM estadistica_aplicar_notas(array_agg(id_inscripcion), array_agg(id_docente), array_agg(nota), array_agg(signo))
+        FROM (
+            SELECT id_inscripcion, id_docente, nota, 1 AS signo FROM nuevas
+            UNION ALL
+            SELECT id_inscripcion, id_docente, nota, -1 FROM anteriores
+        ) c;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER notas_estadistica_insertar AFTER INSERT ON notas
+    REFERENCING NEW TABLE AS nuevas
+    FOR EACH STATEMENT EXECUTE FUNCTION estadistica_notas();
+
+CREATE OR REPLACE TRIGGER notas_estadistica_actualizar AFTER UPDATE ON notas
+    REFERENCING OLD TABLE AS anteriores NEW TABLE AS nuevas
+    FOR EACH STATEMENT EXECUTE FUNCTION estadistica_notas();
+
+-- El borrado va por fila y antes de borrar: en una cascada (docente, clase, alumno) los
+-- triggers por sentencia corren al final, cuando la inscripcion ya no esta para saber
+-- la clase y la carrera. Asi el primero que se borra (nota o inscripcion) es el que resta.
+CREATE OR REPLACE FUNCTION estadistica_notas_eliminar() RETURNS trigger AS $$
+BEGIN
+    PERFORM estadistica_aplicar_notas(ARRAY[OLD.id_inscripcion], ARRAY[OLD.id_docente], ARRAY[OLD.nota], ARRAY[-1]);
+    RETURN OLD;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER notas_estadistica_eliminar BEFORE DELETE ON notas
+    FOR EACH ROW EXECUTE FUNCTION estadistica_notas_eliminar();
+
+CREATE OR REPLACE FUNCTION estadistica_vaciar() RETURNS trigger AS $$
+BEGIN
+    TRUNCATE estadistica_nota, estadistica_valor;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER notas_estadistica_vaciar AFTER TRUNCATE ON notas
+    FOR EACH STATEMENT EXECUTE FUNCTION estadistica_vaciar();
+
+-- Una inscripcion que cambia de clase o de alumno mueve su nota entre clases y carreras.
+-- Al borrarla se resta antes de que la cascada borre la nota (despues ya no se sabe su clase).
+CREATE OR REPLACE FUNCTION estadistica_inscripcion() RETURNS trigger AS $$
+DECLARE
+    valor DECIMAL;
+BEGIN
+    SELECT nota INTO valor FROM notas WHERE id_inscripcion = OLD.id_inscripcion;
+    IF valor IS NULL THEN
+        RETURN COALESCE(NEW, OLD);
+    END IF;
+    PERFORM estadistica_aplicar(
+        ARRAY['clase', 'carrera'],
+        ARRAY[OLD.id_clase, (SELECT carrera_alumno FROM alumno WHERE id_alumno = OLD.id_alumno)],
+        ARRAY[valor, valor], ARRAY[-1, -1]
+    );
+    IF TG_OP = 'UPDATE' THEN
+        PERFORM estadistica_aplicar(
+            ARRAY['clase', 'carrera'],
+            ARRAY[NEW.id_clase, (SELECT carrera_alumno FROM alumno WHERE id_alumno = NEW.id_alumno)],
+            ARRAY[valor, valor], ARRAY[1, 1]
+        );
+    END IF;
+    RETURN COALESCE(NEW, OLD);
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER inscripcion_estadistica_actualizar AFTER UPDATE OF id_clase, id_alumno ON inscripcion
+    FOR EACH ROW EXECUTE FUNCTION estadistica_inscripcion();
+
+CREATE OR REPLACE TRIGGER inscripcion_estadistica_eliminar BEFORE DELETE ON inscripcion
+    FOR EACH ROW EXECUTE FUNCTION estadistica_inscripcion();
+
+-- Igual para el alumno: cambiar de carrera mueve todas sus notas; al borrarlo se restan
+-- de su carrera antes de que la cascada borre sus inscripciones.
+CREATE OR REPLACE FUNCTION estadistica_alumno() RETURNS trigger AS $$
+BEGIN
+    PERFORM estadistica_aplicar(array_agg(c.ambito), array_agg(c.id_ambito), array_agg(c.nota), array_agg(c.signo))
+    FROM (
+        SELECT 'carrera' AS ambito, OLD.carrera_alumno AS id_ambito, n.nota, -1 AS signo
+        FROM inscripcion i JOIN notas n ON n.id_inscripcion = i.id_inscripcion
+        WHERE i.id_alumno = OLD.id_alumno
+        UNION ALL
+        SELECT 'carrera', NEW.carrera_alumno, n.nota, 1
+        FROM inscripcion i JOIN notas n ON n.id_inscripcion = i.id_inscripcion
+        WHERE TG_OP = 'UPDATE' AND i.id_alumno = NEW.id_alumno
+    ) c
+    HAVING count(*) > 0;
+    RETURN COALESCE(NEW, OLD);
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER alumno_estadistica_actualizar AFTER UPDATE OF carrera_alumno ON alumno
+    FOR EACH ROW EXECUTE FUNCTION estadistica_alumno();
+
+CREATE OR REPLACE TRIGGER alumno_estadistica_eliminar BEFORE DELETE ON alumno
+    FOR EACH ROW EXECUTE FUNCTION estadistica_alumno();
+
+-- Al borrar una clase, docente o carrera se descartan sus estadisticas. Corre despues de
+-- las cascadas (los triggers de clave foranea se ejecutan primero por nombre).
+CREATE OR REPLACE FUNCTION estadistica_descartar() RETURNS trigger AS $$
+BEGIN
+    DELETE FROM estadistica_valor WHERE ambito = TG_ARGV[0] AND id_ambito = (to_jsonb(OLD) ->> TG_ARGV[1])::INT;
+    DELETE FROM estadistica_nota WHERE ambito = TG_ARGV[0] AND id_ambito = (to_jsonb(OLD) ->> TG_ARGV[1])::INT;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER clase_estadistica_descartar AFTER DELETE ON clase
+    FOR EACH ROW EXECUTE FUNCTION estadistica_descartar('clase', 'id_clase');
+
+CREATE OR REPLACE TRIGGER docente_estadistica_descartar AFTER DELETE ON docente
+    FOR EACH ROW EXECUTE FUNCTION estadistica_descartar('docente', 'id_docente');
+
+CREATE OR REPLACE TRIGGER carrera_estadistica_descartar AFTER DELETE ON carrera
+    FOR EACH ROW EXECUTE FUNCTION estadistica_descartar('carrera', 'id_carrera');
+
+-- Reconstruye todo desde cero (tras cargas con triggers desactivados o si la verificacion falla)
+CREATE OR REPLACE FUNCTION estadistica_recalcular() RETURNS void AS $$
+BEGIN
+    TRUNCATE estadistica_nota, estadistica_valor;
+    INSERT INTO estadistica_valor (ambito, id_ambito, nota, cantidad)
+    SELECT ambito, id_ambito, nota, count(*) FROM estadistica_base GROUP BY 1, 2, 3;
+    INSERT INTO estadistica_nota (ambito, id_ambito, cantidad, suma, aprobados)
+    SELECT ambito, id_ambito, sum(cantidad), sum(cantidad * nota),
+           COALESCE(sum(cantidad) FILTER (WHERE nota >= nota_aprobacion()), 0)
+    FROM estadistica_valor GROUP BY 1, 2;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT estadistica_recalcular();
@@ -0,0 +1,69 @@
+-- Feed de cambios para los suscriptores de /eventos (config/eventos.py): un NOTIFY por
+-- fila de notas e inscripcion en el canal 'cambios', con el alumno y la clase a quienes
+-- se reparte. Un listener por worker.
+CREATE OR REPLACE FUNCTION notificar_notas() RETURNS trigger AS $$
+BEGIN
+    -- en un borrado en cascada la inscripcion ya no esta: ese aviso lo da su propio trigger
+    IF TG_OP = 'DELETE' THEN
+        PERFORM pg_notify('cambios', json_build_object(
+            'tabla', 'notas', 'op', TG_OP, 'id_nota', n.id_nota, 'id_inscripcion', n.id_inscripcion,
+            'id_alumno', i.id_alumno, 'id_clase', i.id_clase, 'nota', n.nota)::TEXT)
+        FROM anteriores n JOIN inscripcion i ON i.id_inscripcion = n.id_inscripcion;
+    ELSE
+        PERFORM pg_notify('cambios', json_build_object(
+            'tabla', 'notas', 'op', TG_OP, 'id_nota', n.id_nota, 'id_inscripcion', n.id_inscripcion,
+            'id_alumno', i.id_alumno, 'id_clase', i.id_clase, 'nota', n.nota)::TEXT)
+        FROM nuevas n JOIN inscripcion i ON i.id_inscripcion = n.id_inscripcion;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER notas_notificar_insertar AFTER INSERT ON notas
+    REFERENCING NEW TABLE AS nuevas
+    FOR EACH STATEMENT EXECUTE FUNCTION notificar_notas();
+
+CREATE OR REPLACE TRIGGER notas_notificar_actualizar AFTER UPDATE ON notas
+    REFERENCING NEW TABLE AS nuevas
+    FOR EACH STATEMENT EXECUTE FUNCTION notificar_notas();
+
+CREATE OR REPLACE TRIGGER notas_notificar_eliminar AFTER DELETE ON notas
+    REFERENCING OLD TABLE AS anteriores
+    FOR EACH STATEMENT EXECUTE FUNCTION notificar_notas();
+
+CREATE OR REPLACE FUNCTION notificar_inscripcion() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM pg_notify('cambios', json_build_object(
+            'tabla', 'inscripcion', 'op', TG_OP, 'id_inscripcion', n.id_inscripcion,
+            'id_alumno', n.id_alumno, 'id_clase', n.id_clase)::TEXT)
+        FROM nuevas n;
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM pg_notify('cambios', json_build_object(
+            'tabla', 'inscripcion', 'op', TG_OP, 'id_inscripcion', a.id_inscripcion,
+            'id_alumno', a.id_alumno, 'id_clase', a.id_clase)::TEXT)
+        FROM anteriores a;
+    ELSE
+        -- si cambio de alumno o de clase, tambien se avisa a los anteriores
+        PERFORM pg_notify('cambios', json_build_object(
+            'tabla', 'inscripcion', 'op', TG_OP, 'id_inscripcion', n.id_inscripcion,
+            'id_alumno', n.id_alumno, 'id_clase', n.id_clase,
+            'anterior', CASE WHEN (a.id_alumno, a.id_clase) IS DISTINCT FROM (n.id_alumno, n.id_clase)
+                             THEN json_build_object('id_alumno', a.id_alumno, 'id_clase', a.id_clase) END)::TEXT)
+        FROM nuevas n JOIN anteriores a ON a.id_inscripcion = n.id_inscripcion;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER inscripcion_notificar_insertar AFTER INSERT ON inscripcion
+    REFERENCING NEW TABLE AS nuevas
+    FOR EACH STATEMENT EXECUTE FUNCTION notificar_inscripcion();
+
+CREATE OR REPLACE TRIGGER inscripcion_notificar_actualizar AFTER UPDATE ON inscripcion
+    REFERENCING OLD TABLE AS anteriores NEW TABLE AS nuevas
+    FOR EACH STATEMENT EXECUTE FUNCTION notificar_inscripcion();
+
+CREATE OR REPLACE TRIGGER inscripcion_notificar_eliminar AFTER DELETE ON inscripcion
+    REFERENCING OLD TABLE AS anteriores
+    FOR EACH STATEMENT EXECUTE FUNCTION notificar_inscripcion();
@@ -0,0 +1,55 @@
+-- Version por tabla para los GET condicionales (ETag / Last-Modified, config/versiones.py):
+-- cada sentencia que escribe en una tabla sube su contador dentro de la misma transaccion.
+CREATE TABLE IF NOT EXISTS version_tabla (
+    tabla VARCHAR(30) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    modificado TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+INSERT INTO version_tabla (tabla) VALUES
+('carrera'), ('especialidad'), ('tipo_usuario'), ('persona'), ('alumno'), ('docente'),
+('materia'), ('clase'), ('inscripcion'), ('notas'), ('administrador'), ('usuario')
+ON CONFLICT (tabla) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION versionar_tabla() RETURNS trigger AS $$
+BEGIN
+    UPDATE version_tabla SET version = version + 1, modificado = now() WHERE tabla = TG_TABLE_NAME;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER carrera_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON carrera
+    FOR EACH STATEMENT EXECUTE FUNCTION versionar_tabla();
+
+CREATE OR REPLACE TRIGGER especialidad_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON especialidad
+    FOR EACH STATEMENT EXECUTE FUNCTION versionar_tabla();
+
+CREATE OR REPLACE TRIGGER tipo_usuario_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON tipo_usuario
+    FOR EACH STATEMENT EXECUTE FUNCTION versionar_tabla();
+
+CREATE OR REPLACE TRIGGER persona_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON persona
+    FOR EACH STATEMENT EXECUTE FUNCTION versionar_tabla();
+
+CREATE OR REPLACE TRIGGER alumno_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON alumno
+    FOR EACH STATEMENT EXECUTE FUNCTION versionar_tabla();
+
+CREATE OR REPLACE TRIGGER docente_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON docente
+    FOR EACH STATEMENT EXECUTE FUNCTION versionar_tabla();
+
+CREATE OR REPLACE TRIGGER materia_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON materia
+    FOR EACH STATEMENT EXECUTE FUNCTION versionar_tabla();
+
+CREATE OR REPLACE TRIGGER clase_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON clase
+    FOR EACH STATEMENT EXECUTE FUNCTION versionar_tabla();
+
+CREATE OR REPLACE TRIGGER inscripcion_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON inscripcion
+    FOR EACH STATEMENT EXECUTE FUNCTION versionar_tabla();
+
+CREATE OR REPLACE TRIGGER notas_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON notas
+    FOR EACH STATEMENT EXECUTE FUNCTION versionar_tabla();
+
+CREATE OR REPLACE TRIGGER administrador_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON administrador
+    FOR EACH STATEMENT EXECUTE FUNCTION versionar_tabla();
+
+CREATE OR REPLACE TRIGGER usuario_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON usuario
+    FOR EACH STATEMENT EXECUTE FUNCTION versionar_tabla();
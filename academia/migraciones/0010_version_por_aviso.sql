@@ -0,0 +1,16 @@
+-- version_tabla tenia una fila por tabla que cada sentencia actualizaba: todas las
+-- transacciones que escribian en la misma tabla hacian cola en el bloqueo de esa fila
+-- hasta su commit, y dos que tocaban dos tablas en distinto orden podian bloquearse.
+-- Ahora cada sentencia toma un numero de la secuencia version_cambio (nextval no bloquea
+-- ni se deshace) y lo avisa por NOTIFY 'version', que Postgres entrega despues del
+-- commit. Cada worker guarda en memoria el ultimo aviso de cada tabla (config/versiones.py).
+CREATE SEQUENCE IF NOT EXISTS version_cambio;
+
+CREATE OR REPLACE FUNCTION versionar_tabla() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('version', TG_TABLE_NAME || ':' || nextval('version_cambio'));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TABLE IF EXISTS version_tabla;
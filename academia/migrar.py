@@ -0,0 +1,117 @@
+import argparse
+import hashlib
+import re
+import sys
+import time
+from pathlib import Path
+
+import psycopg
+
+from config.conexionDB import DB_URL
+
+# Migraciones versionadas del esquema. academiaDB.txt crea la base (version 0); los
+# cambios posteriores van en migraciones/NNNN_descripcion.sql y se aplican en orden.
+# Cada una se registra en la tabla migracion con su checksum: editar una migracion ya
+# aplicada es un error, el cambio va en una nueva.
+# Una migracion que empieza con "-- migracion: sin transaccion" (CREATE INDEX
+# CONCURRENTLY, por ejemplo) se ejecuta sentencia por sentencia fuera de transaccion;
+# sus sentencias deben poder repetirse (IF NOT EXISTS) por si falla a la mitad.
+# 0002-0009 tambien usan IF NOT EXISTS / CREATE OR REPLACE: las bases creadas con el
+# academiaDB.txt de antes de las migraciones ya tienen esos objetos y solo se registran.
+#
+# Uso:
+#   python migrar.py            aplica las pendientes
+#   python migrar.py --estado   muestra aplicadas y pendientes
+
+DIRECTORIO = Path(__file__).resolve().parent / "migraciones"
+SIN_TRANSACCION = "-- migracion: sin transaccion"
+# un solo migrador a la vez aunque se lance desde varios despliegues
+BLOQUEO = 7294_0001
+
+TABLA = """
+    CREATE TABLE IF NOT EXISTS migracion (
+        version INT PRIMARY KEY,
+        nombre VARCHAR(100) NOT NULL,
+        checksum CHAR(64) NOT NULL,
+        aplicada TIMESTAMPTZ NOT NULL DEFAULT now(),
+        duracion_ms INT NOT NULL
+    )
+"""
+
+def leer_migraciones():
+    migraciones = {}
+    for ruta in sorted(DIRECTORIO.glob("*.sql")):
+        numero, _, nombre = ruta.stem.partition("_")
+        version = int(numero)
+        if version in migraciones:
+            sys.exit(f"version {version} repetida: {migraciones[version][0]} y {nombre}")
+        texto = ruta.read_text(encoding="utf-8")
+        migraciones[version] = (nombre, texto, hashlib.sha256(texto.encode()).hexdigest())
+    return migraciones
+
+def sentencias(texto):
+    for parte in re.split(r";\s*$", texto, flags=re.MULTILINE):
+        lineas = [l for l in parte.splitlines() if l.strip() and not l.strip().startswith("--")]
+        if lineas:
+            yield parte.strip()
+
+def aplicar(conn, version, nombre, texto, checksum):
+    inicio = time.perf_counter()
+    registrar = "INSERT INTO migracion (version, nombre, checksum, duracion_ms) VALUES (%s, %s, %s, %s)"
+    if texto.startswith(SIN_TRANSACCION):
+        conn.autocommit = True
+        for sentencia in sentencias(texto):
+            conn.execute(sentencia)
+        invalidos = conn.execute("SELECT indexrelid::regclass::text FROM pg_index WHERE NOT indisvalid").fetchall()
+        if invalidos:
+            # un CREATE INDEX CONCURRENTLY fallido deja el indice invalido y IF NOT EXISTS lo saltaria
+            nombres = ", ".join(f[0] for f in invalidos)
+            raise RuntimeError(f"indices invalidos: {nombres}; borrelos con DROP INDEX CONCURRENTLY y reintente")
+        conn.execute(registrar, (version, nombre, checksum, int((time.perf_counter() - inicio) * 1000)))
+        conn.autocommit = False
+    else:
+        with conn.transaction():
+            conn.execute(texto)
+            conn.execute(registrar, (version, nombre, checksum, int((time.perf_counter() - inicio) * 1000)))
+
+def main():
+    parser = argparse.ArgumentParser(description="Aplica las migraciones pendientes del esquema")
+    parser.add_argument("--estado", action="store_true", help="solo muestra el estado")
+    args = parser.parse_args()
+
+    migraciones = leer_migraciones()
+    with psycopg.connect(DB_URL, autocommit=True) as conn:
+        conn.execute(TABLA)
+        conn.execute("SELECT pg_advisory_lock(%s)", (BLOQUEO,))
+        aplicadas = {
+            f[0]: f[1] for f in conn.execute("SELECT version, checksum FROM migracion ORDER BY version")
+        }
+        for version in sorted(set(aplicadas) - set(migraciones)):
+            print(f"  aviso: la version {version} esta aplicada pero no hay archivo")
+        for version, (nombre, _, checksum) in sorted(migraciones.items()):
+            if version in aplicadas and aplicadas[version] != checksum:
+                sys.exit(f"la migracion {version:04d}_{nombre} cambio despues de aplicarse; agregue una nueva")
+
+        pendientes = [v for v in sorted(migraciones) if v not in aplicadas]
+        if args.estado:
+            for version, (nombre, _, _) in sorted(migraciones.items()):
+                print(f"  {version:04d}_{nombre:40} {'aplicada' if version in aplicadas else 'pendiente'}")
+            return
+        if not pendientes:
+            print("el esquema esta al dia")
+            return
+
+        conn.autocommit = False
+        for version in pendientes:
+            nombre, texto, checksum = migraciones[version]
+            inicio = time.perf_counter()
+            print(f"  {version:04d}_{nombre} ...", end=" ", flush=True)
+            try:
+                aplicar(conn, version, nombre, texto, checksum)
+            except Exception as e:
+                print("error")
+                sys.exit(f"la migracion {version:04d}_{nombre} fallo: {e}")
+            print(f"{time.perf_counter() - inicio:.1f} s")
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 from config.conexionDB import get_conexion
+from config.paginacion import Listado, Paginacion
+from config.versiones import Versionado
+from config.idempotencia import idempotente
 
 router = APIRouter()
 
@@ -9,30 +12,39 @@ class Administrador(BaseModel):
     correo: str
     id_tipo: int   
 
-@router.get("/")
-async def listar_administradores(conn=Depends(get_conexion)):
-    consulta = """
-        SELECT id_admin, nombre, correo, id_tipo
-        FROM administrador
-        ORDER BY id_admin
-    """
+# administrador solo guarda id_persona: nombre y correo salen de persona
+CONSULTA_ADMINISTRADORES = """
+    SELECT ad.id_admin, ad.id_persona, p.nombre, p.apellido_pat, p.apellido_mat, p.correo
+    FROM administrador ad
+    JOIN persona p ON p.id_persona = ad.id_persona
+"""
+
+listado_administradores = Listado("administrador", "id_admin", {
+    "id_admin": int,
+    "id_persona": int,
+    "nombre": str,
+    "apellido_pat": str,
+    "apellido_mat": str,
+    "correo": str,
+}, origen=CONSULTA_ADMINISTRADORES)
+
+version_administradores = Versionado("administrador", "id_admin", otras=("persona",))
+
+@router.get("/", dependencies=[Depends(version_administradores.listado)])
+async def listar_administradores(pagina: Paginacion = Depends(listado_administradores), conn=Depends(get_conexion)):
+    if pagina.stream:
+        return await pagina.transmitir(conn)
     try:
-        async with conn.cursor() as cursor:
-            await cursor.execute(consulta)
-            administradores = await cursor.fetchall()
-            if not administradores:
-                return {"mensaje": "No hay administradores registrados"}
-            return administradores
-    except Exception as e:
+        administradores = await pagina.buscar(conn)
+        if not administradores:
+            return {"mensaje": "No hay administradores registrados"}
+        return pagina.responder(administradores)
+    except Exception:
         raise HTTPException(status_code=400, detail="Error al consultar administradores")
 
-@router.get("/{id_admin}")
+@router.get("/{id_admin}", dependencies=[Depends(version_administradores.fila)])
 async def obtener_administrador(id_admin: int, conn=Depends(get_conexion)):
-    consulta = """
-        SELECT id_admin, nombre, correo, id_tipo
-        FROM administrador
-        WHERE id_admin = %s
-    """
+    consulta = CONSULTA_ADMINISTRADORES + "WHERE ad.id_admin = %s"
     try:
         async with conn.cursor() as cursor:
             await cursor.execute(consulta, (id_admin,))
@@ -40,10 +52,11 @@ async def obtener_administrador(id_admin: int, conn=Depends(get_conexion)):
             if not admin:
                 raise HTTPException(status_code=404, detail="Administrador no encontrado")
             return admin
-    except Exception as e:
+    except Exception:
         raise HTTPException(status_code=400, detail="Error al consultar administrador")
 
 @router.post("/")
+@idempotente
 async def insertar_administrador(admin: Administrador, conn=Depends(get_conexion)):
     consulta = """
         INSERT INTO administrador(nombre, correo, id_tipo)
@@ -61,7 +74,7 @@ async def insertar_administrador(admin: Administrador, conn=Depends(get_conexion
             nuevo_id = await cursor.fetchone()
             await conn.commit()
             return {"mensaje": "Administrador registrado exitosamente", "id_admin": nuevo_id["id_admin"]}
-    except Exception as e:
+    except Exception:
         raise HTTPException(status_code=400, detail="No se pudo registrar el administrador")
 
 @router.put("/{id_admin}")
@@ -86,7 +99,7 @@ async def actualizar_administrador(id_admin: int, admin: Administrador, conn=Dep
             actualizado = await cursor.fetchone()
             await conn.commit()
             return {"mensaje": "Administrador actualizado correctamente", "id_admin": actualizado["id_admin"]}
-    except Exception as e:
+    except Exception:
         raise HTTPException(status_code=400, detail="No se pudo actualizar el administrador")
 
 @router.delete("/{id_admin}")
@@ -99,5 +112,5 @@ async def eliminar_administrador(id_admin: int, conn=Depends(get_conexion)):
                 raise HTTPException(status_code=404, detail="Administrador no encontrado")
             await conn.commit()
             return {"mensaje": "Administrador eliminado correctamente"}
-    except Exception as e:
+    except Exception:
         raise HTTPException(status_code=400, detail="No se pudo eliminar el administrador")
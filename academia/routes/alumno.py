@@ -1,15 +1,25 @@
 import asyncio
+import logging
 import sys
-from fastapi import FastAPI, Depends, HTTPException, APIRouter
+from datetime import date
+from fastapi import FastAPI, Depends, HTTPException, APIRouter, Request
 from pydantic import BaseModel
 from typing import Optional
 from config.conexionDB import get_conexion
+from config.paginacion import Listado, Paginacion
+from config.versiones import Versionado
+from config.carga import CargaMasiva, existe
+from config.lotes import CargadorLotes, ids_lote
+from config.tiempos import tiempo_limite
+from config.idempotencia import idempotente
+from config.parcial import Parcial
 
 if sys.platform == "win32":
     asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
 
 app = FastAPI()
 router = APIRouter()
+log = logging.getLogger(__name__)
 
 class Alumno(BaseModel):
     nombre: str
@@ -20,53 +30,153 @@ class Alumno(BaseModel):
     fecha_nacimiento: Optional[str] = None
     carrera: Optional[str] = None
 
-@router.get("/")
-async def listar_alumnos(conn=Depends(get_conexion)):
-    consulta = """
-        SELECT id_alumno, nombre, apellido_pat, apellido_mat, ci,
-               correo, fecha_nacimiento, carrera
-        FROM alumno
-        ORDER BY id_alumno
-    """
+class AlumnoParcial(BaseModel):
+    id_persona: Optional[int] = None
+    carrera_alumno: Optional[int] = None
+
+class AlumnoCarga(BaseModel):
+    id_persona: int
+    carrera_alumno: int
+
+carga_alumnos = CargaMasiva(
+    "alumno", "id_alumno", AlumnoCarga,
+    validaciones=[existe("id_persona", "persona"), existe("carrera_alumno", "carrera", "id_carrera")],
+)
+
+# alumno solo guarda id_persona y carrera_alumno: los datos salen de persona y carrera
+CONSULTA_ALUMNOS = """
+    SELECT a.id_alumno, a.id_persona, p.nombre, p.apellido_pat, p.apellido_mat, p.ci,
+           p.correo, p.fecha_nacimiento, a.carrera_alumno, c.nombre_carrera AS carrera
+    FROM alumno a
+    JOIN persona p ON p.id_persona = a.id_persona
+    JOIN carrera c ON c.id_carrera = a.carrera_alumno
+"""
+
+cargador_alumnos = CargadorLotes("alumno", CONSULTA_ALUMNOS, "id_alumno")
+
+listado_alumnos = Listado("alumno", "id_alumno", {
+    "id_alumno": int,
+    "id_persona": int,
+    "nombre": str,
+    "apellido_pat": str,
+    "apellido_mat": str,
+    "ci": int,
+    "correo": str,
+    "fecha_nacimiento": date,
+    "carrera_alumno": int,
+    "carrera": str,
+}, origen=CONSULTA_ALUMNOS)
+
+# obtener_alumno sale del CargadorLotes, que usa su propia conexion: la version se
+# comprueba en memoria por tabla (sin xmin de la fila) para no ocupar otra del pool
+version_alumnos = Versionado("alumno", otras=("persona", "carrera"))
+parcial_alumnos = Parcial("alumno", "id_alumno")
+version_kardex = Versionado(
+    "alumno", "id_alumno", otras=("persona", "carrera", "inscripcion", "clase", "materia", "notas")
+)
+
+@router.get("/", dependencies=[Depends(version_alumnos.listado)])
+async def listar_alumnos(pagina: Paginacion = Depends(listado_alumnos), ids: Optional[list] = Depends(ids_lote), conn=Depends(get_conexion)):
+    if pagina.stream:
+        return await pagina.transmitir(conn)
     try:
-        async with conn.cursor() as cursor:
-            await cursor.execute(consulta)
-            alumnos = await cursor.fetchall()
+        if ids is not None:
+            return await cargador_alumnos.listar(conn, ids)
+
+        alumnos = await pagina.buscar(conn)
 
-            if not alumnos:
-                return {"mensaje": "No hay alumnos registrados"}
+        if not alumnos:
+            return {"mensaje": "No hay alumnos registrados"}
 
-            return alumnos
+        return pagina.responder(alumnos)
 
-    except Exception as e:
-        print(f"Error al listar alumnos: {e}")
+    except Exception:
+        log.exception("Error al listar alumnos")
         raise HTTPException(status_code=400, detail="Error al consultar alumnos")
 
-@router.get("/{id_alumno}")
-async def obtener_alumno(id_alumno: int, conn=Depends(get_conexion)):
-    consulta = """
-        SELECT id_alumno, nombre, apellido_pat, apellido_mat, ci,
-               correo, fecha_nacimiento, carrera
-        FROM alumno
-        WHERE id_alumno = %s
-    """
+@router.get("/{id_alumno}", dependencies=[Depends(version_alumnos.listado)])
+async def obtener_alumno(id_alumno: int):
+    try:
+        alumno = await cargador_alumnos.cargar(id_alumno)
+
+        if not alumno:
+            raise HTTPException(status_code=404, detail="Alumno no encontrado")
+
+        return alumno
+
+    except HTTPException:
+        raise
+    except Exception:
+        log.exception("Error al consultar alumno")
+        raise HTTPException(status_code=400, detail="Error al consultar alumno")
+
+# Todo el historial en una sola consulta: inscripciones, clases, materias y notas
+# agrupadas por periodo, con los promedios calculados en Postgres.
+CONSULTA_KARDEX = """
+    SELECT a.id_alumno, p.nombre, p.apellido_pat, p.apellido_mat, p.ci,
+           c.nombre_carrera AS carrera,
+           COALESCE(k.periodos, '[]'::json) AS periodos,
+           k.promedio_general
+    FROM alumno a
+    JOIN persona p ON p.id_persona = a.id_persona
+    JOIN carrera c ON c.id_carrera = a.carrera_alumno
+    LEFT JOIN LATERAL (
+        SELECT json_agg(
+                   json_build_object(
+                       'periodo', pe.periodo,
+                       'promedio', pe.promedio,
+                       'materias', pe.materias
+                   ) ORDER BY pe.periodo
+               ) AS periodos,
+               ROUND(SUM(pe.suma) / NULLIF(SUM(pe.cantidad), 0), 2) AS promedio_general
+        FROM (
+            SELECT cl.periodo,
+                   ROUND(AVG(n.nota), 2) AS promedio,
+                   SUM(n.nota) AS suma,
+                   COUNT(n.nota) AS cantidad,
+                   json_agg(
+                       json_build_object(
+                           'id_inscripcion', i.id_inscripcion,
+                           'id_clase', cl.id_clase,
+                           'id_materia', m.id_materia,
+                           'materia', m.nombre,
+                           'id_nota', n.id_nota,
+                           'nota', n.nota,
+                           'fecha_registro', n.fecha_registro
+                       ) ORDER BY m.nombre, i.id_inscripcion
+                   ) AS materias
+            FROM inscripcion i
+            JOIN clase cl ON cl.id_clase = i.id_clase
+            JOIN materia m ON m.id_materia = cl.id_materia
+            LEFT JOIN notas n ON n.id_inscripcion = i.id_inscripcion
+            WHERE i.id_alumno = a.id_alumno
+              AND (%(periodo)s::varchar IS NULL OR cl.periodo = %(periodo)s)
+            GROUP BY cl.periodo
+        ) pe
+    ) k ON TRUE
+    WHERE a.id_alumno = %(id_alumno)s
+"""
+
+@router.get("/{id_alumno}/kardex", dependencies=[Depends(version_kardex.fila)])
+async def obtener_kardex(id_alumno: int, periodo: Optional[str] = None, conn=Depends(get_conexion)):
     try:
         async with conn.cursor() as cursor:
-            await cursor.execute(consulta, (id_alumno,))
-            alumno = await cursor.fetchone()
+            await cursor.execute(CONSULTA_KARDEX, {"id_alumno": id_alumno, "periodo": periodo})
+            kardex = await cursor.fetchone()
 
-            if not alumno:
+            if not kardex:
                 raise HTTPException(status_code=404, detail="Alumno no encontrado")
 
-            return alumno
+            return kardex
 
     except HTTPException:
         raise
-    except Exception as e:
-        print(f"Error al consultar alumno: {e}")
-        raise HTTPException(status_code=400, detail="Error al consultar alumno")
+    except Exception:
+        log.exception("Error al consultar kardex")
+        raise HTTPException(status_code=400, detail="Error al consultar kardex")
 
 @router.post("/")
+@idempotente
 async def insertar_alumno(alumno: Alumno, conn=Depends(get_conexion)):
     consulta = """
         INSERT INTO alumno(
@@ -98,10 +208,22 @@ async def insertar_alumno(alumno: Alumno, conn=Depends(get_conexion)):
                 "id_alumno": nuevo_id["id_alumno"]
             }
 
-    except Exception as e:
-        print(f"Error al insertar alumno: {e}")
+    except Exception:
+        log.exception("Error al insertar alumno")
         raise HTTPException(status_code=400, detail="No se pudo registrar el alumno")
 
+@router.post("/carga")
+@tiempo_limite(0)
+async def cargar_alumnos(request: Request, atomico: bool = False, conn=Depends(get_conexion)):
+    try:
+        resultado = await carga_alumnos.ejecutar(conn, request, atomico)
+        return {"mensaje": "Carga de alumnos finalizada", **resultado}
+    except HTTPException:
+        raise
+    except Exception:
+        log.exception("Error en la carga masiva de alumnos")
+        raise HTTPException(status_code=400, detail="No se pudo completar la carga de alumnos")
+
 @router.put("/{id_alumno}")
 async def actualizar_alumno(id_alumno: int, alumno: Alumno, conn=Depends(get_conexion)):
     consulta = """
@@ -145,8 +267,22 @@ async def actualizar_alumno(id_alumno: int, alumno: Alumno, conn=Depends(get_con
 
     except HTTPException:
         raise
-    except Exception as e:
-        print(f"Error al actualizar alumno: {e}")
+    except Exception:
+        log.exception("Error al actualizar alumno")
+        raise HTTPException(status_code=400, detail="No se pudo actualizar el alumno")
+
+@router.patch("/{id_alumno}")
+async def modificar_alumno(id_alumno: int, alumno: AlumnoParcial, conn=Depends(get_conexion)):
+    try:
+        actualizado = await parcial_alumnos.actualizar(conn, id_alumno, alumno)
+        if actualizado is None:
+            raise HTTPException(status_code=404, detail="Alumno no encontrado")
+        await conn.commit()
+        return {"mensaje": "Alumno actualizado correctamente", "id_alumno": id_alumno, "sin_cambios": not actualizado}
+    except HTTPException:
+        raise
+    except Exception:
+        log.exception("Error al modificar alumno")
         raise HTTPException(status_code=400, detail="No se pudo actualizar el alumno")
 
 @router.delete("/{id_alumno}")
@@ -165,8 +301,8 @@ async def eliminar_alumno(id_alumno: int, conn=Depends(get_conexion)):
 
     except HTTPException:
         raise
-    except Exception as e:
-        print(f"Error al eliminar alumno: {e}")
+    except Exception:
+        log.exception("Error al eliminar alumno")
         raise HTTPException(status_code=400, detail="No se pudo eliminar el alumno")
 
 app.include_router(router)
@@ -1,49 +1,72 @@
 import asyncio
+import logging
 import sys
 from fastapi import FastAPI, Depends, HTTPException, APIRouter
 from pydantic import BaseModel
-from config.conexionDB import get_conexion
+from config.conexionDB import get_conexion, conexion
+from config.cache import cache_catalogo
+from config.paginacion import Listado, Paginacion
+from config.versiones import etag_contenido
+from config.idempotencia import idempotente
 
 if sys.platform == "win32":
     asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
 
 app = FastAPI()
 router = APIRouter()
+log = logging.getLogger(__name__)
 
 class Carrera(BaseModel):
     nombre_carrera: str
 
-@router.get("/")
-async def listar_carreras(conn=Depends(get_conexion)):
-    consulta = "SELECT id_carrera, nombre_carrera FROM carrera ORDER BY id_carrera"
+listado_carreras = Listado("carrera", "id_carrera", {
+    "id_carrera": int,
+    "nombre_carrera": str,
+})
+
+@router.get("/", dependencies=[Depends(etag_contenido)])
+async def listar_carreras(pagina: Paginacion = Depends(listado_carreras)):
+    if pagina.stream:
+        return await pagina.transmitir(None)
+
+    async def cargar():
+        async with conexion() as conn:
+            return await pagina.buscar(conn)
+
     try:
-        async with conn.cursor() as cursor:
-            await cursor.execute(consulta)
-            carreras = await cursor.fetchall()
-            if not carreras:
-                return {"mensaje": "No hay carreras registradas"}
-            return carreras
-    except Exception as e:
-        print(f"Error al listar carreras: {e}")
+        carreras = await cache_catalogo.obtener("carrera", ("listar", pagina.clave), cargar)
+        if not carreras:
+            return {"mensaje": "No hay carreras registradas"}
+        return pagina.responder(carreras)
+    except HTTPException:
+        raise
+    except Exception:
+        log.exception("Error al listar carreras")
         raise HTTPException(status_code=400, detail="Error al consultar carreras")
 
-@router.get("/{id_carrera}")
-async def obtener_carrera(id_carrera: int, conn=Depends(get_conexion)):
+@router.get("/{id_carrera}", dependencies=[Depends(etag_contenido)])
+async def obtener_carrera(id_carrera: int):
     consulta = "SELECT id_carrera, nombre_carrera FROM carrera WHERE id_carrera = %s"
+
+    async def cargar():
+        async with conexion() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(consulta, (id_carrera,))
+                return await cursor.fetchone()
+
     try:
-        async with conn.cursor() as cursor:
-            await cursor.execute(consulta, (id_carrera,))
-            carrera = await cursor.fetchone()
-            if not carrera:
-                raise HTTPException(status_code=404, detail="Carrera no encontrada")
-            return carrera
+        carrera = await cache_catalogo.obtener("carrera", id_carrera, cargar)
+        if not carrera:
+            raise HTTPException(status_code=404, detail="Carrera no encontrada")
+        return carrera
     except HTTPException:
         raise
-    except Exception as e:
-        print(f"Error al consultar carrera: {e}")
+    except Exception:
+        log.exception("Error al consultar carrera")
         raise HTTPException(status_code=400, detail="Error al consultar carrera")
 
 @router.post("/")
+@idempotente
 async def insertar_carrera(carrera: Carrera, conn=Depends(get_conexion)):
     consulta = "INSERT INTO carrera(nombre_carrera) VALUES (%s) RETURNING id_carrera"
     try:
@@ -51,9 +74,10 @@ async def insertar_carrera(carrera: Carrera, conn=Depends(get_conexion)):
             await cursor.execute(consulta, (carrera.nombre_carrera,))
             nuevo_id = await cursor.fetchone()
             await conn.commit()
+            cache_catalogo.invalidar("carrera")
             return {"mensaje": "Carrera registrada exitosamente", "id_carrera": nuevo_id["id_carrera"]}
-    except Exception as e:
-        print(f"Error al insertar carrera: {e}")
+    except Exception:
+        log.exception("Error al insertar carrera")
         raise HTTPException(status_code=400, detail="No se pudo registrar la carrera")
 
 @router.put("/{id_carrera}")
@@ -66,11 +90,12 @@ async def actualizar_carrera(id_carrera: int, carrera: Carrera, conn=Depends(get
                 raise HTTPException(status_code=404, detail="Carrera no encontrada")
             actualizado = await cursor.fetchone()
             await conn.commit()
+            cache_catalogo.invalidar("carrera")
             return {"mensaje": "Carrera actualizada correctamente", "id_carrera": actualizado["id_carrera"]}
     except HTTPException:
         raise
-    except Exception as e:
-        print(f"Error al actualizar carrera: {e}")
+    except Exception:
+        log.exception("Error al actualizar carrera")
         raise HTTPException(status_code=400, detail="No se pudo actualizar la carrera")
 
 @router.delete("/{id_carrera}")
@@ -82,11 +107,12 @@ async def eliminar_carrera(id_carrera: int, conn=Depends(get_conexion)):
             if cursor.rowcount == 0:
                 raise HTTPException(status_code=404, detail="Carrera no encontrada")
             await conn.commit()
+            cache_catalogo.invalidar("carrera")
             return {"mensaje": "Carrera eliminada correctamente"}
     except HTTPException:
         raise
-    except Exception as e:
-        print(f"Error al eliminar carrera: {e}")
+    except Exception:
+        log.exception("Error al eliminar carrera")
         raise HTTPException(status_code=400, detail="No se pudo eliminar la carrera")
 
 app.include_router(router, prefix="/carreras", tags=["Carreras"])
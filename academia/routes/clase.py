@@ -1,36 +1,64 @@
+import logging
 from fastapi import APIRouter, Depends, HTTPException
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from typing import Optional
 from config.conexionDB import get_conexion
+from config.paginacion import Listado, Paginacion
+from config.versiones import Versionado
+from config.idempotencia import idempotente
+from config.parcial import Parcial
 
 router = APIRouter()
+log = logging.getLogger(__name__)
 
 class Clase(BaseModel):
-    id_curso: int
+    id_materia: int
     id_docente: int
-    periodo: str  
+    periodo: str
+    cupo: int = Field(40, ge=0)
 
-@router.get("/")
-async def listar_clases(conn=Depends(get_conexion)):
-    print("Listando clases")
-    consulta = """
-        SELECT id_clase, id_curso, id_docente, periodo
-        FROM clase
-        ORDER BY id_clase
-    """
+class ClaseParcial(BaseModel):
+    id_materia: Optional[int] = None
+    id_docente: Optional[int] = None
+    periodo: Optional[str] = None
+    cupo: Optional[int] = Field(None, ge=0)
+
+class NotaClase(BaseModel):
+    id_inscripcion: int
+    nota: float = Field(ge=0, le=100)
+
+class NotasClase(BaseModel):
+    id_docente: Optional[int] = None   # por defecto, el docente de la clase
+    notas: list[NotaClase] = Field(min_length=1)
+
+listado_clases = Listado("clase", "id_clase", {
+    "id_clase": int,
+    "id_materia": int,
+    "id_docente": int,
+    "periodo": str,
+    "cupo": int,
+})
+
+version_clases = Versionado("clase", "id_clase")
+parcial_clases = Parcial("clase", "id_clase")
+
+@router.get("/", dependencies=[Depends(version_clases.listado)])
+async def listar_clases(pagina: Paginacion = Depends(listado_clases), conn=Depends(get_conexion)):
+    log.debug("Listando clases")
+    if pagina.stream:
+        return await pagina.transmitir(conn)
     try:
-        async with conn.cursor() as cursor:
-            await cursor.execute(consulta)
-            clases = await cursor.fetchall()
-            if not clases:
-                return {"mensaje": "No hay clases registradas"}
-            return clases
-    except Exception as e:
+        clases = await pagina.buscar(conn)
+        if not clases:
+            return {"mensaje": "No hay clases registradas"}
+        return pagina.responder(clases)
+    except Exception:
         raise HTTPException(status_code=400, detail="Error al consultar clases")
 
-@router.get("/{id_clase}")
+@router.get("/{id_clase}", dependencies=[Depends(version_clases.fila)])
 async def obtener_clase(id_clase: int, conn=Depends(get_conexion)):
     consulta = """
-        SELECT id_clase, id_curso, id_docente, periodo
+        SELECT id_clase, id_materia, id_docente, periodo, cupo
         FROM clase
         WHERE id_clase = %s
     """
@@ -41,20 +69,22 @@ async def obtener_clase(id_clase: int, conn=Depends(get_conexion)):
             if not clase:
                 raise HTTPException(status_code=404, detail="Clase no encontrada")
             return clase
-    except Exception as e:
+    except Exception:
         raise HTTPException(status_code=400, detail="Error al consultar clase")
 
 @router.post("/")
+@idempotente
 async def insertar_clase(clase: Clase, conn=Depends(get_conexion)):
     consulta = """
-        INSERT INTO clase(id_curso, id_docente, periodo)
-        VALUES (%s, %s, %s)
+        INSERT INTO clase(id_materia, id_docente, periodo, cupo)
+        VALUES (%s, %s, %s, %s)
         RETURNING id_clase
     """
     parametros = (
-        clase.id_curso,
+        clase.id_materia,
         clase.id_docente,
-        clase.periodo
+        clase.periodo,
+        clase.cupo
     )
     try:
         async with conn.cursor() as cursor:
@@ -62,21 +92,22 @@ async def insertar_clase(clase: Clase, conn=Depends(get_conexion)):
             nuevo_id = await cursor.fetchone()
             await conn.commit()
             return {"mensaje": "Clase registrada exitosamente", "id_clase": nuevo_id["id_clase"]}
-    except Exception as e:
+    except Exception:
         raise HTTPException(status_code=400, detail="No se pudo registrar la clase")
 
 @router.put("/{id_clase}")
 async def actualizar_clase(id_clase: int, clase: Clase, conn=Depends(get_conexion)):
     consulta = """
         UPDATE clase
-        SET id_curso = %s, id_docente = %s, periodo = %s
+        SET id_materia = %s, id_docente = %s, periodo = %s, cupo = %s
         WHERE id_clase = %s
         RETURNING id_clase
     """
     parametros = (
-        clase.id_curso,
+        clase.id_materia,
         clase.id_docente,
         clase.periodo,
+        clase.cupo,
         id_clase
     )
     try:
@@ -87,7 +118,93 @@ async def actualizar_clase(id_clase: int, clase: Clase, conn=Depends(get_conexio
             actualizado = await cursor.fetchone()
             await conn.commit()
             return {"mensaje": "Clase actualizada correctamente", "id_clase": actualizado["id_clase"]}
-    except Exception as e:
+    except Exception:
+        raise HTTPException(status_code=400, detail="No se pudo actualizar la clase")
+
+@router.put("/{id_clase}/notas")
+async def registrar_notas_clase(id_clase: int, lote: NotasClase, conn=Depends(get_conexion)):
+    consulta = """
+        INSERT INTO notas(id_inscripcion, id_docente, nota)
+        VALUES (%s, %s, %s)
+        ON CONFLICT (id_inscripcion) DO UPDATE
+        SET id_docente = EXCLUDED.id_docente,
+            nota = EXCLUDED.nota,
+            fecha_registro = CURRENT_DATE
+        WHERE notas.nota IS DISTINCT FROM EXCLUDED.nota
+           OR notas.id_docente IS DISTINCT FROM EXCLUDED.id_docente
+        RETURNING id_nota, (xmax = 0) AS insertada
+    """
+    try:
+        async with conn.cursor() as cursor:
+            await cursor.execute("SELECT id_docente FROM clase WHERE id_clase = %s", (id_clase,))
+            clase = await cursor.fetchone()
+            if not clase:
+                raise HTTPException(status_code=404, detail="Clase no encontrada")
+            id_docente = lote.id_docente or clase["id_docente"]
+
+            await cursor.execute(
+                "SELECT id_inscripcion FROM inscripcion WHERE id_clase = %s AND id_inscripcion = ANY(%s)",
+                (id_clase, [n.id_inscripcion for n in lote.notas]),
+            )
+            de_la_clase = {f["id_inscripcion"] for f in await cursor.fetchall()}
+
+            resultados = []
+            aceptadas = []
+            vistas = set()
+            for n in lote.notas:
+                resultado = {"id_inscripcion": n.id_inscripcion, "nota": n.nota}
+                if n.id_inscripcion not in de_la_clase:
+                    resultado.update(estado="rechazada", detalle="La inscripción no pertenece a la clase")
+                elif n.id_inscripcion in vistas:
+                    resultado.update(estado="rechazada", detalle="Inscripción repetida en el lote")
+                else:
+                    vistas.add(n.id_inscripcion)
+                    aceptadas.append(resultado)
+                resultados.append(resultado)
+
+            if aceptadas:
+                # un solo viaje: todos los upserts se envian juntos en modo pipeline
+                async with conn.pipeline():
+                    await cursor.executemany(
+                        consulta,
+                        [(r["id_inscripcion"], id_docente, r["nota"]) for r in aceptadas],
+                        returning=True,
+                    )
+                for resultado in aceptadas:
+                    fila = await cursor.fetchone()
+                    if fila is None:
+                        resultado["estado"] = "sin_cambios"
+                    else:
+                        resultado["id_nota"] = fila["id_nota"]
+                        resultado["estado"] = "creada" if fila["insertada"] else "actualizada"
+                    cursor.nextset()
+            await conn.commit()
+
+            return {
+                "mensaje": "Notas de la clase registradas",
+                "id_clase": id_clase,
+                "aceptadas": len(aceptadas),
+                "rechazadas": len(resultados) - len(aceptadas),
+                "resultados": resultados,
+            }
+    except HTTPException:
+        raise
+    except Exception:
+        log.exception("Error al registrar notas de la clase")
+        raise HTTPException(status_code=400, detail="No se pudieron registrar las notas de la clase")
+
+@router.patch("/{id_clase}")
+async def modificar_clase(id_clase: int, clase: ClaseParcial, conn=Depends(get_conexion)):
+    try:
+        actualizado = await parcial_clases.actualizar(conn, id_clase, clase)
+        if actualizado is None:
+            raise HTTPException(status_code=404, detail="Clase no encontrada")
+        await conn.commit()
+        return {"mensaje": "Clase actualizada correctamente", "id_clase": id_clase, "sin_cambios": not actualizado}
+    except HTTPException:
+        raise
+    except Exception:
+        log.exception("Error al modificar clase")
         raise HTTPException(status_code=400, detail="No se pudo actualizar la clase")
 
 @router.delete("/{id_clase}")
@@ -100,5 +217,5 @@ async def eliminar_clase(id_clase: int, conn=Depends(get_conexion)):
                 raise HTTPException(status_code=404, detail="Clase no encontrada")
             await conn.commit()
             return {"mensaje": "Clase eliminada correctamente"}
-    except Exception as e:
+    except Exception:
         raise HTTPException(status_code=400, detail="No se pudo eliminar la clase")
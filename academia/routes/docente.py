@@ -4,6 +4,11 @@ from fastapi import FastAPI, Depends, HTTPException, APIRouter
 from pydantic import BaseModel
 from typing import Optional
 from config.conexionDB import get_conexion
+from config.paginacion import Listado, Paginacion
+from config.versiones import Versionado
+from config.lotes import CargadorLotes, ids_lote
+from config.idempotencia import idempotente
+from config.parcial import Parcial
 
 if sys.platform == "win32":
     asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
@@ -19,43 +24,66 @@ class Docente(BaseModel):
     correo: str
     especialidad: str
 
-@router.get("/")
-async def listar_docentes(conn=Depends(get_conexion)):
-    consulta = """
-        SELECT id_docente, nombre, apellido_pat, apellido_mat, ci,
-               correo, especialidad
-        FROM docente
-        ORDER BY id_docente
-    """
+class DocenteParcial(BaseModel):
+    id_persona: Optional[int] = None
+    id_especialidad: Optional[int] = None
+
+# docente solo guarda id_persona e id_especialidad: los datos salen de persona y especialidad
+CONSULTA_DOCENTES = """
+    SELECT d.id_docente, d.id_persona, p.nombre, p.apellido_pat, p.apellido_mat, p.ci,
+           p.correo, d.id_especialidad, e.nombre_especialidad AS especialidad
+    FROM docente d
+    JOIN persona p ON p.id_persona = d.id_persona
+    JOIN especialidad e ON e.id_especialidad = d.id_especialidad
+"""
+
+cargador_docentes = CargadorLotes("docente", CONSULTA_DOCENTES, "id_docente")
+
+listado_docentes = Listado("docente", "id_docente", {
+    "id_docente": int,
+    "id_persona": int,
+    "nombre": str,
+    "apellido_pat": str,
+    "apellido_mat": str,
+    "ci": int,
+    "correo": str,
+    "id_especialidad": int,
+    "especialidad": str,
+}, origen=CONSULTA_DOCENTES)
+
+# obtener_docente sale del CargadorLotes, que usa su propia conexion: la version se
+# comprueba en memoria por tabla (sin xmin de la fila) para no ocupar otra del pool
+version_docentes = Versionado("docente", otras=("persona", "especialidad"))
+parcial_docentes = Parcial("docente", "id_docente")
+
+@router.get("/", dependencies=[Depends(version_docentes.listado)])
+async def listar_docentes(pagina: Paginacion = Depends(listado_docentes), ids: Optional[list] = Depends(ids_lote), conn=Depends(get_conexion)):
+    if pagina.stream:
+        return await pagina.transmitir(conn)
     try:
-        async with conn.cursor() as cursor:
-            await cursor.execute(consulta)
-            docentes = await cursor.fetchall()
-            if not docentes:
-                return {"mensaje": "No hay docentes registrados"}
-            return docentes
-    except Exception as e:
+        if ids is not None:
+            return await cargador_docentes.listar(conn, ids)
+        docentes = await pagina.buscar(conn)
+        if not docentes:
+            return {"mensaje": "No hay docentes registrados"}
+        return pagina.responder(docentes)
+    except Exception:
         raise HTTPException(status_code=400, detail="Error al consultar docentes")
 
-@router.get("/{id_docente}")
-async def obtener_docente(id_docente: int, conn=Depends(get_conexion)):
-    consulta = """
-        SELECT id_docente, nombre, apellido_pat, apellido_mat, ci,
-               correo, especialidad
-        FROM docente
-        WHERE id_docente = %s
-    """
+@router.get("/{id_docente}", dependencies=[Depends(version_docentes.listado)])
+async def obtener_docente(id_docente: int):
     try:
-        async with conn.cursor() as cursor:
-            await cursor.execute(consulta, (id_docente,))
-            docente = await cursor.fetchone()
-            if not docente:
-                raise HTTPException(status_code=404, detail="Docente no encontrado")
-            return docente
-    except Exception as e:
+        docente = await cargador_docentes.cargar(id_docente)
+        if not docente:
+            raise HTTPException(status_code=404, detail="Docente no encontrado")
+        return docente
+    except HTTPException:
+        raise
+    except Exception:
         raise HTTPException(status_code=400, detail="Error al consultar docente")
 
 @router.post("/")
+@idempotente
 async def insertar_docente(docente: Docente, conn=Depends(get_conexion)):
     consulta = """
         INSERT INTO docente(nombre, apellido_pat, apellido_mat, ci, correo, especialidad)
@@ -76,7 +104,7 @@ async def insertar_docente(docente: Docente, conn=Depends(get_conexion)):
             nuevo_id = await cursor.fetchone()
             await conn.commit()
             return {"mensaje": "Docente registrado exitosamente", "id_docente": nuevo_id["id_docente"]}
-    except Exception as e:
+    except Exception:
         raise HTTPException(status_code=400, detail="No se pudo registrar el docente")
 
 @router.put("/{id_docente}")
@@ -105,7 +133,20 @@ async def actualizar_docente(id_docente: int, docente: Docente, conn=Depends(get
             actualizado = await cursor.fetchone()
             await conn.commit()
             return {"mensaje": "Docente actualizado correctamente", "id_docente": actualizado["id_docente"]}
-    except Exception as e:
+    except Exception:
+        raise HTTPException(status_code=400, detail="No se pudo actualizar el docente")
+
+@router.patch("/{id_docente}")
+async def modificar_docente(id_docente: int, docente: DocenteParcial, conn=Depends(get_conexion)):
+    try:
+        actualizado = await parcial_docentes.actualizar(conn, id_docente, docente)
+        if actualizado is None:
+            raise HTTPException(status_code=404, detail="Docente no encontrado")
+        await conn.commit()
+        return {"mensaje": "Docente actualizado correctamente", "id_docente": id_docente, "sin_cambios": not actualizado}
+    except HTTPException:
+        raise
+    except Exception:
         raise HTTPException(status_code=400, detail="No se pudo actualizar el docente")
 
 @router.delete("/{id_docente}")
@@ -118,5 +159,5 @@ async def eliminar_docente(id_docente: int, conn=Depends(get_conexion)):
                 raise HTTPException(status_code=404, detail="Docente no encontrado")
             await conn.commit()
             return {"mensaje": "Docente eliminado correctamente"}
-    except Exception as e:
+    except Exception:
         raise HTTPException(status_code=400, detail="No se pudo eliminar el docente")
@@ -1,49 +1,72 @@
 import asyncio
+import logging
 import sys
 from fastapi import FastAPI, Depends, HTTPException, APIRouter
 from pydantic import BaseModel
-from config.conexionDB import get_conexion
+from config.conexionDB import get_conexion, conexion
+from config.cache import cache_catalogo
+from config.paginacion import Listado, Paginacion
+from config.versiones import etag_contenido
+from config.idempotencia import idempotente
 
 if sys.platform == "win32":
     asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
 
 app = FastAPI()
 router = APIRouter()
+log = logging.getLogger(__name__)
 
 class Especialidad(BaseModel):
     nombre_especialidad: str
 
-@router.get("/")
-async def listar_especialidades(conn=Depends(get_conexion)):
-    consulta = "SELECT id_especialidad, nombre_especialidad FROM especialidad ORDER BY id_especialidad"
+listado_especialidades = Listado("especialidad", "id_especialidad", {
+    "id_especialidad": int,
+    "nombre_especialidad": str,
+})
+
+@router.get("/", dependencies=[Depends(etag_contenido)])
+async def listar_especialidades(pagina: Paginacion = Depends(listado_especialidades)):
+    if pagina.stream:
+        return await pagina.transmitir(None)
+
+    async def cargar():
+        async with conexion() as conn:
+            return await pagina.buscar(conn)
+
     try:
-        async with conn.cursor() as cursor:
-            await cursor.execute(consulta)
-            especialidades = await cursor.fetchall()
-            if not especialidades:
-                return {"mensaje": "No hay especialidades registradas"}
-            return especialidades
-    except Exception as e:
-        print(f"Error al listar especialidades: {e}")
+        especialidades = await cache_catalogo.obtener("especialidad", ("listar", pagina.clave), cargar)
+        if not especialidades:
+            return {"mensaje": "No hay especialidades registradas"}
+        return pagina.responder(especialidades)
+    except HTTPException:
+        raise
+    except Exception:
+        log.exception("Error al listar especialidades")
         raise HTTPException(status_code=400, detail="Error al consultar especialidades")
 
-@router.get("/{id_especialidad}")
-async def obtener_especialidad(id_especialidad: int, conn=Depends(get_conexion)):
+@router.get("/{id_especialidad}", dependencies=[Depends(etag_contenido)])
+async def obtener_especialidad(id_especialidad: int):
     consulta = "SELECT id_especialidad, nombre_especialidad FROM especialidad WHERE id_especialidad = %s"
+
+    async def cargar():
+        async with conexion() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(consulta, (id_especialidad,))
+                return await cursor.fetchone()
+
     try:
-        async with conn.cursor() as cursor:
-            await cursor.execute(consulta, (id_especialidad,))
-            especialidad = await cursor.fetchone()
-            if not especialidad:
-                raise HTTPException(status_code=404, detail="Especialidad no encontrada")
-            return especialidad
+        especialidad = await cache_catalogo.obtener("especialidad", id_especialidad, cargar)
+        if not especialidad:
+            raise HTTPException(status_code=404, detail="Especialidad no encontrada")
+        return especialidad
     except HTTPException:
         raise
-    except Exception as e:
-        print(f"Error al consultar especialidad: {e}")
+    except Exception:
+        log.exception("Error al consultar especialidad")
         raise HTTPException(status_code=400, detail="Error al consultar especialidad")
 
 @router.post("/")
+@idempotente
 async def insertar_especialidad(especialidad: Especialidad, conn=Depends(get_conexion)):
     consulta = "INSERT INTO especialidad(nombre_especialidad) VALUES (%s) RETURNING id_especialidad"
     try:
@@ -51,9 +74,10 @@ async def insertar_especialidad(especialidad: Especialidad, conn=Depends(get_con
             await cursor.execute(consulta, (especialidad.nombre_especialidad,))
             nuevo_id = await cursor.fetchone()
             await conn.commit()
+            cache_catalogo.invalidar("especialidad")
             return {"mensaje": "Especialidad registrada exitosamente", "id_especialidad": nuevo_id["id_especialidad"]}
-    except Exception as e:
-        print(f"Error al insertar especialidad: {e}")
+    except Exception:
+        log.exception("Error al insertar especialidad")
         raise HTTPException(status_code=400, detail="No se pudo registrar la especialidad")
 
 @router.put("/{id_especialidad}")
@@ -66,11 +90,12 @@ async def actualizar_especialidad(id_especialidad: int, especialidad: Especialid
                 raise HTTPException(status_code=404, detail="Especialidad no encontrada")
             actualizado = await cursor.fetchone()
             await conn.commit()
+            cache_catalogo.invalidar("especialidad")
             return {"mensaje": "Especialidad actualizada correctamente", "id_especialidad": actualizado["id_especialidad"]}
     except HTTPException:
         raise
-    except Exception as e:
-        print(f"Error al actualizar especialidad: {e}")
+    except Exception:
+        log.exception("Error al actualizar especialidad")
         raise HTTPException(status_code=400, detail="No se pudo actualizar la especialidad")
 
 @router.delete("/{id_especialidad}")
@@ -82,11 +107,12 @@ async def eliminar_especialidad(id_especialidad: int, conn=Depends(get_conexion)
             if cursor.rowcount == 0:
                 raise HTTPException(status_code=404, detail="Especialidad no encontrada")
             await conn.commit()
+            cache_catalogo.invalidar("especialidad")
             return {"mensaje": "Especialidad eliminada correctamente"}
     except HTTPException:
         raise
-    except Exception as e:
-        print(f"Error al eliminar especialidad: {e}")
+    except Exception:
+        log.exception("Error al eliminar especialidad")
         raise HTTPException(status_code=400, detail="No se pudo eliminar la especialidad")
 
 app.include_router(router, prefix="/especialidades", tags=["Especialidades"])
@@ -0,0 +1,60 @@
+import logging
+from fastapi import APIRouter, Depends, HTTPException, Query
+from config.conexionDB import get_conexion
+from config.paginacion import LIMITE_POR_DEFECTO, LIMITE_MAXIMO
+from config import estadistica
+from config.estadistica import Ambito
+from config.versiones import Versionado
+from config.seguridad import TIPO_ADMINISTRADOR, requiere_tipo
+from config.tiempos import tiempo_limite
+
+router = APIRouter()
+log = logging.getLogger(__name__)
+
+# las estadisticas cambian con las notas, inscripciones y carreras de los alumnos
+version_estadisticas = Versionado("notas", otras=("inscripcion", "alumno"))
+
+# recorren todas las notas (y POST reconstruye las tablas): solo administradores
+@router.get("/verificar", dependencies=[Depends(requiere_tipo(TIPO_ADMINISTRADOR))])
+@tiempo_limite(120)
+async def verificar_estadisticas(conn=Depends(get_conexion)):
+    try:
+        return await estadistica.verificar(conn)
+    except Exception:
+        log.exception("Error al verificar estadisticas")
+        raise HTTPException(status_code=400, detail="No se pudo verificar las estadisticas")
+
+@router.post("/verificar", dependencies=[Depends(requiere_tipo(TIPO_ADMINISTRADOR))])
+@tiempo_limite(120)
+async def reparar_estadisticas(conn=Depends(get_conexion)):
+    # verifica y, si hay diferencias, recalcula todo desde notas
+    try:
+        return await estadistica.verificar(conn, reparar=True)
+    except Exception:
+        log.exception("Error al reparar estadisticas")
+        raise HTTPException(status_code=400, detail="No se pudo reparar las estadisticas")
+
+@router.get("/{ambito}", dependencies=[Depends(version_estadisticas.listado)])
+async def listar_estadisticas(
+    ambito: Ambito,
+    after_id: int = 0,
+    limit: int = Query(LIMITE_POR_DEFECTO, ge=1, le=LIMITE_MAXIMO),
+    conn=Depends(get_conexion),
+):
+    try:
+        filas = await estadistica.listar(conn, ambito, after_id, limit)
+        if not filas:
+            return {"mensaje": "No hay estadisticas registradas"}
+        return filas
+    except Exception:
+        raise HTTPException(status_code=400, detail="Error al consultar estadisticas")
+
+@router.get("/{ambito}/{id_ambito}", dependencies=[Depends(version_estadisticas.listado)])
+async def obtener_estadistica(ambito: Ambito, id_ambito: int, conn=Depends(get_conexion)):
+    try:
+        resumen = await estadistica.resumen(conn, ambito, id_ambito)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Error al consultar estadisticas")
+    if not resumen:
+        raise HTTPException(status_code=404, detail="No hay notas registradas para este grupo")
+    return resumen
@@ -0,0 +1,84 @@
+import asyncio
+import time
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from config.conexionDB import conexion
+from config.eventos import difusor, REINICIAR
+from config.seguridad import TIPO_ADMINISTRADOR, sesion_actual
+
+router = APIRouter()
+
+# comentario periodico para que proxies y balanceadores no corten la conexion inactiva
+LATIDO = 15
+REINTENTO_MS = 3000
+
+# de lo pedido, lo que es del usuario: su propio alumno y las clases que dicta
+CONSULTA_PERMITIDOS = """
+    SELECT ARRAY(
+               SELECT a.id_alumno FROM alumno a
+               WHERE a.id_persona = u.id_persona AND a.id_alumno = ANY(%(alumnos)s)
+           ) AS alumnos,
+           ARRAY(
+               SELECT c.id_clase FROM clase c
+               JOIN docente d ON d.id_docente = c.id_docente
+               WHERE d.id_persona = u.id_persona AND c.id_clase = ANY(%(clases)s)
+           ) AS clases
+    FROM usuario u
+    WHERE u.id_usuario = %(id_usuario)s
+"""
+
+async def _comprobar_permisos(sesion, id_alumno, id_clase):
+    if sesion["id_tipo"] == TIPO_ADMINISTRADOR:
+        return
+    # conexion corta: la suscripcion puede durar horas y no debe retener una del pool
+    async with conexion() as conn:
+        async with conn.cursor() as cursor:
+            await cursor.execute(
+                CONSULTA_PERMITIDOS,
+                {"alumnos": id_alumno, "clases": id_clase, "id_usuario": sesion["id_usuario"]},
+            )
+            permitidos = await cursor.fetchone()
+    if permitidos is None or set(id_alumno) - set(permitidos["alumnos"]) or set(id_clase) - set(permitidos["clases"]):
+        raise HTTPException(status_code=403, detail="No autorizado")
+
+@router.get("/")
+async def suscribir_eventos(
+    id_alumno: List[int] = Query([]),
+    id_clase: List[int] = Query([]),
+    sesion=Depends(sesion_actual),
+):
+    claves = [("alumno", i) for i in id_alumno] + [("clase", i) for i in id_clase]
+    if not claves:
+        raise HTTPException(status_code=400, detail="Indique al menos un id_alumno o id_clase")
+    await _comprobar_permisos(sesion, id_alumno, id_clase)
+    suscripcion = difusor.suscribir(claves)
+
+    async def enviar():
+        try:
+            yield f"retry: {REINTENTO_MS}\n\n"
+            while True:
+                restante = sesion["expira"] - time.time()
+                if restante <= 0:
+                    # el token vencio: el cliente se reconecta con uno nuevo
+                    yield "event: expirado\ndata: {}\n\n"
+                    return
+                try:
+                    evento = await asyncio.wait_for(suscripcion.cola.get(), min(LATIDO, restante))
+                except asyncio.TimeoutError:
+                    yield ": latido\n\n"
+                    continue
+                if evento is REINICIAR:
+                    # se perdieron avisos: el cliente vuelve a consultar y se reconecta
+                    yield "event: reiniciar\ndata: {}\n\n"
+                    return
+                tabla, datos = evento
+                yield f"event: {tabla}\ndata: {datos}\n\n"
+        finally:
+            difusor.cancelar(suscripcion)
+
+    return StreamingResponse(
+        enviar(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
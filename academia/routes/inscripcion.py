@@ -1,33 +1,100 @@
-from fastapi import APIRouter, Depends, HTTPException
+import logging
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from pydantic import BaseModel
-from typing import Optional
+from typing import Literal, Optional
+from datetime import date
+from psycopg.errors import UniqueViolation
 from config.conexionDB import get_conexion
+from config.paginacion import Listado, Paginacion
+from config.versiones import Versionado
+from config.carga import CargaMasiva, existe, unico
+from config.exportacion import Exportacion
+from config.admision import admision, ColaLlena, INSCRITO, SIN_CUPO, DUPLICADA
+from config.tiempos import tiempo_limite
+from config.idempotencia import idempotente
 
 router = APIRouter()
+log = logging.getLogger(__name__)
 
 class Inscripcion(BaseModel):
     id_alumno: int
     id_clase: int
-    fecha_inscripcion: Optional[str] = None 
+    fecha_inscripcion: Optional[date] = None
 
-@router.get("/")
-async def listar_inscripciones(conn=Depends(get_conexion)):
-    consulta = """
-        SELECT id_inscripcion, id_alumno, id_clase, fecha_inscripcion
-        FROM inscripcion
-        ORDER BY id_inscripcion
+class InscripcionCarga(BaseModel):
+    id_alumno: int
+    id_clase: int
+    fecha_inscripcion: Optional[date] = None
+
+carga_inscripciones = CargaMasiva(
+    "inscripcion", "id_inscripcion", InscripcionCarga,
+    validaciones=[
+        existe("id_alumno", "alumno"),
+        existe("id_clase", "clase"),
+        unico(("id_clase", "id_alumno"), "inscripcion"),
+        # va al final: cuenta solo las filas que pasaron las demas validaciones
+        (
+            "la clase no tiene cupo",
+            "WITH cupos AS (SELECT id_clase, cupo FROM clase "
+            "WHERE id_clase IN (SELECT id_clase FROM {carga}) FOR UPDATE) "
+            "SELECT fila FROM (SELECT c.fila, k.cupo, "
+            "(SELECT count(*) FROM inscripcion i WHERE i.id_clase = c.id_clase) "
+            "+ row_number() OVER (PARTITION BY c.id_clase ORDER BY c.fila) AS ocupados "
+            "FROM {carga} c JOIN cupos k ON k.id_clase = c.id_clase) d WHERE d.ocupados > d.cupo",
+        ),
+    ],
+    por_defecto={"fecha_inscripcion": "CURRENT_DATE"},
+)
+
+listado_inscripciones = Listado("inscripcion", "id_inscripcion", {
+    "id_inscripcion": int,
+    "id_alumno": int,
+    "id_clase": int,
+    "fecha_inscripcion": date,
+})
+
+exportacion_inscripciones = Exportacion(
+    "inscripciones",
     """
+    SELECT i.id_inscripcion, c.periodo, c.id_clase, m.nombre AS materia, c.id_docente,
+           i.id_alumno, p.ci, p.nombre, p.apellido_pat, p.apellido_mat, i.fecha_inscripcion
+    FROM inscripcion i
+    JOIN clase c ON c.id_clase = i.id_clase
+    JOIN materia m ON m.id_materia = c.id_materia
+    JOIN alumno a ON a.id_alumno = i.id_alumno
+    JOIN persona p ON p.id_persona = a.id_persona
+    """,
+    [
+        ("id_inscripcion", "int4"), ("periodo", "text"), ("id_clase", "int4"), ("materia", "text"),
+        ("id_docente", "int4"), ("id_alumno", "int4"), ("ci", "int4"), ("nombre", "text"),
+        ("apellido_pat", "text"), ("apellido_mat", "text"), ("fecha_inscripcion", "date"),
+    ],
+    filtros={"periodo": "c.periodo"},
+)
+
+version_inscripciones = Versionado("inscripcion", "id_inscripcion")
+
+@router.get("/", dependencies=[Depends(version_inscripciones.listado)])
+async def listar_inscripciones(pagina: Paginacion = Depends(listado_inscripciones), conn=Depends(get_conexion)):
+    if pagina.stream:
+        return await pagina.transmitir(conn)
     try:
-        async with conn.cursor() as cursor:
-            await cursor.execute(consulta)
-            inscripciones = await cursor.fetchall()
-            if not inscripciones:
-                return {"mensaje": "No hay inscripciones registradas"}
-            return inscripciones
-    except Exception as e:
+        inscripciones = await pagina.buscar(conn)
+        if not inscripciones:
+            return {"mensaje": "No hay inscripciones registradas"}
+        return pagina.responder(inscripciones)
+    except Exception:
         raise HTTPException(status_code=400, detail="Error al consultar inscripciones")
 
-@router.get("/{id_inscripcion}")
+@router.get("/export")
+@tiempo_limite(0)
+async def exportar_inscripciones(
+    periodo: Optional[str] = None,
+    formato: Literal["csv", "parquet"] = Query("csv", alias="format"),
+):
+    return await exportacion_inscripciones.responder(formato, periodo=periodo)
+
+@router.get("/{id_inscripcion}", dependencies=[Depends(version_inscripciones.fila)])
 async def obtener_inscripcion(id_inscripcion: int, conn=Depends(get_conexion)):
     consulta = """
         SELECT id_inscripcion, id_alumno, id_clase, fecha_inscripcion
@@ -41,30 +108,49 @@ async def obtener_inscripcion(id_inscripcion: int, conn=Depends(get_conexion)):
             if not inscripcion:
                 raise HTTPException(status_code=404, detail="Inscripción no encontrada")
             return inscripcion
-    except Exception as e:
+    except Exception:
         raise HTTPException(status_code=400, detail="Error al consultar inscripción")
 
 @router.post("/")
-async def insertar_inscripcion(inscripcion: Inscripcion, conn=Depends(get_conexion)):
-    consulta = """
-        INSERT INTO inscripcion(id_alumno, id_clase, fecha_inscripcion)
-        VALUES (%s, %s, %s)
-        RETURNING id_inscripcion
-    """
-    parametros = (
-        inscripcion.id_alumno,
-        inscripcion.id_clase,
-        inscripcion.fecha_inscripcion
-    )
+@idempotente
+async def insertar_inscripcion(inscripcion: Inscripcion):
+    # pasa por la cola de admision de la clase: cupo y duplicados se resuelven por lotes
     try:
-        async with conn.cursor() as cursor:
-            await cursor.execute(consulta, parametros)
-            nuevo_id = await cursor.fetchone()
-            await conn.commit()
-            return {"mensaje": "Inscripción registrada exitosamente", "id_inscripcion": nuevo_id["id_inscripcion"]}
-    except Exception as e:
+        resultado = await admision.inscribir(
+            inscripcion.id_clase, inscripcion.id_alumno, inscripcion.fecha_inscripcion
+        )
+    except ColaLlena:
+        raise HTTPException(
+            status_code=503, detail="Demasiadas solicitudes para esta clase", headers={"Retry-After": "1"}
+        )
+    except HTTPException:
+        # Saturado (503) del control de admision al tomar la conexion del lote
+        raise
+    except Exception:
+        log.exception("Error al registrar inscripción")
         raise HTTPException(status_code=400, detail="No se pudo registrar la inscripción")
 
+    estado = resultado["estado"]
+    if estado == INSCRITO:
+        return {"mensaje": "Inscripción registrada exitosamente", "id_inscripcion": resultado["id_inscripcion"]}
+    if estado == SIN_CUPO:
+        raise HTTPException(status_code=409, detail="La clase no tiene cupo")
+    if estado == DUPLICADA:
+        raise HTTPException(status_code=409, detail="El alumno ya está inscrito en la clase")
+    raise HTTPException(status_code=404, detail="Alumno o clase no encontrados")
+
+@router.post("/carga")
+@tiempo_limite(0)
+async def cargar_inscripciones(request: Request, atomico: bool = False, conn=Depends(get_conexion)):
+    try:
+        resultado = await carga_inscripciones.ejecutar(conn, request, atomico)
+        return {"mensaje": "Carga de inscripciones finalizada", **resultado}
+    except HTTPException:
+        raise
+    except Exception:
+        log.exception("Error en la carga masiva de inscripciones")
+        raise HTTPException(status_code=400, detail="No se pudo completar la carga de inscripciones")
+
 @router.put("/{id_inscripcion}")
 async def actualizar_inscripcion(id_inscripcion: int, inscripcion: Inscripcion, conn=Depends(get_conexion)):
     consulta = """
@@ -81,13 +167,31 @@ async def actualizar_inscripcion(id_inscripcion: int, inscripcion: Inscripcion,
     )
     try:
         async with conn.cursor() as cursor:
+            # mismo bloqueo que la cola de admision: el cambio de clase respeta el cupo
+            await cursor.execute("SELECT cupo FROM clase WHERE id_clase = %s FOR UPDATE", (inscripcion.id_clase,))
+            clase = await cursor.fetchone()
+            if not clase:
+                raise HTTPException(status_code=404, detail="Clase no encontrada")
+            await cursor.execute(
+                "SELECT count(*) AS inscritos FROM inscripcion WHERE id_clase = %s AND id_inscripcion <> %s",
+                (inscripcion.id_clase, id_inscripcion),
+            )
+            if (await cursor.fetchone())["inscritos"] >= clase["cupo"]:
+                raise HTTPException(status_code=409, detail="La clase no tiene cupo")
+
             await cursor.execute(consulta, parametros)
             if cursor.rowcount == 0:
                 raise HTTPException(status_code=404, detail="Inscripción no encontrada")
             actualizado = await cursor.fetchone()
             await conn.commit()
             return {"mensaje": "Inscripción actualizada correctamente", "id_inscripcion": actualizado["id_inscripcion"]}
-    except Exception as e:
+    except HTTPException:
+        await conn.rollback()
+        raise
+    except UniqueViolation:
+        await conn.rollback()
+        raise HTTPException(status_code=409, detail="El alumno ya está inscrito en la clase")
+    except Exception:
         raise HTTPException(status_code=400, detail="No se pudo actualizar la inscripción")
 
 @router.delete("/{id_inscripcion}")
@@ -100,5 +204,5 @@ async def eliminar_inscripcion(id_inscripcion: int, conn=Depends(get_conexion)):
                 raise HTTPException(status_code=404, detail="Inscripción no encontrada")
             await conn.commit()
             return {"mensaje": "Inscripción eliminada correctamente"}
-    except Exception as e:
+    except Exception:
         raise HTTPException(status_code=400, detail="No se pudo eliminar la inscripción")
@@ -1,60 +1,82 @@
 import asyncio
+import logging
 import sys
 from fastapi import FastAPI, Depends, HTTPException, APIRouter
 from pydantic import BaseModel
-from config.conexionDB import get_conexion
+from typing import Optional
+from config.conexionDB import get_conexion, conexion
+from config.cache import cache_catalogo
+from config.paginacion import Listado, Paginacion
+from config.versiones import etag_contenido
+from config.lotes import CargadorLotes, ids_lote
+from config.idempotencia import idempotente
 
 if sys.platform == "win32":
     asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
 
 app = FastAPI()
 router = APIRouter()
+log = logging.getLogger(__name__)
 
 class Materia(BaseModel):
     nombre: str
     descripcion: str 
 
-@router.get("/")
-async def listar_materias(conn=Depends(get_conexion)):
-    consulta = """
+cargador_materias = CargadorLotes(
+    "materia",
+    """
         SELECT id_materia, nombre, descripcion
         FROM materia
-        ORDER BY id_materia
-    """
-    try:
-        async with conn.cursor() as cursor:
-            await cursor.execute(consulta)
-            materias = await cursor.fetchall()
+    """,
+    "id_materia",
+)
 
-            if not materias:
-                return {"mensaje": "No hay materias registradas"}
+listado_materias = Listado("materia", "id_materia", {
+    "id_materia": int,
+    "nombre": str,
+    "descripcion": str,
+})
 
-            return materias
-    except Exception as e:
-        print(f"Error al listar materias: {e}")
-        raise HTTPException(status_code=400, detail="Error al consultar materias")
+@router.get("/", dependencies=[Depends(etag_contenido)])
+async def listar_materias(pagina: Paginacion = Depends(listado_materias), ids: Optional[list] = Depends(ids_lote)):
+    if pagina.stream:
+        return await pagina.transmitir(None)
+
+    async def cargar():
+        async with conexion() as conn:
+            return await pagina.buscar(conn)
 
-@router.get("/{id_materia}")
-async def obtener_materia(id_materia: int, conn=Depends(get_conexion)):
-    consulta = """
-        SELECT id_materia, nombre, descripcion
-        FROM materia
-        WHERE id_materia = %s
-    """
     try:
-        async with conn.cursor() as cursor:
-            await cursor.execute(consulta, (id_materia,))
-            materia = await cursor.fetchone()
+        if ids is not None:
+            return await cargador_materias.cargar_muchos(ids)
+        materias = await cache_catalogo.obtener("materia", ("listar", pagina.clave), cargar)
+        if not materias:
+            return {"mensaje": "No hay materias registradas"}
+        return pagina.responder(materias)
+    except HTTPException:
+        raise
+    except Exception:
+        log.exception("Error al listar materias")
+        raise HTTPException(status_code=400, detail="Error al consultar materias")
 
-            if not materia:
-                raise HTTPException(status_code=404, detail="Materia no encontrada")
+@router.get("/{id_materia}", dependencies=[Depends(etag_contenido)])
+async def obtener_materia(id_materia: int):
+    async def cargar():
+        return await cargador_materias.cargar(id_materia)
 
-            return materia
-    except Exception as e:
-        print(f"Error al consultar materia: {e}")
+    try:
+        materia = await cache_catalogo.obtener("materia", id_materia, cargar)
+        if not materia:
+            raise HTTPException(status_code=404, detail="Materia no encontrada")
+        return materia
+    except HTTPException:
+        raise
+    except Exception:
+        log.exception("Error al consultar materia")
         raise HTTPException(status_code=400, detail="Error al consultar materia")
 
 @router.post("/")
+@idempotente
 async def insertar_materia(materia: Materia, conn=Depends(get_conexion)):
     consulta = """
         INSERT INTO materia(nombre, descripcion)
@@ -68,13 +90,14 @@ async def insertar_materia(materia: Materia, conn=Depends(get_conexion)):
             await cursor.execute(consulta, parametros)
             nuevo_id = await cursor.fetchone()
             await conn.commit()
+            cache_catalogo.invalidar("materia")
 
             return {
                 "mensaje": "Materia registrada exitosamente",
                 "id_materia": nuevo_id["id_materia"]
             }
-    except Exception as e:
-        print(f"Error al insertar materia: {e}")
+    except Exception:
+        log.exception("Error al insertar materia")
         raise HTTPException(status_code=400, detail="No se pudo registrar la materia")
 
 @router.put("/{id_materia}")
@@ -97,13 +120,14 @@ async def actualizar_materia(id_materia: int, materia: Materia, conn=Depends(get
 
             actualizado = await cursor.fetchone()
             await conn.commit()
+            cache_catalogo.invalidar("materia")
 
             return {
                 "mensaje": "Materia actualizada correctamente",
                 "id_materia": actualizado["id_materia"]
             }
-    except Exception as e:
-        print(f"Error al actualizar materia: {e}")
+    except Exception:
+        log.exception("Error al actualizar materia")
         raise HTTPException(status_code=400, detail="No se pudo actualizar la materia")
 
 @router.delete("/{id_materia}")
@@ -115,9 +139,10 @@ async def eliminar_materia(id_materia: int, conn=Depends(get_conexion)):
             if cursor.rowcount == 0:
                 raise HTTPException(status_code=404, detail="Materia no encontrada")
             await conn.commit()
+            cache_catalogo.invalidar("materia")
             return {"mensaje": "Materia eliminada correctamente"}
-    except Exception as e:
-        print(f"Error al eliminar materia: {e}")
+    except Exception:
+        log.exception("Error al eliminar materia")
         raise HTTPException(status_code=400, detail="No se pudo eliminar la materia")
 
 app.include_router(router)
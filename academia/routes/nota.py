@@ -1,32 +1,111 @@
-from fastapi import APIRouter, Depends, HTTPException
-from pydantic import BaseModel
+import logging
+from datetime import date
+from decimal import Decimal
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from pydantic import BaseModel, Field
 from config.conexionDB import get_conexion
+from config.paginacion import Listado, Paginacion
+from config.versiones import Versionado
+from config.carga import CargaMasiva, existe, unico
+from config.exportacion import Exportacion
+from config.tiempos import tiempo_limite
+from config.idempotencia import idempotente
+from config.parcial import Parcial
 
 router = APIRouter()
+log = logging.getLogger(__name__)
 
 class Nota(BaseModel):
     id_inscripcion: int
     id_docente: int
     nota: float 
 
-@router.get("/")
-async def listar_notas(conn=Depends(get_conexion)):
-    consulta = """
-        SELECT id_nota, id_inscripcion, id_docente, nota, fecha_registro
-        FROM notas
-        ORDER BY id_nota
+class NotaParcial(BaseModel):
+    id_inscripcion: Optional[int] = None
+    id_docente: Optional[int] = None
+    nota: Optional[float] = Field(None, ge=0, le=100)
+
+class NotaCarga(BaseModel):
+    id_inscripcion: int
+    id_docente: int
+    nota: float = Field(ge=0, le=100)
+
+carga_notas = CargaMasiva(
+    "notas", "id_nota", NotaCarga,
+    validaciones=[
+        existe("id_inscripcion", "inscripcion"),
+        existe("id_docente", "docente"),
+        unico("id_inscripcion", "notas"),
+    ],
+)
+
+listado_notas = Listado("notas", "id_nota", {
+    "id_nota": int,
+    "id_inscripcion": int,
+    "id_docente": int,
+    "nota": Decimal,
+    "fecha_registro": date,
+})
+
+exportacion_notas = Exportacion(
+    "notas",
     """
+    SELECT n.id_nota, c.periodo, c.id_clase, m.nombre AS materia, i.id_alumno,
+           p.ci, p.nombre, p.apellido_pat, p.apellido_mat, n.id_docente, n.nota, n.fecha_registro
+    FROM notas n
+    JOIN inscripcion i ON i.id_inscripcion = n.id_inscripcion
+    JOIN clase c ON c.id_clase = i.id_clase
+    JOIN materia m ON m.id_materia = c.id_materia
+    JOIN alumno a ON a.id_alumno = i.id_alumno
+    JOIN persona p ON p.id_persona = a.id_persona
+    """,
+    [
+        ("id_nota", "int4"), ("periodo", "text"), ("id_clase", "int4"), ("materia", "text"),
+        ("id_alumno", "int4"), ("ci", "int4"), ("nombre", "text"), ("apellido_pat", "text"),
+        ("apellido_mat", "text"), ("id_docente", "int4"), ("nota", "numeric"), ("fecha_registro", "date"),
+    ],
+    filtros={"periodo": "c.periodo"},
+)
+
+version_notas = Versionado("notas", "id_nota")
+
+parcial_notas = Parcial("notas", "id_nota")
+
+# una nota por inscripcion: la sincronizacion la crea o la reemplaza sin consultar antes
+SINCRONIZAR_NOTA = """
+    INSERT INTO notas(id_inscripcion, id_docente, nota)
+    VALUES (%s, %s, %s)
+    ON CONFLICT (id_inscripcion) DO UPDATE
+    SET id_docente = EXCLUDED.id_docente,
+        nota = EXCLUDED.nota,
+        fecha_registro = CURRENT_DATE
+    WHERE notas.nota IS DISTINCT FROM EXCLUDED.nota
+       OR notas.id_docente IS DISTINCT FROM EXCLUDED.id_docente
+    RETURNING id_nota, (xmax = 0) AS insertada
+"""
+
+@router.get("/", dependencies=[Depends(version_notas.listado)])
+async def listar_notas(pagina: Paginacion = Depends(listado_notas), conn=Depends(get_conexion)):
+    if pagina.stream:
+        return await pagina.transmitir(conn)
     try:
-        async with conn.cursor() as cursor:
-            await cursor.execute(consulta)
-            notas = await cursor.fetchall()
-            if not notas:
-                return {"mensaje": "No hay notas registradas"}
-            return notas
-    except Exception as e:
+        notas = await pagina.buscar(conn)
+        if not notas:
+            return {"mensaje": "No hay notas registradas"}
+        return pagina.responder(notas)
+    except Exception:
         raise HTTPException(status_code=400, detail="Error al consultar notas")
 
-@router.get("/{id_nota}")
+@router.get("/export")
+@tiempo_limite(0)
+async def exportar_notas(
+    periodo: Optional[str] = None,
+    formato: Literal["csv", "parquet"] = Query("csv", alias="format"),
+):
+    return await exportacion_notas.responder(formato, periodo=periodo)
+
+@router.get("/{id_nota}", dependencies=[Depends(version_notas.fila)])
 async def obtener_nota(id_nota: int, conn=Depends(get_conexion)):
     consulta = """
         SELECT id_nota, id_inscripcion, id_docente, nota, fecha_registro
@@ -40,10 +119,11 @@ async def obtener_nota(id_nota: int, conn=Depends(get_conexion)):
             if not nota:
                 raise HTTPException(status_code=404, detail="Nota no encontrada")
             return nota
-    except Exception as e:
+    except Exception:
         raise HTTPException(status_code=400, detail="Error al consultar nota")
 
 @router.post("/")
+@idempotente
 async def insertar_nota(nota: Nota, conn=Depends(get_conexion)):
     consulta = """
         INSERT INTO notas(id_inscripcion, id_docente, nota)
@@ -61,9 +141,39 @@ async def insertar_nota(nota: Nota, conn=Depends(get_conexion)):
             nuevo_id = await cursor.fetchone()
             await conn.commit()
             return {"mensaje": "Nota registrada exitosamente", "id_nota": nuevo_id["id_nota"]}
-    except Exception as e:
+    except Exception:
         raise HTTPException(status_code=400, detail="No se pudo registrar la nota")
 
+@router.post("/carga")
+@tiempo_limite(0)
+async def cargar_notas(request: Request, atomico: bool = False, conn=Depends(get_conexion)):
+    try:
+        resultado = await carga_notas.ejecutar(conn, request, atomico)
+        return {"mensaje": "Carga de notas finalizada", **resultado}
+    except HTTPException:
+        raise
+    except Exception:
+        log.exception("Error en la carga masiva de notas")
+        raise HTTPException(status_code=400, detail="No se pudo completar la carga de notas")
+
+@router.post("/sincronizar")
+async def sincronizar_nota(nota: Nota, conn=Depends(get_conexion)):
+    try:
+        async with conn.cursor() as cursor:
+            await cursor.execute(SINCRONIZAR_NOTA, (nota.id_inscripcion, nota.id_docente, nota.nota))
+            fila = await cursor.fetchone()
+            if fila is None:
+                await cursor.execute("SELECT id_nota FROM notas WHERE id_inscripcion = %s", (nota.id_inscripcion,))
+                fila = await cursor.fetchone()
+                resultado = "sin_cambios"
+            else:
+                resultado = "insertada" if fila["insertada"] else "actualizada"
+            await conn.commit()
+            return {"mensaje": "Nota sincronizada", "id_nota": fila["id_nota"], "resultado": resultado}
+    except Exception:
+        log.exception("Error al sincronizar nota")
+        raise HTTPException(status_code=400, detail="No se pudo sincronizar la nota")
+
 @router.put("/{id_nota}")
 async def actualizar_nota(id_nota: int, nota: Nota, conn=Depends(get_conexion)):
     consulta = """
@@ -86,7 +196,21 @@ async def actualizar_nota(id_nota: int, nota: Nota, conn=Depends(get_conexion)):
             actualizado = await cursor.fetchone()
             await conn.commit()
             return {"mensaje": "Nota actualizada correctamente", "id_nota": actualizado["id_nota"]}
-    except Exception as e:
+    except Exception:
+        raise HTTPException(status_code=400, detail="No se pudo actualizar la nota")
+
+@router.patch("/{id_nota}")
+async def modificar_nota(id_nota: int, nota: NotaParcial, conn=Depends(get_conexion)):
+    try:
+        actualizada = await parcial_notas.actualizar(conn, id_nota, nota)
+        if actualizada is None:
+            raise HTTPException(status_code=404, detail="Nota no encontrada")
+        await conn.commit()
+        return {"mensaje": "Nota actualizada correctamente", "id_nota": id_nota, "sin_cambios": not actualizada}
+    except HTTPException:
+        raise
+    except Exception:
+        log.exception("Error al modificar nota")
         raise HTTPException(status_code=400, detail="No se pudo actualizar la nota")
 
 @router.delete("/{id_nota}")
@@ -99,5 +223,5 @@ async def eliminar_nota(id_nota: int, conn=Depends(get_conexion)):
                 raise HTTPException(status_code=404, detail="Nota no encontrada")
             await conn.commit()
             return {"mensaje": "Nota eliminada correctamente"}
-    except Exception as e:
+    except Exception:
         raise HTTPException(status_code=400, detail="No se pudo eliminar la nota")
@@ -1,14 +1,25 @@
 import asyncio
+import logging
 import sys
-from fastapi import FastAPI, Depends, HTTPException, APIRouter
-from pydantic import BaseModel
+from fastapi import FastAPI, Depends, HTTPException, APIRouter, Request
+from pydantic import BaseModel, Field
+from datetime import date
+from typing import Literal
+from psycopg import errors, sql
 from config.conexionDB import get_conexion
+from config.paginacion import Listado, Paginacion
+from config.versiones import Versionado
+from config.carga import CargaMasiva, unico
+from config.tiempos import tiempo_limite
+from config.idempotencia import idempotente
+from config.parcial import Parcial
 
 if sys.platform == "win32":
     asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
 
 app = FastAPI()
 router = APIRouter()
+log = logging.getLogger(__name__)
 
 class Persona(BaseModel):
     nombre: str
@@ -18,26 +29,73 @@ class Persona(BaseModel):
     correo: str
     fecha_nacimiento: str | None = None   # opcional
 
-@router.get("/")
-async def listar_personas(conn=Depends(get_conexion)):
-    consulta = """
-        SELECT id_persona, nombre, apellido_pat, apellido_mat, ci,
-               correo, fecha_nacimiento
-        FROM persona
-        ORDER BY id_persona
-    """
+class PersonaParcial(BaseModel):
+    nombre: str | None = None
+    apellido_pat: str | None = None
+    apellido_mat: str | None = None
+    ci: int | None = None
+    correo: str | None = None
+    fecha_nacimiento: date | None = None
+
+class PersonaCarga(BaseModel):
+    nombre: str = Field(max_length=50)
+    apellido_pat: str = Field(max_length=50)
+    apellido_mat: str | None = Field(None, max_length=50)
+    ci: int
+    correo: str = Field(max_length=50)
+    fecha_nacimiento: date | None = None
+
+carga_personas = CargaMasiva(
+    "persona", "id_persona", PersonaCarga,
+    validaciones=[unico("ci", "persona"), unico("correo", "persona")],
+)
+
+listado_personas = Listado("persona", "id_persona", {
+    "id_persona": int,
+    "nombre": str,
+    "apellido_pat": str,
+    "apellido_mat": str,
+    "ci": int,
+    "correo": str,
+    "fecha_nacimiento": date,
+})
+
+version_personas = Versionado("persona", "id_persona")
+
+parcial_personas = Parcial("persona", "id_persona")
+
+# alta o actualizacion por clave natural, para las sincronizaciones que no conocen el
+# id_persona; sin cambios no se escribe la fila
+SINCRONIZAR_PERSONA = """
+    INSERT INTO persona(nombre, apellido_pat, apellido_mat, ci, correo, fecha_nacimiento)
+    VALUES (%(nombre)s, %(apellido_pat)s, %(apellido_mat)s, %(ci)s, %(correo)s, %(fecha_nacimiento)s)
+    ON CONFLICT ({clave}) DO UPDATE
+    SET nombre = EXCLUDED.nombre,
+        apellido_pat = EXCLUDED.apellido_pat,
+        apellido_mat = EXCLUDED.apellido_mat,
+        ci = EXCLUDED.ci,
+        correo = EXCLUDED.correo,
+        fecha_nacimiento = EXCLUDED.fecha_nacimiento
+    WHERE (persona.nombre, persona.apellido_pat, persona.apellido_mat, persona.ci, persona.correo, persona.fecha_nacimiento)
+        IS DISTINCT FROM
+        (EXCLUDED.nombre, EXCLUDED.apellido_pat, EXCLUDED.apellido_mat, EXCLUDED.ci, EXCLUDED.correo, EXCLUDED.fecha_nacimiento)
+    RETURNING id_persona, (xmax = 0) AS insertada
+"""
+
+@router.get("/", dependencies=[Depends(version_personas.listado)])
+async def listar_personas(pagina: Paginacion = Depends(listado_personas), conn=Depends(get_conexion)):
+    if pagina.stream:
+        return await pagina.transmitir(conn)
     try:
-        async with conn.cursor() as cursor:
-            await cursor.execute(consulta)
-            personas = await cursor.fetchall()
-            if not personas:
-                return {"mensaje": "No hay personas registradas"}
-            return personas
-    except Exception as e:
-        print(f"Error al listar personas: {e}")
+        personas = await pagina.buscar(conn)
+        if not personas:
+            return {"mensaje": "No hay personas registradas"}
+        return pagina.responder(personas)
+    except Exception:
+        log.exception("Error al listar personas")
         raise HTTPException(status_code=400, detail="Error al consultar personas")
 
-@router.get("/{id_persona}")
+@router.get("/{id_persona}", dependencies=[Depends(version_personas.fila)])
 async def obtener_persona(id_persona: int, conn=Depends(get_conexion)):
     consulta = """
         SELECT id_persona, nombre, apellido_pat, apellido_mat, ci,
@@ -52,11 +110,12 @@ async def obtener_persona(id_persona: int, conn=Depends(get_conexion)):
             if not persona:
                 raise HTTPException(status_code=404, detail="Persona no encontrada")
             return persona
-    except Exception as e:
-        print(f"Error al consultar persona: {e}")
+    except Exception:
+        log.exception("Error al consultar persona")
         raise HTTPException(status_code=400, detail="Error al consultar persona")
 
 @router.post("/")
+@idempotente
 async def insertar_persona(persona: Persona, conn=Depends(get_conexion)):
     consulta = """
         INSERT INTO persona(nombre, apellido_pat, apellido_mat, ci, correo, fecha_nacimiento)
@@ -77,10 +136,48 @@ async def insertar_persona(persona: Persona, conn=Depends(get_conexion)):
             nuevo_id = await cursor.fetchone()
             await conn.commit()
             return {"mensaje": "Persona registrada exitosamente", "id_persona": nuevo_id["id_persona"]}
-    except Exception as e:
-        print(f"Error al insertar persona: {e}")
+    except Exception:
+        log.exception("Error al insertar persona")
         raise HTTPException(status_code=400, detail="No se pudo registrar la persona")
 
+@router.post("/carga")
+@tiempo_limite(0)
+async def cargar_personas(request: Request, atomico: bool = False, conn=Depends(get_conexion)):
+    try:
+        resultado = await carga_personas.ejecutar(conn, request, atomico)
+        return {"mensaje": "Carga de personas finalizada", **resultado}
+    except HTTPException:
+        raise
+    except Exception:
+        log.exception("Error en la carga masiva de personas")
+        raise HTTPException(status_code=400, detail="No se pudo completar la carga de personas")
+
+@router.post("/sincronizar")
+async def sincronizar_persona(persona: Persona, por: Literal["ci", "correo"] = "ci", conn=Depends(get_conexion)):
+    consulta = sql.SQL(SINCRONIZAR_PERSONA).format(clave=sql.Identifier(por))
+    try:
+        async with conn.cursor() as cursor:
+            await cursor.execute(consulta, persona.model_dump())
+            fila = await cursor.fetchone()
+            if fila is None:
+                await cursor.execute(
+                    sql.SQL("SELECT id_persona FROM persona WHERE {} = %s").format(sql.Identifier(por)),
+                    (getattr(persona, por),),
+                )
+                fila = await cursor.fetchone()
+                resultado = "sin_cambios"
+            else:
+                resultado = "insertada" if fila["insertada"] else "actualizada"
+            await conn.commit()
+            return {"mensaje": "Persona sincronizada", "id_persona": fila["id_persona"], "resultado": resultado}
+    except errors.UniqueViolation:
+        # la otra clave natural ya es de otra persona
+        await conn.rollback()
+        raise HTTPException(status_code=409, detail="El ci o el correo ya pertenece a otra persona")
+    except Exception:
+        log.exception("Error al sincronizar persona")
+        raise HTTPException(status_code=400, detail="No se pudo sincronizar la persona")
+
 @router.put("/{id_persona}")
 async def actualizar_persona(id_persona: int, persona: Persona, conn=Depends(get_conexion)):
     consulta = """
@@ -111,8 +208,22 @@ async def actualizar_persona(id_persona: int, persona: Persona, conn=Depends(get
             actualizado = await cursor.fetchone()
             await conn.commit()
             return {"mensaje": "Persona actualizada correctamente", "id_persona": actualizado["id_persona"]}
-    except Exception as e:
-        print(f"Error al actualizar persona: {e}")
+    except Exception:
+        log.exception("Error al actualizar persona")
+        raise HTTPException(status_code=400, detail="No se pudo actualizar la persona")
+
+@router.patch("/{id_persona}")
+async def modificar_persona(id_persona: int, persona: PersonaParcial, conn=Depends(get_conexion)):
+    try:
+        actualizada = await parcial_personas.actualizar(conn, id_persona, persona)
+        if actualizada is None:
+            raise HTTPException(status_code=404, detail="Persona no encontrada")
+        await conn.commit()
+        return {"mensaje": "Persona actualizada correctamente", "id_persona": id_persona, "sin_cambios": not actualizada}
+    except HTTPException:
+        raise
+    except Exception:
+        log.exception("Error al modificar persona")
         raise HTTPException(status_code=400, detail="No se pudo actualizar la persona")
 
 @router.delete("/{id_persona}")
@@ -125,8 +236,8 @@ async def eliminar_persona(id_persona: int, conn=Depends(get_conexion)):
                 raise HTTPException(status_code=404, detail="Persona no encontrada")
             await conn.commit()
             return {"mensaje": "Persona eliminada correctamente"}
-    except Exception as e:
-        print(f"Error al eliminar persona: {e}")
+    except Exception:
+        log.exception("Error al eliminar persona")
         raise HTTPException(status_code=400, detail="No se pudo eliminar la persona")
 
 app.include_router(router)
@@ -0,0 +1,49 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+from config import metricas
+from config.admision import admision
+from config.cache import cache_catalogo
+from config.conexionDB import control, estado_pool
+from config.eventos import difusor
+from config.idempotencia import idempotencia
+from config.perfilado import registro_lentas
+from config.seguridad import TIPO_ADMINISTRADOR, requiere_tipo
+from config.versiones import versiones_tablas
+
+router = APIRouter()
+
+@router.get("/sistema/cache")
+async def estadisticas_cache():
+    return cache_catalogo.estadisticas()
+
+@router.get("/sistema/admision")
+async def estado_admision():
+    return control.estado()
+
+@router.get("/sistema/eventos")
+async def estado_eventos():
+    return difusor.estadisticas()
+
+@router.get("/sistema/idempotencia")
+async def estado_idempotencia():
+    return idempotencia.estadisticas()
+
+@router.get("/sistema/versiones")
+async def estado_versiones():
+    return versiones_tablas.estadisticas()
+
+# trae SQL y parametros: solo administradores
+@router.get("/sistema/consultas-lentas", dependencies=[Depends(requiere_tipo(TIPO_ADMINISTRADOR))])
+async def consultas_lentas():
+    return registro_lentas.estadisticas()
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def exponer_metricas():
+    estado = estado_pool()
+    metricas.conexiones_pool.fijar(estado["en_uso"], "en_uso")
+    metricas.conexiones_pool.fijar(estado["libres"], "libres")
+    metricas.peticiones_pool.fijar(estado["esperando"])
+    metricas.tamano_pool.fijar(estado["min"], "min")
+    metricas.tamano_pool.fijar(estado["max"], "max")
+    metricas.cola_admision.fijar(admision.estadisticas()["en_cola"])
+    return PlainTextResponse(metricas.exponer(), media_type="text/plain; version=0.0.4")
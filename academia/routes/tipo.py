@@ -2,7 +2,10 @@ import asyncio
 import sys
 from fastapi import FastAPI, Depends, HTTPException, APIRouter
 from pydantic import BaseModel
-from config.conexionDB import get_conexion
+from config.conexionDB import conexion
+from config.cache import cache_catalogo
+from config.paginacion import Listado, Paginacion
+from config.versiones import etag_contenido
 
 if sys.platform == "win32":
     asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
@@ -13,36 +16,50 @@ router = APIRouter()
 class TipoUsuario(BaseModel):
     nombre_tipo: str
 
-@router.get("/")
-async def listar_tipos(conn=Depends(get_conexion)):
-    consulta = """
-        SELECT id_tipo, nombre_tipo
-        FROM tipo_usuario
-        ORDER BY id_tipo
-    """
+listado_tipos = Listado("tipo_usuario", "id_tipo", {
+    "id_tipo": int,
+    "nombre_tipo": str,
+})
+
+@router.get("/", dependencies=[Depends(etag_contenido)])
+async def listar_tipos(pagina: Paginacion = Depends(listado_tipos)):
+    if pagina.stream:
+        return await pagina.transmitir(None)
+
+    async def cargar():
+        async with conexion() as conn:
+            return await pagina.buscar(conn)
+
     try:
-        async with conn.cursor() as cursor:
-            await cursor.execute(consulta)
-            tipos = await cursor.fetchall()
-            if not tipos:
-                return {"mensaje": "No hay tipos de usuario registrados"}
-            return tipos
-    except Exception as e:
+        tipos = await cache_catalogo.obtener("tipo_usuario", ("listar", pagina.clave), cargar)
+        if not tipos:
+            return {"mensaje": "No hay tipos de usuario registrados"}
+        return pagina.responder(tipos)
+    except HTTPException:
+        raise
+    except Exception:
         raise HTTPException(status_code=400, detail="Error al consultar tipos de usuario")
 
-@router.get("/{id_tipo}")
-async def obtener_tipo(id_tipo: int, conn=Depends(get_conexion)):
+@router.get("/{id_tipo}", dependencies=[Depends(etag_contenido)])
+async def obtener_tipo(id_tipo: int):
     consulta = """
         SELECT id_tipo, nombre_tipo
         FROM tipo_usuario
         WHERE id_tipo = %s
     """
+
+    async def cargar():
+        async with conexion() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(consulta, (id_tipo,))
+                return await cursor.fetchone()
+
     try:
-        async with conn.cursor() as cursor:
-            await cursor.execute(consulta, (id_tipo,))
-            tipo = await cursor.fetchone()
-            if not tipo:
-                raise HTTPException(status_code=404, detail="Tipo de usuario no encontrado")
-            return tipo
-    except Exception as e:
+        tipo = await cache_catalogo.obtener("tipo_usuario", id_tipo, cargar)
+        if not tipo:
+            raise HTTPException(status_code=404, detail="Tipo de usuario no encontrado")
+        return tipo
+    except HTTPException:
+        raise
+    except Exception:
         raise HTTPException(status_code=400, detail="Error al consultar tipo de usuario")
@@ -1,37 +1,102 @@
 import asyncio
+import logging
 import sys
 from fastapi import FastAPI, Depends, HTTPException, APIRouter
 from pydantic import BaseModel
-from config.conexionDB import get_conexion
+from config.conexionDB import get_conexion, conexion
+from config.paginacion import Listado, Paginacion
+from config.versiones import Versionado
+from config.seguridad import emitir_token, es_hash, hashear, sesion_actual, sesiones, verificar
+from config.idempotencia import idempotente
 
 if sys.platform == "win32":
     asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
 
 app = FastAPI()
 router = APIRouter()
+log = logging.getLogger(__name__)
 
 class Usuario(BaseModel):
+    id_persona: int
     nombre: str
     contraseña: str
     id_tipo: int
 
-@router.get("/")
-async def listar_usuarios(conn=Depends(get_conexion)):
-    consulta = "SELECT id_usuario, nombre, contraseña, id_tipo FROM usuario ORDER BY id_usuario"
+class Login(BaseModel):
+    nombre: str
+    contraseña: str
+
+listado_usuarios = Listado("usuario", "id_usuario", {
+    "id_usuario": int,
+    "id_persona": int,
+    "nombre": str,
+    "id_tipo": int,
+})
+
+version_usuarios = Versionado("usuario", "id_usuario")
+
+@router.get("/", dependencies=[Depends(version_usuarios.listado)])
+async def listar_usuarios(pagina: Paginacion = Depends(listado_usuarios), conn=Depends(get_conexion)):
+    if pagina.stream:
+        return await pagina.transmitir(conn)
     try:
-        async with conn.cursor() as cursor:
-            await cursor.execute(consulta)
-            usuarios = await cursor.fetchall()
-            if not usuarios:
-                return {"mensaje": "No hay usuarios registrados"}
-            return usuarios
-    except Exception as e:
-        print(f"Error al listar usuarios: {e}")
+        usuarios = await pagina.buscar(conn)
+        if not usuarios:
+            return {"mensaje": "No hay usuarios registrados"}
+        return pagina.responder(usuarios)
+    except Exception:
+        log.exception("Error al listar usuarios")
         raise HTTPException(status_code=400, detail="Error al consultar usuarios")
 
-@router.get("/{id_usuario}")
+@router.post("/login")
+async def iniciar_sesion(login: Login):
+    consulta = "SELECT id_usuario, contraseña, id_tipo FROM usuario WHERE nombre = %s ORDER BY id_usuario"
+    try:
+        # la conexion se devuelve al pool antes de verificar: el hash tarda
+        async with conexion() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(consulta, (login.nombre,))
+                candidatos = await cursor.fetchall()
+            await conn.rollback()
+
+        usuario = None
+        for candidato in candidatos or [None]:
+            guardada = candidato["contraseña"] if candidato else None
+            if await verificar(login.contraseña, guardada) and candidato:
+                usuario = candidato
+                break
+        if usuario is None:
+            raise HTTPException(status_code=401, detail="Usuario o contraseña incorrectos")
+
+        if not es_hash(usuario["contraseña"]):
+            nueva = await hashear(login.contraseña)
+            async with conexion() as conn:
+                await conn.execute(
+                    "UPDATE usuario SET contraseña = %s WHERE id_usuario = %s", (nueva, usuario["id_usuario"])
+                )
+                await conn.commit()
+
+        token, expira = emitir_token(usuario["id_usuario"], usuario["id_tipo"])
+        return {
+            "token": token,
+            "tipo_token": "bearer",
+            "expira": expira,
+            "id_usuario": usuario["id_usuario"],
+            "id_tipo": usuario["id_tipo"],
+        }
+    except HTTPException:
+        raise
+    except Exception:
+        log.exception("Error al iniciar sesion")
+        raise HTTPException(status_code=400, detail="No se pudo iniciar sesión")
+
+@router.get("/sesion")
+async def obtener_sesion(sesion=Depends(sesion_actual)):
+    return sesion
+
+@router.get("/{id_usuario}", dependencies=[Depends(version_usuarios.fila)])
 async def obtener_usuario(id_usuario: int, conn=Depends(get_conexion)):
-    consulta = "SELECT id_usuario, nombre, contraseña, id_tipo FROM usuario WHERE id_usuario = %s"
+    consulta = "SELECT id_usuario, id_persona, nombre, id_tipo FROM usuario WHERE id_usuario = %s"
     try:
         async with conn.cursor() as cursor:
             await cursor.execute(consulta, (id_usuario,))
@@ -41,47 +106,56 @@ async def obtener_usuario(id_usuario: int, conn=Depends(get_conexion)):
             return usuario
     except HTTPException:
         raise
-    except Exception as e:
-        print(f"Error al consultar usuario: {e}")
+    except Exception:
+        log.exception("Error al consultar usuario")
         raise HTTPException(status_code=400, detail="Error al consultar usuario")
 
 @router.post("/")
+@idempotente
 async def insertar_usuario(usuario: Usuario, conn=Depends(get_conexion)):
-    consulta = "INSERT INTO usuario(nombre, contraseña, id_tipo) VALUES (%s, %s, %s) RETURNING id_usuario"
-    parametros = (usuario.nombre, usuario.contraseña, usuario.id_tipo)
+    consulta = """
+        INSERT INTO usuario(id_persona, nombre, contraseña, id_tipo)
+        VALUES (%s, %s, %s, %s)
+        RETURNING id_usuario
+    """
     try:
+        parametros = (usuario.id_persona, usuario.nombre, await hashear(usuario.contraseña), usuario.id_tipo)
         async with conn.cursor() as cursor:
             await cursor.execute(consulta, parametros)
             nuevo_id = await cursor.fetchone()
             await conn.commit()
             return {"mensaje": "Usuario registrado exitosamente", "id_usuario": nuevo_id["id_usuario"]}
-    except Exception as e:
-        print(f"Error al insertar usuario: {e}")
+    except Exception:
+        log.exception("Error al insertar usuario")
         raise HTTPException(status_code=400, detail="No se pudo registrar el usuario")
 
 @router.put("/{id_usuario}")
 async def actualizar_usuario(id_usuario: int, usuario: Usuario, conn=Depends(get_conexion)):
     consulta = """
         UPDATE usuario
-        SET nombre = %s,
+        SET id_persona = %s,
+            nombre = %s,
             contraseña = %s,
             id_tipo = %s
         WHERE id_usuario = %s
         RETURNING id_usuario
     """
-    parametros = (usuario.nombre, usuario.contraseña, usuario.id_tipo, id_usuario)
     try:
+        parametros = (
+            usuario.id_persona, usuario.nombre, await hashear(usuario.contraseña), usuario.id_tipo, id_usuario
+        )
         async with conn.cursor() as cursor:
             await cursor.execute(consulta, parametros)
             if cursor.rowcount == 0:
                 raise HTTPException(status_code=404, detail="Usuario no encontrado")
             actualizado = await cursor.fetchone()
             await conn.commit()
+            sesiones.revocar(id_usuario)
             return {"mensaje": "Usuario actualizado correctamente", "id_usuario": actualizado["id_usuario"]}
     except HTTPException:
         raise
-    except Exception as e:
-        print(f"Error al actualizar usuario: {e}")
+    except Exception:
+        log.exception("Error al actualizar usuario")
         raise HTTPException(status_code=400, detail="No se pudo actualizar el usuario")
 
 @router.delete("/{id_usuario}")
@@ -93,11 +167,12 @@ async def eliminar_usuario(id_usuario: int, conn=Depends(get_conexion)):
             if cursor.rowcount == 0:
                 raise HTTPException(status_code=404, detail="Usuario no encontrado")
             await conn.commit()
+            sesiones.revocar(id_usuario)
             return {"mensaje": "Usuario eliminado correctamente"}
     except HTTPException:
         raise
-    except Exception as e:
-        print(f"Error al eliminar usuario: {e}")
+    except Exception:
+        log.exception("Error al eliminar usuario")
         raise HTTPException(status_code=400, detail="No se pudo eliminar el usuario")
 
 app.include_router(router, prefix="/usuarios", tags=["Usuarios"])
@@ -0,0 +1,53 @@
+import os
+import pytest
+
+# Pruebas sin base de datos: armado de SQL y logica en memoria. config.seguridad lee
+# el secreto y el costo de scrypt al importarse.
+os.environ.setdefault("ACADEMIA_SECRETO", "secreto-de-pruebas")
+os.environ.setdefault("SCRYPT_N", str(2 ** 10))
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+class CursorFalso:
+    def __init__(self, conexion):
+        self.conexion = conexion
+        self.filas = []
+        self.rowcount = -1
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *error):
+        return False
+
+    async def execute(self, consulta, parametros=None):
+        texto = consulta if isinstance(consulta, str) else consulta.as_string(None)
+        self.conexion.consultas.append((texto, parametros))
+        if self.conexion.error is not None:
+            raise self.conexion.error
+        self.filas = list(self.conexion.responder(texto, parametros))
+        self.rowcount = len(self.filas)
+
+    async def fetchone(self):
+        return self.filas[0] if self.filas else None
+
+    async def fetchall(self):
+        return self.filas
+
+class ConexionFalsa:
+    # responder(texto, parametros) devuelve las filas de cada consulta; se guardan las
+    # consultas hechas y, si error no es None, execute lo lanza
+    def __init__(self, responder):
+        self.responder = responder
+        self.error = None
+        self.consultas = []
+        self.usos = 0
+
+    def cursor(self):
+        return CursorFalso(self)
+
+@pytest.fixture
+def conexion_falsa():
+    return ConexionFalsa
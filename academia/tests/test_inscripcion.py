@@ -0,0 +1,38 @@
+import pytest
+from fastapi import HTTPException
+from config.admision import ColaLlena
+from config.saturacion import Saturado
+from routes import inscripcion
+from routes.inscripcion import Inscripcion, insertar_inscripcion
+
+pytestmark = pytest.mark.anyio
+
+def solicitud():
+    return Inscripcion(id_alumno=1, id_clase=2)
+
+@pytest.fixture
+def inscribir(monkeypatch):
+    def fallar_con(error):
+        async def inscribir(*argumentos):
+            raise error
+        monkeypatch.setattr(inscripcion.admision, "inscribir", inscribir)
+    return fallar_con
+
+async def test_saturado_llega_como_503(inscribir):
+    inscribir(Saturado())
+    with pytest.raises(HTTPException) as error:
+        await insertar_inscripcion(solicitud())
+    assert error.value.status_code == 503
+    assert error.value.headers == {"Retry-After": "1"}
+
+async def test_cola_llena_de_la_clase_es_503(inscribir):
+    inscribir(ColaLlena())
+    with pytest.raises(HTTPException) as error:
+        await insertar_inscripcion(solicitud())
+    assert error.value.status_code == 503
+
+async def test_error_inesperado_es_400(inscribir):
+    inscribir(RuntimeError("sin base"))
+    with pytest.raises(HTTPException) as error:
+        await insertar_inscripcion(solicitud())
+    assert error.value.status_code == 400
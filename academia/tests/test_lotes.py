@@ -0,0 +1,104 @@
+import asyncio
+from contextlib import asynccontextmanager
+import pytest
+from fastapi import HTTPException
+from config import lotes
+from config.lotes import CargadorLotes, ids_lote
+
+pytestmark = pytest.mark.anyio
+
+def materias(existentes):
+    def responder(texto, parametros):
+        return [{"id_materia": i, "nombre": f"materia {i}"} for i in parametros[0] if i in existentes]
+    return responder
+
+@pytest.fixture
+def conexion(monkeypatch, conexion_falsa):
+    falsa = conexion_falsa(materias(range(1, 100)))
+
+    @asynccontextmanager
+    async def tomar(cancelable=True):
+        assert cancelable is False
+        falsa.usos += 1
+        yield falsa
+
+    monkeypatch.setattr(lotes, "conexion", tomar)
+    return falsa
+
+def cargador(**opciones):
+    return CargadorLotes("materia", "SELECT id_materia, nombre FROM materia", "id_materia", **opciones)
+
+async def test_agrupa_en_una_consulta(conexion):
+    materias = cargador()
+    filas = await asyncio.gather(*(materias.cargar(i) for i in (3, 1, 2)))
+    assert [f["id_materia"] for f in filas] == [3, 1, 2]
+    assert conexion.usos == 1
+    assert conexion.consultas == [("SELECT id_materia, nombre FROM materia WHERE id_materia = ANY(%s)", ([3, 1, 2],))]
+
+async def test_id_repetido_se_pide_una_vez(conexion):
+    materias = cargador()
+    primera, segunda = await asyncio.gather(materias.cargar(5), materias.cargar(5))
+    assert primera is segunda
+    assert conexion.consultas[0][1] == ([5],)
+
+async def test_espera_el_lote_en_camino(conexion):
+    materias = cargador()
+    en_camino = asyncio.ensure_future(materias.cargar(7))
+    await asyncio.sleep(0)
+    materias._despachar()
+    # el lote ya salio: el nuevo pedido del mismo id no abre otro
+    assert (await materias.cargar(7))["id_materia"] == 7
+    assert (await en_camino)["id_materia"] == 7
+    assert len(conexion.consultas) == 1
+
+async def test_max_lote_despacha_sin_esperar_la_ventana(conexion):
+    materias = cargador(ventana=60, max_lote=2)
+    filas = await asyncio.wait_for(asyncio.gather(materias.cargar(1), materias.cargar(2)), 1)
+    assert len(filas) == 2
+    assert conexion.usos == 1
+
+async def test_ventanas_distintas_son_lotes_distintos(conexion):
+    materias = cargador()
+    await materias.cargar(1)
+    await materias.cargar(2)
+    assert [c[1] for c in conexion.consultas] == [([1],), ([2],)]
+
+async def test_inexistente_devuelve_none(conexion):
+    materias = cargador()
+    assert await materias.cargar(500) is None
+    assert await materias.cargar_muchos([1, 500, 2]) == [
+        {"id_materia": 1, "nombre": "materia 1"},
+        {"id_materia": 2, "nombre": "materia 2"},
+    ]
+
+async def test_error_llega_a_todos_y_no_queda_en_camino(conexion):
+    conexion.error = RuntimeError("sin base")
+    materias = cargador()
+    resultados = await asyncio.gather(materias.cargar(1), materias.cargar(2), return_exceptions=True)
+    assert all(isinstance(r, RuntimeError) for r in resultados)
+    assert materias._en_camino == {}
+    conexion.error = None
+    assert (await materias.cargar(1))["id_materia"] == 1
+
+async def test_cancelar_un_cliente_no_corta_a_los_demas(conexion):
+    materias = cargador()
+    primero = asyncio.ensure_future(materias.cargar(4))
+    segundo = asyncio.ensure_future(materias.cargar(4))
+    await asyncio.sleep(0)
+    primero.cancel()
+    assert (await segundo)["id_materia"] == 4
+
+async def test_listar_respeta_el_orden_pedido(conexion_falsa):
+    conexion = conexion_falsa(materias({1, 3}))
+    assert await cargador().listar(conexion, [3, 2, 1]) == [
+        {"id_materia": 3, "nombre": "materia 3"},
+        {"id_materia": 1, "nombre": "materia 1"},
+    ]
+
+def test_ids_lote():
+    assert ids_lote(None) is None
+    assert ids_lote("3, 1,3,2,") == [3, 1, 2]
+    for invalido in ("a,1", ",", ",".join(map(str, range(1001)))):
+        with pytest.raises(HTTPException) as error:
+            ids_lote(invalido)
+        assert error.value.status_code == 400
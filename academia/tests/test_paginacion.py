@@ -0,0 +1,107 @@
+import base64
+import json
+import re
+import pytest
+from datetime import date
+from fastapi import HTTPException
+from starlette.requests import Request
+from config.paginacion import LIMITE_POR_DEFECTO, Listado
+
+listado = Listado("notas", "id_nota", {
+    "id_nota": int,
+    "nota": float,
+    "id_docente": int,
+    "fecha_registro": date,
+})
+
+def peticion(consulta=""):
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "scheme": "http",
+        "server": ("prueba", 80),
+        "path": "/nota/",
+        "query_string": consulta.encode(),
+        "headers": [],
+    })
+
+def paginar(consulta="", listado=listado, after_id=None, limit=LIMITE_POR_DEFECTO, sort=None, fields=None, cursor=None):
+    return listado(peticion(consulta), after_id, limit, False, sort, fields, cursor)
+
+def armar(pagina):
+    consulta, parametros = pagina._armar()
+    return consulta.as_string(None), parametros
+
+def test_sin_parametros():
+    assert armar(paginar()) == (
+        'SELECT "id_nota", "nota", "id_docente", "fecha_registro" FROM "notas" ORDER BY "id_nota" ASC',
+        [],
+    )
+
+def test_filtros_con_operadores():
+    sql, parametros = armar(paginar("nota_gte=50&id_docente_in=1,2&fecha_registro=2024-03-01"))
+    assert 'WHERE "nota" >= %s AND "id_docente" = ANY(%s) AND "fecha_registro" = %s' in sql
+    assert parametros == [50.0, [1, 2], date(2024, 3, 1)]
+
+def test_after_id():
+    sql, parametros = armar(paginar(after_id=10))
+    assert sql.endswith('WHERE "id_nota" > %s ORDER BY "id_nota" ASC')
+    assert parametros == [10]
+
+def test_orden_y_campos():
+    sql, _ = armar(paginar(sort="-nota", fields="fecha_registro"))
+    assert sql == 'SELECT "id_nota", "nota", "fecha_registro" FROM "notas" ORDER BY "nota" DESC, "id_nota" DESC'
+
+@pytest.mark.parametrize("consulta, argumentos", [
+    ("columna=1", {}),
+    ("nota_entre=1", {}),
+    ("nota=abc", {}),
+    ("", {"sort": "clave"}),
+    ("", {"fields": "nota,clave"}),
+    ("", {"sort": "nota", "after_id": 3}),
+    ("", {"cursor": "no-es-base64"}),
+])
+def test_parametros_invalidos(consulta, argumentos):
+    with pytest.raises(HTTPException) as error:
+        paginar(consulta, **argumentos)
+    assert error.value.status_code == 400
+
+def test_origen_como_subconsulta():
+    con_join = Listado("alumno", "id_alumno", {"id_alumno": int, "carrera": str}, origen="SELECT a.id_alumno, c.nombre_carrera AS carrera FROM alumno a JOIN carrera c ON c.id_carrera = a.carrera_alumno")
+    sql, parametros = armar(paginar("carrera=Medicina", listado=con_join))
+    assert sql == (
+        'SELECT "id_alumno", "carrera" FROM (SELECT a.id_alumno, c.nombre_carrera AS carrera FROM alumno a '
+        'JOIN carrera c ON c.id_carrera = a.carrera_alumno) AS "alumno" WHERE "carrera" = %s ORDER BY "id_alumno" ASC'
+    )
+    assert parametros == ["Medicina"]
+
+def siguiente(respuesta):
+    enlace = re.match(r"<(.+)>; rel=\"next\"", respuesta.headers["Link"]).group(1)
+    return dict(p.split("=", 1) for p in enlace.split("?", 1)[1].split("&"))
+
+def test_pagina_siguiente_por_after_id():
+    filas = [{"id_nota": i, "nota": 10.0} for i in (1, 2, 3)]
+    respuesta = paginar(limit=2).responder(filas)
+    assert json.loads(respuesta.body) == filas[:2]
+    assert siguiente(respuesta) == {"after_id": "2", "limit": "2"}
+
+def test_ultima_pagina_sin_link():
+    respuesta = paginar(limit=2).responder([{"id_nota": 1, "nota": 10.0}])
+    assert "Link" not in respuesta.headers
+
+@pytest.mark.parametrize("sort, signo", [("nota", ">"), ("-nota", "<")])
+def test_cursor_ida_y_vuelta(sort, signo):
+    filas = [{"id_nota": 7, "nota": 55.5}, {"id_nota": 3, "nota": 61.0}, {"id_nota": 9, "nota": 70.0}]
+    respuesta = paginar(sort=sort, limit=2).responder(filas)
+    cursor = siguiente(respuesta)["cursor"].replace("%3D", "=")
+    assert json.loads(base64.urlsafe_b64decode(cursor)) == [61.0, 3]
+
+    sql, parametros = armar(paginar(sort=sort, limit=2, cursor=cursor))
+    assert f'("nota", "id_nota") {signo} (%s, %s)' in sql
+    assert parametros == [61.0, 3]
+
+def test_cursor_con_valor_nulo():
+    cursor = base64.urlsafe_b64encode(json.dumps([None, 4]).encode()).decode()
+    sql, parametros = armar(paginar(sort="nota", cursor=cursor))
+    assert '"nota" IS NULL AND "id_nota" > %s' in sql
+    assert parametros == [4]
@@ -0,0 +1,66 @@
+from typing import Optional
+import pytest
+from fastapi import HTTPException
+from pydantic import BaseModel
+from config.parcial import Parcial
+
+pytestmark = pytest.mark.anyio
+
+class NotaParcial(BaseModel):
+    nota: Optional[float] = None
+    id_docente: Optional[int] = None
+
+parcial = Parcial("notas", "id_nota")
+
+def notas(actualizadas, existe=True):
+    def responder(texto, parametros):
+        if texto.startswith("UPDATE"):
+            return [{"id_nota": parametros["id"]}] * actualizadas
+        return [{"?column?": 1}] if existe else []
+    return responder
+
+def test_consulta_con_una_columna():
+    assert parcial.consulta(["nota"]).as_string(None) == (
+        'UPDATE "notas" SET "nota" = %(nota)s '
+        'WHERE "id_nota" = %(id)s AND ROW("nota") IS DISTINCT FROM ROW(%(nota)s) '
+        'RETURNING "id_nota"'
+    )
+
+def test_consulta_con_varias_columnas():
+    assert parcial.consulta(["nota", "id_docente"]).as_string(None) == (
+        'UPDATE "notas" SET "nota" = %(nota)s, "id_docente" = %(id_docente)s '
+        'WHERE "id_nota" = %(id)s AND ROW("nota", "id_docente") IS DISTINCT FROM ROW(%(nota)s, %(id_docente)s) '
+        'RETURNING "id_nota"'
+    )
+
+def test_identificadores_escapados():
+    consulta = Parcial("tabla rara", "id").consulta(['col"umna']).as_string(None)
+    assert consulta.startswith('UPDATE "tabla rara" SET "col""umna" = %(col"umna)s')
+
+async def test_solo_los_campos_enviados(conexion_falsa):
+    conexion = conexion_falsa(notas(actualizadas=1))
+    assert await parcial.actualizar(conexion, 4, NotaParcial(nota=80)) is True
+    [(texto, parametros)] = conexion.consultas
+    assert '"id_docente"' not in texto
+    assert parametros == {"nota": 80.0, "id": 4}
+
+async def test_null_explicito_se_escribe(conexion_falsa):
+    conexion = conexion_falsa(notas(actualizadas=1))
+    await parcial.actualizar(conexion, 4, NotaParcial(nota=None))
+    assert conexion.consultas[0][1] == {"nota": None, "id": 4}
+
+async def test_sin_cambios(conexion_falsa):
+    conexion = conexion_falsa(notas(actualizadas=0, existe=True))
+    assert await parcial.actualizar(conexion, 4, NotaParcial(nota=80)) is False
+    assert conexion.consultas[1] == ('SELECT 1 FROM "notas" WHERE "id_nota" = %(id)s', {"id": 4})
+
+async def test_fila_inexistente(conexion_falsa):
+    conexion = conexion_falsa(notas(actualizadas=0, existe=False))
+    assert await parcial.actualizar(conexion, 4, NotaParcial(nota=80)) is None
+
+async def test_cuerpo_vacio(conexion_falsa):
+    conexion = conexion_falsa(notas(actualizadas=0))
+    with pytest.raises(HTTPException) as error:
+        await parcial.actualizar(conexion, 4, NotaParcial())
+    assert error.value.status_code == 400
+    assert conexion.consultas == []
@@ -0,0 +1,60 @@
+import pytest
+from fastapi import HTTPException
+from psycopg.errors import QueryCanceled
+from config.respuestas import iniciar_flujo
+from config.saturacion import Saturado
+
+pytestmark = pytest.mark.anyio
+
+class Generador:
+    def __init__(self, trozos, error=None):
+        self.trozos = trozos
+        self.error = error
+        self.cerrado = False
+
+    def __call__(self):
+        try:
+            if self.error is not None:
+                raise self.error
+            for trozo in self.trozos:
+                yield trozo
+        finally:
+            self.cerrado = True
+
+async def generar(origen):
+    for trozo in origen():
+        yield trozo
+
+async def leer(flujo):
+    return [trozo async for trozo in flujo]
+
+async def test_entrega_todos_los_trozos():
+    origen = Generador([b"a", b"b", b"c"])
+    assert await leer(await iniciar_flujo(generar(origen), "error")) == [b"a", b"b", b"c"]
+    assert origen.cerrado
+
+async def test_sin_trozos():
+    assert await leer(await iniciar_flujo(generar(Generador([])), "error")) == []
+
+@pytest.mark.parametrize("error, codigo", [(Saturado(), 503), (HTTPException(status_code=404), 404)])
+async def test_errores_http_antes_de_responder(error, codigo):
+    with pytest.raises(HTTPException) as capturado:
+        await iniciar_flujo(generar(Generador([b"a"], error)), "error")
+    assert capturado.value.status_code == codigo
+
+async def test_cancelacion_pasa_al_manejador():
+    with pytest.raises(QueryCanceled):
+        await iniciar_flujo(generar(Generador([], QueryCanceled())), "error")
+
+async def test_otro_error_es_400():
+    with pytest.raises(HTTPException) as capturado:
+        await iniciar_flujo(generar(Generador([], RuntimeError("COPY invalido"))), "No se pudo exportar")
+    assert capturado.value.status_code == 400
+    assert capturado.value.detail == "No se pudo exportar"
+
+async def test_cortar_la_lectura_cierra_el_generador():
+    origen = Generador([b"a", b"b", b"c"])
+    flujo = await iniciar_flujo(generar(origen), "error")
+    assert await anext(flujo) == b"a"
+    await flujo.aclose()
+    assert origen.cerrado
@@ -0,0 +1,109 @@
+import anyio
+import pytest
+from config.saturacion import ControlAdmision, Saturado
+
+pytestmark = pytest.mark.anyio
+
+def control(capacidad=2, limites=None, colas=None, esperas=None):
+    return ControlAdmision(
+        capacidad,
+        limites={"escritura": capacidad, "lectura": capacidad, "reporte": 1, **(limites or {})},
+        colas={"escritura": 5, "lectura": 5, "reporte": 1, **(colas or {})},
+        esperas={"escritura": 1.0, "lectura": 1.0, "reporte": 1.0, **(esperas or {})},
+    )
+
+async def esperar_cola(admision, clase, cantidad):
+    while admision.esperando[clase] < cantidad:
+        await anyio.sleep(0)
+
+async def test_entra_directo_con_lugar():
+    admision = control()
+    await admision.entrar("lectura")
+    await admision.entrar("escritura")
+    assert admision.en_uso == {"escritura": 1, "lectura": 1, "reporte": 0}
+    admision.salir("lectura")
+    assert admision.en_uso["lectura"] == 0
+
+async def test_espera_en_cola_hasta_que_se_libera():
+    admision = control(capacidad=1)
+    await admision.entrar("lectura")
+    orden = []
+
+    async def entrar():
+        await admision.entrar("lectura")
+        orden.append("adentro")
+
+    async with anyio.create_task_group() as grupo:
+        grupo.start_soon(entrar)
+        await esperar_cola(admision, "lectura", 1)
+        assert orden == []
+        admision.salir("lectura")
+    assert orden == ["adentro"]
+    assert admision.en_uso["lectura"] == 1
+    assert admision.esperando["lectura"] == 0
+
+async def test_cola_llena_responde_503():
+    admision = control(capacidad=1, colas={"lectura": 1})
+    await admision.entrar("lectura")
+    async with anyio.create_task_group() as grupo:
+        grupo.start_soon(admision.entrar, "lectura")
+        await esperar_cola(admision, "lectura", 1)
+        with pytest.raises(Saturado) as error:
+            await admision.entrar("lectura")
+        assert error.value.status_code == 503
+        assert error.value.headers == {"Retry-After": "1"}
+        admision.salir("lectura")
+
+async def test_vence_la_espera_y_sale_de_la_cola():
+    admision = control(capacidad=1, esperas={"lectura": 0.01})
+    await admision.entrar("lectura")
+    with pytest.raises(Saturado):
+        await admision.entrar("lectura")
+    assert admision.esperando["lectura"] == 0
+    assert admision._cola == []
+    admision.salir("lectura")
+    assert admision.en_uso["lectura"] == 0
+
+async def test_cancelar_la_espera_libera_el_lugar_en_cola():
+    admision = control(capacidad=1)
+    await admision.entrar("lectura")
+    with anyio.move_on_after(0.01):
+        await admision.entrar("lectura")
+    assert admision.esperando["lectura"] == 0
+    assert admision._cola == []
+
+async def test_escritura_pasa_antes_que_lectura():
+    admision = control(capacidad=1)
+    await admision.entrar("reporte")
+    orden = []
+
+    async def entrar(clase):
+        await admision.entrar(clase)
+        orden.append(clase)
+        admision.salir(clase)
+
+    async with anyio.create_task_group() as grupo:
+        grupo.start_soon(entrar, "lectura")
+        await esperar_cola(admision, "lectura", 1)
+        grupo.start_soon(entrar, "escritura")
+        await esperar_cola(admision, "escritura", 1)
+        admision.salir("reporte")
+    assert orden == ["escritura", "lectura"]
+
+async def test_clase_en_su_limite_no_bloquea_a_las_otras():
+    admision = control(capacidad=3)
+    await admision.entrar("reporte")
+    orden = []
+
+    async def entrar(clase):
+        await admision.entrar(clase)
+        orden.append(clase)
+
+    async with anyio.create_task_group() as grupo:
+        # el reporte espera por su limite (1), la lectura entra igual
+        grupo.start_soon(entrar, "reporte")
+        await esperar_cola(admision, "reporte", 1)
+        await admision.entrar("lectura")
+        assert admision.en_uso == {"escritura": 0, "lectura": 1, "reporte": 1}
+        admision.salir("reporte")
+    assert orden == ["reporte"]
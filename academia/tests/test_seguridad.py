@@ -0,0 +1,115 @@
+import pytest
+from fastapi import HTTPException
+from config import seguridad
+from config.seguridad import Sesiones, emitir_token, es_hash, hashear, requiere_tipo, sesion_actual, verificar
+
+class Reloj:
+    def __init__(self, ahora=1_000_000.0):
+        self.ahora = ahora
+
+    def time(self):
+        return self.ahora
+
+@pytest.fixture
+def reloj(monkeypatch):
+    reloj = Reloj()
+    monkeypatch.setattr(seguridad, "time", reloj)
+    return reloj
+
+def test_token_valido(reloj):
+    token, expira = emitir_token(7, 2)
+    assert expira == reloj.ahora + seguridad.TOKEN_TTL
+    assert Sesiones().resolver(token) == {"id_usuario": 7, "id_tipo": 2, "expira": expira}
+
+@pytest.mark.parametrize("alterar", [
+    lambda t: t[:-2] + ("AA" if not t.endswith("AA") else "BB"),
+    lambda t: "x" + t,
+    lambda t: t.split(".")[0],
+    lambda t: "",
+])
+def test_token_alterado(reloj, alterar):
+    token, _ = emitir_token(7, 2)
+    assert Sesiones().resolver(alterar(token)) is None
+
+def test_token_de_otro_secreto(reloj, monkeypatch):
+    token, _ = emitir_token(7, 2)
+    monkeypatch.setattr(seguridad, "SECRETO", b"otro")
+    assert Sesiones().resolver(token) is None
+
+def test_token_vencido(reloj):
+    sesiones = Sesiones()
+    token, expira = emitir_token(7, 2)
+    assert sesiones.resolver(token) is not None
+    reloj.ahora = expira
+    # tambien la copia en cache vence
+    assert sesiones.resolver(token) is None
+
+def test_revocar(reloj):
+    sesiones = Sesiones()
+    anterior, _ = emitir_token(7, 2)
+    otro_usuario, _ = emitir_token(8, 2)
+    assert sesiones.resolver(anterior) is not None
+    reloj.ahora += 1
+    sesiones.revocar(7)
+    assert sesiones.resolver(anterior) is None
+    assert sesiones.resolver(otro_usuario) is not None
+    reloj.ahora += 1
+    nuevo, _ = emitir_token(7, 2)
+    assert sesiones.resolver(nuevo) is not None
+
+def test_revocaciones_vencen_con_el_ttl(reloj):
+    sesiones = Sesiones()
+    sesiones.revocar(1)
+    sesiones.revocar(2)
+    reloj.ahora += seguridad.TOKEN_TTL / 2
+    sesiones.revocar(1)
+    reloj.ahora += seguridad.TOKEN_TTL / 2
+    sesiones.revocar(3)
+    assert list(sesiones._revocados) == [1, 3]
+
+def test_cache_acotada(reloj):
+    sesiones = Sesiones(maximo=2)
+    tokens = [emitir_token(i, 1)[0] for i in range(3)]
+    for token in tokens:
+        sesiones.resolver(token)
+    assert list(sesiones._sesiones) == tokens[1:]
+
+def test_sesion_actual(reloj, monkeypatch):
+    monkeypatch.setattr(seguridad, "sesiones", Sesiones())
+    token, _ = emitir_token(7, 2)
+    assert sesion_actual(f"Bearer {token}")["id_usuario"] == 7
+    for cabecera in (None, token, "Bearer invalido"):
+        with pytest.raises(HTTPException) as error:
+            sesion_actual(cabecera)
+        assert error.value.status_code == 401
+        assert error.value.headers == {"WWW-Authenticate": "Bearer"}
+
+def test_requiere_tipo():
+    verificar_tipo = requiere_tipo(seguridad.TIPO_ADMINISTRADOR)
+    admin = {"id_usuario": 1, "id_tipo": seguridad.TIPO_ADMINISTRADOR, "expira": 0}
+    assert verificar_tipo(admin) is admin
+    with pytest.raises(HTTPException) as error:
+        verificar_tipo({"id_usuario": 2, "id_tipo": 1, "expira": 0})
+    assert error.value.status_code == 403
+
+def test_comprobar_secreto(monkeypatch):
+    seguridad.comprobar_secreto()
+    monkeypatch.setattr(seguridad, "SECRETO", b"")
+    with pytest.raises(RuntimeError):
+        seguridad.comprobar_secreto()
+
+def test_comprobar_token_ttl(monkeypatch):
+    monkeypatch.setattr(seguridad, "TOKEN_TTL", 0)
+    with pytest.raises(RuntimeError):
+        seguridad.comprobar_secreto()
+
+@pytest.mark.anyio
+async def test_hash_de_contrasena():
+    guardada = await hashear("clave")
+    assert es_hash(guardada)
+    assert guardada != await hashear("clave")
+    assert await verificar("clave", guardada)
+    assert not await verificar("otra", guardada)
+    # contrasenas anteriores en texto plano y usuario inexistente
+    assert await verificar("clave", "clave")
+    assert not await verificar("clave", None)